@@ -0,0 +1,233 @@
+"""
+AI deal analysis shared by /api/ai/analyze-deal and the batched re-analysis jobs.
+
+The model is called through the async OpenAI client, so a completion never
+holds a worker thread. Jobs run in a per-process background task: deal ids
+are queued, loaded from the DB in batches, scored concurrently and written
+back with one bulk UPDATE per batch.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from models import Deal, Product, Price
+
+AI_MODEL = os.getenv("AI_MODEL", "gpt-4o-mini")
+AI_TEMPERATURE = float(os.getenv("AI_TEMPERATURE", "0.2"))
+# Deals loaded and committed together by the job worker
+AI_JOB_BATCH_SIZE = int(os.getenv("AI_JOB_BATCH_SIZE", "20"))
+# Completions in flight at once across all jobs
+AI_JOB_CONCURRENCY = int(os.getenv("AI_JOB_CONCURRENCY", "5"))
+# Finished jobs are kept this long for progress queries
+AI_JOB_RETENTION_SECONDS = 3600
+
+PRICE_HISTORY_POINTS = 10
+
+_client = None
+
+def get_openai_client():
+    """Shared AsyncOpenAI client (one connection pool per process)"""
+    global _client
+    if _client is None:
+        import openai
+        _client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+def load_analysis_data(db, deal: Deal) -> Dict[str, Any]:
+    """Everything the prompt needs, read up front so no session is held during the completion"""
+    product = deal.product
+    price_history = db.query(Price).filter(
+        Price.product_id == product.id
+    ).order_by(Price.scraped_at.desc()).limit(PRICE_HISTORY_POINTS).all()
+
+    return {
+        "deal_id": deal.id,
+        "product_name": product.name,
+        "site": product.site,
+        "category": product.category,
+        "current_price": deal.current_price,
+        "original_price": deal.original_price,
+        "discount_percentage": deal.discount_percentage,
+        "price_history": [
+            {
+                "price": price.price,
+                "date": price.scraped_at.isoformat(),
+                "availability": price.availability
+            }
+            for price in price_history
+        ]
+    }
+
+def build_analysis_prompt(analysis_data: Dict[str, Any]) -> str:
+    return f"""
+        Analiza esta oferta de producto y determina si es una buena oportunidad de compra.
+
+        Producto: {analysis_data['product_name']}
+        Sitio: {analysis_data['site']}
+        Categoría: {analysis_data['category']}
+        Precio actual: ${analysis_data['current_price']}
+        Precio original: ${analysis_data['original_price']}
+        Descuento: {analysis_data['discount_percentage']}%
+
+        Historial de precios:
+        {json.dumps(analysis_data['price_history'], indent=2)}
+
+        Responde en formato JSON con:
+        - confidence_score: número entre 0 y 1
+        - reasoning: explicación en español neutro
+        - telegram_message: mensaje para Telegram (máximo 200 caracteres)
+        """
+
+async def analyze(analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Score one deal. Raises json.JSONDecodeError if the model doesn't answer JSON."""
+    response = await get_openai_client().chat.completions.create(
+        model=AI_MODEL,
+        messages=[
+            {"role": "system", "content": "Eres un analista de precios experto. Responde solo en JSON válido."},
+            {"role": "user", "content": build_analysis_prompt(analysis_data)}
+        ],
+        temperature=AI_TEMPERATURE,
+        max_tokens=500
+    )
+    return json.loads(response.choices[0].message.content)
+
+class AIJob:
+    """Progress of one batched re-analysis request"""
+
+    def __init__(self, deal_ids: List[int]):
+        self.id = uuid.uuid4().hex
+        self.deal_ids = deal_ids
+        self.total = len(deal_ids)
+        self.completed = 0
+        self.failed = 0
+        self.errors: Dict[int, str] = {}
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def status(self) -> str:
+        if self.finished_at:
+            return "done"
+        return "running" if self.completed or self.failed else "queued"
+
+    def record(self, deal_id: int, error: Optional[str] = None):
+        if error:
+            self.failed += 1
+            self.errors[deal_id] = error
+        else:
+            self.completed += 1
+        if self.completed + self.failed >= self.total:
+            self.finished_at = datetime.utcnow()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "errors": {str(deal_id): error for deal_id, error in self.errors.items()},
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class AIJobManager:
+    """In-process job queue; the worker task starts with the first submitted job"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.jobs: Dict[str, AIJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, deal_ids: List[int]) -> AIJob:
+        self._prune()
+        job = AIJob(list(dict.fromkeys(deal_ids)))
+        self.jobs[job.id] = job
+        if not job.total:
+            job.finished_at = datetime.utcnow()
+            return job
+
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        for deal_id in job.deal_ids:
+            self._queue.put_nowait((job, deal_id))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return job
+
+    def get(self, job_id: str) -> Optional[AIJob]:
+        return self.jobs.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - AI_JOB_RETENTION_SECONDS
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and job.finished_at.timestamp() < cutoff:
+                del self.jobs[job_id]
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(AI_JOB_CONCURRENCY)
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < AI_JOB_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._process_batch(batch, semaphore)
+            except Exception as e:
+                for job, deal_id in batch:
+                    job.record(deal_id, str(e))
+
+    def _load_batch(self, deal_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            deals = db.query(Deal).join(Product).filter(Deal.id.in_(deal_ids)).all()
+            return {deal.id: load_analysis_data(db, deal) for deal in deals}
+        finally:
+            db.close()
+
+    def _commit_batch(self, results: Dict[int, Dict[str, Any]]):
+        db = self.session_factory()
+        try:
+            db.bulk_update_mappings(Deal, [
+                {
+                    "id": deal_id,
+                    "confidence_score": result["confidence_score"],
+                    "ai_reasoning": result["reasoning"]
+                }
+                for deal_id, result in results.items()
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+    async def _process_batch(self, batch, semaphore: asyncio.Semaphore):
+        analysis_data = await asyncio.to_thread(self._load_batch, [deal_id for _, deal_id in batch])
+
+        async def score(deal_id: int):
+            if deal_id not in analysis_data:
+                return deal_id, None, "Deal not found"
+            async with semaphore:
+                try:
+                    result = await analyze(analysis_data[deal_id])
+                    if "confidence_score" not in result or "reasoning" not in result:
+                        return deal_id, None, "Invalid AI response format"
+                    return deal_id, result, None
+                except json.JSONDecodeError:
+                    return deal_id, None, "Invalid AI response format"
+                except Exception as e:
+                    return deal_id, None, str(e)
+
+        scored = await asyncio.gather(*(score(deal_id) for _, deal_id in batch))
+
+        results = {deal_id: result for deal_id, result, error in scored if result}
+        if results:
+            await asyncio.to_thread(self._commit_batch, results)
+
+        errors = {deal_id: error for deal_id, result, error in scored if error}
+        for job, deal_id in batch:
+            job.record(deal_id, errors.get(deal_id))
@@ -0,0 +1,154 @@
+"""
+In-process pub/sub of newly persisted deals, feeding the /api/deals/stream SSE endpoint.
+
+Each API worker owns one DealBroadcaster. New deals reach it from a single
+source per worker and are fanned out to every connected subscriber:
+
+- Redis pub/sub (REDIS_HOST set): the scraper publishes each deal it commits
+  to DEAL_EVENTS_CHANNEL; every worker receives it without touching the DB.
+- DB tail (fallback): one `id > last_seen` query per poll interval, shared by
+  all subscribers of the worker, instead of one filtered query per client.
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import func
+
+from models import Deal, Product
+
+DEAL_EVENTS_CHANNEL = os.getenv("DEAL_EVENTS_CHANNEL", "pricewatch:deals:new")
+DEAL_STREAM_POLL_SECONDS = float(os.getenv("DEAL_STREAM_POLL_SECONDS", "5"))
+# Events buffered per subscriber before a slow client starts losing them
+SUBSCRIBER_QUEUE_SIZE = 100
+
+def deal_event(deal_id: int, product_name: str, product_url: str, site: str, original_price: float,
+               current_price: float, discount_percentage: float, confidence_score: float,
+               ai_reasoning: Optional[str], created_at) -> Dict[str, Any]:
+    """Serialize a deal the same way /api/deals does"""
+    return {
+        "id": deal_id,
+        "product_name": product_name,
+        "product_url": product_url,
+        "site": site,
+        "original_price": original_price,
+        "current_price": current_price,
+        "discount_percentage": discount_percentage,
+        "confidence_score": confidence_score,
+        "ai_reasoning": ai_reasoning,
+        "created_at": created_at.isoformat() if hasattr(created_at, "isoformat") else created_at
+    }
+
+class Subscription:
+    """A connected client and the filters it asked for"""
+
+    def __init__(self, site: Optional[str], min_confidence: Optional[float]):
+        self.site = site
+        self.min_confidence = min_confidence
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.site and event.get("site") != self.site:
+            return False
+        if self.min_confidence and (event.get("confidence_score") or 0) < self.min_confidence:
+            return False
+        return True
+
+class DealBroadcaster:
+    """Fans new deals out to subscribers; the source task starts with the first subscriber"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.subscribers: Set[Subscription] = set()
+        self._source_task: Optional[asyncio.Task] = None
+        self._last_deal_id: Optional[int] = None
+
+    def subscribe(self, site: Optional[str] = None, min_confidence: Optional[float] = None) -> Subscription:
+        subscription = Subscription(site, min_confidence)
+        if not self.subscribers:
+            # Re-baseline the DB tail so an idle period isn't replayed as a burst
+            self._last_deal_id = None
+        self.subscribers.add(subscription)
+        if self._source_task is None or self._source_task.done():
+            self._source_task = asyncio.create_task(self._run_source())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def publish(self, event: Dict[str, Any]):
+        """Deliver one event to every matching subscriber (never blocks)"""
+        for subscription in list(self.subscribers):
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped += 1
+
+    async def _run_source(self):
+        if os.getenv("REDIS_HOST"):
+            try:
+                await self._run_redis_source()
+                return
+            except Exception as e:
+                print(f"⚠️ Redis pub/sub no disponible, usando sondeo de BD: {e}")
+        await self._run_db_tail_source()
+
+    async def _run_redis_source(self):
+        import redis.asyncio as redis
+
+        client = redis.Redis(
+            host=os.getenv("REDIS_HOST"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            db=int(os.getenv("REDIS_DB", 0))
+        )
+        pubsub = client.pubsub()
+        await pubsub.subscribe(DEAL_EVENTS_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    self.publish(json.loads(message["data"]))
+                except (ValueError, TypeError):
+                    continue
+        finally:
+            await pubsub.unsubscribe(DEAL_EVENTS_CHANNEL)
+            await client.close()
+
+    def _fetch_new_deals(self):
+        db = self.session_factory()
+        try:
+            if self._last_deal_id is None:
+                # Only deals created after the stream started are pushed
+                self._last_deal_id = db.query(func.max(Deal.id)).scalar() or 0
+                return []
+
+            rows = db.query(
+                Deal.id, Product.name, Product.url, Product.site, Deal.original_price,
+                Deal.current_price, Deal.discount_percentage, Deal.confidence_score,
+                Deal.ai_reasoning, Deal.created_at
+            ).join(Product, Deal.product_id == Product.id).filter(
+                Deal.id > self._last_deal_id
+            ).order_by(Deal.id).all()
+
+            if rows:
+                self._last_deal_id = rows[-1][0]
+            return [deal_event(*row) for row in rows]
+        finally:
+            db.close()
+
+    async def _run_db_tail_source(self):
+        while True:
+            if self.subscribers or self._last_deal_id is None:
+                try:
+                    for event in await asyncio.to_thread(self._fetch_new_deals):
+                        self.publish(event)
+                except Exception as e:
+                    print(f"⚠️ Error consultando nuevas ofertas: {e}")
+            await asyncio.sleep(DEAL_STREAM_POLL_SECONDS)
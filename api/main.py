@@ -5,6 +5,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
+from metrics import MetricsMiddleware, install_db_metrics
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +15,7 @@ DATABASE_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_
 
 # Create database engine
 engine = create_engine(DATABASE_URL)
+install_db_metrics(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create FastAPI app
@@ -32,6 +34,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Prometheus route latency and DB query counts (scraped from /metrics)
+app.add_middleware(MetricsMiddleware)
+
 # Security
 security = HTTPBearer()
 
@@ -44,13 +49,18 @@ def get_db():
         db.close()
 
 # Import routes
-from routes import deals, health, ai, auth
+from routes import deals, health, stats, export, stream, ai, auth, metrics as metrics_route
 
 # Include routers
 app.include_router(health.router, prefix="/api", tags=["health"])
+app.include_router(stats.router, prefix="/api", tags=["stats"])
+# stream must precede deals so /deals/stream isn't matched by /deals/{deal_id}
+app.include_router(stream.router, prefix="/api", tags=["deals"])
 app.include_router(deals.router, prefix="/api", tags=["deals"])
+app.include_router(export.router, prefix="/api", tags=["export"])
 app.include_router(ai.router, prefix="/api", tags=["ai"])
 app.include_router(auth.router, prefix="/api", tags=["auth"])
+app.include_router(metrics_route.router, tags=["metrics"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,91 @@
+"""
+Prometheus metrics for the API: per-route latency and DB queries per request.
+
+MetricsMiddleware is a plain ASGI middleware (not BaseHTTPMiddleware) so
+streaming responses such as /api/deals/stream and /api/export/* are timed
+until the last chunk, not until the headers. Routes are labelled with their
+path template (/api/deals/{deal_id}) to keep label cardinality bounded.
+
+DB queries are counted by an engine listener and attributed to the request
+through a context variable that holds a mutable counter, so queries issued
+from threadpool endpoints land on the right request.
+
+With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR; /metrics then
+aggregates all workers.
+"""
+
+import contextvars
+import os
+import time
+from typing import List, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, REGISTRY
+from sqlalchemy import event
+
+REQUEST_SECONDS = Histogram(
+    "api_request_seconds", "Request latency by route template", ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+DB_QUERIES = Counter(
+    "api_db_queries_total", "SQL statements executed", ["route"]
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "api_db_queries_per_request", "SQL statements executed per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+
+# [count] for the request being served; None outside requests (scripts, background tasks)
+_request_queries: contextvars.ContextVar = contextvars.ContextVar("request_queries", default=None)
+
+def install_db_metrics(engine):
+    """Count every statement executed through engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        counter: Optional[List[int]] = _request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+        else:
+            DB_QUERIES.labels("background").inc()
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        queries = [0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_queries.reset(token)
+            route = _route_template(scope)
+            REQUEST_SECONDS.labels(scope["method"], route, str(status["code"])).observe(time.perf_counter() - started)
+            DB_QUERIES.labels(route).inc(queries[0])
+            DB_QUERIES_PER_REQUEST.labels(route).observe(queries[0])
+
+def render_metrics():
+    """(body, content type) for the /metrics endpoint"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Boolean, Text, ForeignKey, and_, case, event, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
-from datetime import datetime
+from sqlalchemy.orm import relationship, Session
+from datetime import datetime, timedelta
 
 Base = declarative_base()
 
@@ -63,3 +64,175 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime)
+
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class StatBucket(Base):
+    __tablename__ = "stat_buckets"
+    
+    name = Column(String(50), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+class PriceRollupHourly(Base):
+    __tablename__ = "price_rollups_hourly"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    sum_price = Column(Float, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    last_price = Column(Float, nullable=False)
+    last_scraped_at = Column(DateTime, nullable=False)
+
+class PriceRollupDaily(Base):
+    __tablename__ = "price_rollups_daily"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    sum_price = Column(Float, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    last_price = Column(Float, nullable=False)
+    last_scraped_at = Column(DateTime, nullable=False)
+
+# Rows counted by /api/stats, keyed by the counter name they feed
+COUNTED_MODELS = {
+    Product: "products",
+    Price: "prices",
+    Deal: "deals",
+}
+
+# Hourly buckets older than this are pruned when a new bucket is opened
+STAT_BUCKET_RETENTION = timedelta(days=7)
+
+def _increment(connection, table, key: dict, delta: int, **extra) -> bool:
+    """Add delta to a counter row, creating it if missing. Returns True on insert.
+    
+    A single INSERT ... ON CONFLICT DO UPDATE, so two transactions opening the
+    same row can't both insert it (the loser's flush would roll back).
+    """
+    stmt = insert(table).values(value=delta, **key, **extra)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={"value": table.c.value + stmt.excluded.value, **{column: stmt.excluded[column] for column in extra}}
+    )
+    # xmax is 0 only for a row version created by an insert
+    return connection.execute(stmt.returning(literal_column("xmax = 0"))).scalar()
+
+@event.listens_for(Session, "after_flush")
+def update_stat_counters(session, flush_context):
+    """Keep stat_counters/stat_buckets in step with every flush.
+    
+    Runs inside the flushing transaction, so the counters commit or roll back
+    together with the rows they describe.
+    """
+    deltas = {}
+    for obj in session.new:
+        name = COUNTED_MODELS.get(type(obj))
+        if name:
+            deltas[name] = deltas.get(name, 0) + 1
+    for obj in session.deleted:
+        name = COUNTED_MODELS.get(type(obj))
+        if name:
+            deltas[name] = deltas.get(name, 0) - 1
+    
+    if not deltas:
+        return
+    
+    connection = session.connection()
+    now = datetime.utcnow()
+    bucket_start = now.replace(minute=0, second=0, microsecond=0)
+    
+    for name, delta in deltas.items():
+        if delta == 0:
+            continue
+        _increment(connection, StatCounter.__table__, {"name": name}, delta, updated_at=now)
+        if delta > 0:
+            opened = _increment(connection, StatBucket.__table__, {"name": name, "bucket_start": bucket_start}, delta)
+            if opened:
+                connection.execute(
+                    StatBucket.__table__.delete().where(and_(
+                        StatBucket.name == name,
+                        StatBucket.bucket_start < bucket_start - STAT_BUCKET_RETENTION
+                    ))
+                )
+
+def hour_bucket(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+def day_bucket(timestamp: datetime) -> datetime:
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+# Rollup tables fed by new Price rows, with the function that picks their bucket
+PRICE_ROLLUPS = [
+    (PriceRollupHourly, hour_bucket),
+    (PriceRollupDaily, day_bucket),
+]
+
+def summarize_prices(prices) -> dict:
+    """Group (product_id, price, scraped_at) samples into per-bucket aggregates.
+    
+    Returns {(rollup_model, product_id, bucket_start): aggregate} so each bucket
+    touched by a flush costs a single upsert.
+    """
+    buckets = {}
+    for product_id, price, scraped_at in prices:
+        for model, bucket_for in PRICE_ROLLUPS:
+            key = (model, product_id, bucket_for(scraped_at))
+            agg = buckets.get(key)
+            if agg is None:
+                buckets[key] = {
+                    "min_price": price, "max_price": price, "sum_price": price,
+                    "sample_count": 1, "last_price": price, "last_scraped_at": scraped_at
+                }
+                continue
+            agg["min_price"] = min(agg["min_price"], price)
+            agg["max_price"] = max(agg["max_price"], price)
+            agg["sum_price"] += price
+            agg["sample_count"] += 1
+            if scraped_at >= agg["last_scraped_at"]:
+                agg["last_price"] = price
+                agg["last_scraped_at"] = scraped_at
+    return buckets
+
+def merge_price_rollup(connection, model, product_id: int, bucket_start: datetime, agg: dict):
+    """Fold an aggregate into its rollup row with a single atomic upsert"""
+    table = model.__table__
+    c = table.c
+    stmt = insert(table).values(product_id=product_id, bucket_start=bucket_start, **agg)
+    new = stmt.excluded
+    is_newer = c.last_scraped_at <= new.last_scraped_at
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[c.product_id, c.bucket_start],
+        set_={
+            "min_price": func.least(c.min_price, new.min_price),
+            "max_price": func.greatest(c.max_price, new.max_price),
+            "sum_price": c.sum_price + new.sum_price,
+            "sample_count": c.sample_count + new.sample_count,
+            "last_price": case((is_newer, new.last_price), else_=c.last_price),
+            "last_scraped_at": func.greatest(c.last_scraped_at, new.last_scraped_at),
+        }
+    ))
+
+@event.listens_for(Session, "after_flush")
+def update_price_rollups(session, flush_context):
+    """Fold every newly inserted Price into the hourly and daily rollups"""
+    prices = [
+        (obj.product_id, obj.price, obj.scraped_at)
+        for obj in session.new
+        if isinstance(obj, Price)
+    ]
+    if not prices:
+        return
+    
+    connection = session.connection()
+    for (model, product_id, bucket_start), agg in summarize_prices(prices).items():
+        merge_price_rollup(connection, model, product_id, bucket_start, agg)
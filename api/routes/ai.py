@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from models import Deal, Product, Price
-from main import get_db
-from datetime import datetime
+from models import Deal
+from main import get_db, SessionLocal
+from ai_analysis import AIJobManager, load_analysis_data, analyze
+from datetime import datetime, timedelta
 from pydantic import BaseModel
-from typing import Optional
-import openai
-import os
+from typing import List, Optional
 import json
 
 router = APIRouter()
 
+# One job queue per worker process
+job_manager = AIJobManager(SessionLocal)
+
 class AIAnalysisRequest(BaseModel):
     deal_id: int
     force_analysis: bool = False
@@ -22,6 +24,10 @@ class AIAnalysisResponse(BaseModel):
     telegram_message: str
     analysis_timestamp: str
 
+class AIAnalysisJobRequest(BaseModel):
+    deal_ids: List[int] = []
+    since_hours: Optional[int] = None
+
 @router.post("/ai/analyze-deal", response_model=AIAnalysisResponse)
 async def analyze_deal(
     request: AIAnalysisRequest,
@@ -34,64 +40,11 @@ async def analyze_deal(
         if not deal:
             raise HTTPException(status_code=404, detail="Deal not found")
         
-        # Get product and price history
-        product = deal.product
-        price_history = db.query(Price).filter(
-            Price.product_id == product.id
-        ).order_by(Price.scraped_at.desc()).limit(10).all()
-        
-        # Prepare data for AI analysis
-        analysis_data = {
-            "product_name": product.name,
-            "site": product.site,
-            "category": product.category,
-            "current_price": deal.current_price,
-            "original_price": deal.original_price,
-            "discount_percentage": deal.discount_percentage,
-            "price_history": [
-                {
-                    "price": price.price,
-                    "date": price.scraped_at.isoformat(),
-                    "availability": price.availability
-                }
-                for price in price_history
-            ]
-        }
-        
-        # Call OpenAI API
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+        # Prepare data for AI analysis and release the connection before the completion
+        analysis_data = load_analysis_data(db, deal)
+        db.rollback()
         
-        prompt = f"""
-        Analiza esta oferta de producto y determina si es una buena oportunidad de compra.
-        
-        Producto: {analysis_data['product_name']}
-        Sitio: {analysis_data['site']}
-        Categoría: {analysis_data['category']}
-        Precio actual: ${analysis_data['current_price']}
-        Precio original: ${analysis_data['original_price']}
-        Descuento: {analysis_data['discount_percentage']}%
-        
-        Historial de precios:
-        {json.dumps(analysis_data['price_history'], indent=2)}
-        
-        Responde en formato JSON con:
-        - confidence_score: número entre 0 y 1
-        - reasoning: explicación en español neutro
-        - telegram_message: mensaje para Telegram (máximo 200 caracteres)
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Eres un analista de precios experto. Responde solo en JSON válido."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            max_tokens=500
-        )
-        
-        # Parse AI response
-        ai_response = json.loads(response.choices[0].message.content)
+        ai_response = await analyze(analysis_data)
         
         # Update deal with new analysis
         deal.confidence_score = ai_response["confidence_score"]
@@ -106,7 +59,36 @@ async def analyze_deal(
             analysis_timestamp=datetime.utcnow().isoformat()
         )
         
+    except HTTPException:
+        raise
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Invalid AI response format")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ai/analyze-jobs")
+async def create_analysis_job(
+    request: AIAnalysisJobRequest,
+    db: Session = Depends(get_db)
+):
+    """Queue AI re-analysis for many deals; returns immediately with a job id"""
+    deal_ids = list(request.deal_ids)
+    if request.since_hours:
+        since = datetime.utcnow() - timedelta(hours=request.since_hours)
+        deal_ids.extend(
+            deal_id for (deal_id,) in db.query(Deal.id).filter(Deal.created_at >= since).all()
+        )
+    
+    if not deal_ids:
+        raise HTTPException(status_code=400, detail="No deals to analyze")
+    
+    job = job_manager.submit(deal_ids)
+    return job.to_dict()
+
+@router.get("/ai/analyze-jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Progress of a queued AI re-analysis job"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
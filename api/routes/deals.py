@@ -1,13 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, and_
-from models import Deal, Product, Price
+from models import Deal, Product, Price, PriceRollupHourly, PriceRollupDaily, hour_bucket, day_bucket
 from main import get_db
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
+def apply_deal_filters(query, site: Optional[str], min_confidence: Optional[float], days: int):
+    """Apply the /deals filters to a query or select already joined with Product"""
+    if site:
+        query = query.filter(Product.site == site)
+    
+    if min_confidence:
+        query = query.filter(Deal.confidence_score >= min_confidence)
+    
+    # Date filter
+    start_date = datetime.utcnow() - timedelta(days=days)
+    return query.filter(Deal.created_at >= start_date)
+
 @router.get("/deals")
 async def get_deals(
     skip: int = Query(0, ge=0),
@@ -20,18 +32,7 @@ async def get_deals(
     """Get deals with optional filtering"""
     try:
         # Build query
-        query = db.query(Deal).join(Product)
-        
-        # Apply filters
-        if site:
-            query = query.filter(Product.site == site)
-        
-        if min_confidence:
-            query = query.filter(Deal.confidence_score >= min_confidence)
-        
-        # Date filter
-        start_date = datetime.utcnow() - timedelta(days=days)
-        query = query.filter(Deal.created_at >= start_date)
+        query = apply_deal_filters(db.query(Deal).join(Product), site, min_confidence, days)
         
         # Get total count
         total = query.count()
@@ -107,3 +108,76 @@ async def get_deal_detail(deal_id: int, db: Session = Depends(get_db)):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# Widest range (in days) served at each resolution when resolution=auto
+RAW_HISTORY_MAX_DAYS = 2
+HOURLY_HISTORY_MAX_DAYS = 14
+
+@router.get("/products/{product_id}/price-history")
+async def get_price_history(
+    product_id: int,
+    days: int = Query(30, ge=1, le=730),
+    resolution: str = Query("auto", pattern="^(auto|raw|hour|day)$"),
+    db: Session = Depends(get_db)
+):
+    """Price history for charts, served from the hourly/daily rollups for long ranges"""
+    try:
+        if resolution == "auto":
+            if days <= RAW_HISTORY_MAX_DAYS:
+                resolution = "raw"
+            elif days <= HOURLY_HISTORY_MAX_DAYS:
+                resolution = "hour"
+            else:
+                resolution = "day"
+        
+        start_date = datetime.utcnow() - timedelta(days=days)
+        
+        if resolution == "raw":
+            prices = db.query(Price.price, Price.scraped_at).filter(
+                Price.product_id == product_id,
+                Price.scraped_at >= start_date
+            ).order_by(Price.scraped_at).all()
+            
+            points = [
+                {
+                    "timestamp": scraped_at.isoformat(),
+                    "min": price,
+                    "max": price,
+                    "avg": price,
+                    "last": price,
+                    "samples": 1
+                }
+                for price, scraped_at in prices
+            ]
+        else:
+            if resolution == "hour":
+                rollup, bucket_for = PriceRollupHourly, hour_bucket
+            else:
+                rollup, bucket_for = PriceRollupDaily, day_bucket
+            
+            # Range scan on the (product_id, bucket_start) primary key
+            buckets = db.query(rollup).filter(
+                rollup.product_id == product_id,
+                rollup.bucket_start >= bucket_for(start_date)
+            ).order_by(rollup.bucket_start).all()
+            
+            points = [
+                {
+                    "timestamp": bucket.bucket_start.isoformat(),
+                    "min": bucket.min_price,
+                    "max": bucket.max_price,
+                    "avg": bucket.sum_price / bucket.sample_count,
+                    "last": bucket.last_price,
+                    "samples": bucket.sample_count
+                }
+                for bucket in buckets
+            ]
+        
+        return {
+            "product_id": product_id,
+            "days": days,
+            "resolution": resolution,
+            "points": points
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,183 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, Integer, Float, Boolean, DateTime
+from models import Deal, Product, Price
+from main import SessionLocal
+from routes.deals import apply_deal_filters
+from typing import Optional
+from datetime import datetime, timedelta
+import csv
+import io
+import json
+
+router = APIRouter()
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+DEAL_EXPORT_COLUMNS = [
+    ("id", Deal.id),
+    ("product_id", Deal.product_id),
+    ("product_name", Product.name),
+    ("product_url", Product.url),
+    ("site", Product.site),
+    ("original_price", Deal.original_price),
+    ("current_price", Deal.current_price),
+    ("discount_percentage", Deal.discount_percentage),
+    ("confidence_score", Deal.confidence_score),
+    ("ai_reasoning", Deal.ai_reasoning),
+    ("telegram_sent", Deal.telegram_sent),
+    ("created_at", Deal.created_at),
+]
+
+PRICE_EXPORT_COLUMNS = [
+    ("id", Price.id),
+    ("product_id", Price.product_id),
+    ("product_name", Product.name),
+    ("site", Product.site),
+    ("price", Price.price),
+    ("currency", Price.currency),
+    ("availability", Price.availability),
+    ("scraped_at", Price.scraped_at),
+]
+
+def _stream_batches(statement):
+    """Yield lists of rows from a server-side cursor, one session per export"""
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _ndjson_chunks(names, batches):
+    for batch in batches:
+        yield "".join(
+            json.dumps({name: _json_value(value) for name, value in zip(names, row)}, ensure_ascii=False) + "\n"
+            for row in batch
+        )
+
+def _csv_chunks(names, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for batch in batches:
+        writer.writerows([_json_value(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands whatever was written back as chunks"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _arrow_schema(columns):
+    import pyarrow as pa
+
+    fields = []
+    for name, column in columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+def _parquet_chunks(columns, batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            # One row group per cursor batch keeps memory flat
+            writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, row)) for row in batch], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def _export_response(columns, statement, export_format: str, filename: str):
+    names = [name for name, _ in columns]
+    batches = _stream_batches(statement)
+
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        chunks = _parquet_chunks(columns, batches)
+    elif export_format == "csv":
+        chunks = _csv_chunks(names, batches)
+    else:
+        chunks = _ndjson_chunks(names, batches)
+
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
+
+@router.get("/export/deals")
+async def export_deals(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    site: Optional[str] = Query(None),
+    min_confidence: Optional[float] = Query(None, ge=0, le=1),
+    days: int = Query(7, ge=1, le=365)
+):
+    """Stream every deal matching the /deals filters, without pagination"""
+    statement = select(*[column for _, column in DEAL_EXPORT_COLUMNS]).join(Product, Deal.product_id == Product.id)
+    statement = apply_deal_filters(statement, site, min_confidence, days).order_by(Deal.id)
+    return _export_response(DEAL_EXPORT_COLUMNS, statement, format, "deals")
+
+@router.get("/export/prices")
+async def export_prices(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    site: Optional[str] = Query(None),
+    days: int = Query(7, ge=1, le=365)
+):
+    """Stream raw price samples, filtered by site and age like /deals"""
+    statement = select(*[column for _, column in PRICE_EXPORT_COLUMNS]).join(Product, Price.product_id == Product.id)
+    if site:
+        statement = statement.filter(Product.site == site)
+    start_date = datetime.utcnow() - timedelta(days=days)
+    statement = statement.filter(Price.scraped_at >= start_date).order_by(Price.id)
+    return _export_response(PRICE_EXPORT_COLUMNS, statement, format, "prices")
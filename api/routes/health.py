@@ -1,40 +1,21 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from models import Product, Price, Deal
-from main import get_db
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from fastapi import APIRouter
+from sqlalchemy import text
+from main import engine
+from datetime import datetime
 
 router = APIRouter()
 
 @router.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    """System health check endpoint"""
+async def health_check():
+    """Liveness probe: only checks that the pool can hand out a working connection"""
     try:
-        # Check database connection
-        db.execute("SELECT 1")
-        
-        # Get basic statistics
-        total_products = db.query(Product).count()
-        total_prices = db.query(Price).count()
-        total_deals = db.query(Deal).count()
-        
-        # Get recent activity (last 24 hours)
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_prices = db.query(Price).filter(Price.scraped_at >= yesterday).count()
-        recent_deals = db.query(Deal).filter(Deal.created_at >= yesterday).count()
-        
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
         return {
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
-            "database": "connected",
-            "statistics": {
-                "total_products": total_products,
-                "total_prices": total_prices,
-                "total_deals": total_deals,
-                "recent_prices_24h": recent_prices,
-                "recent_deals_24h": recent_deals
-            }
+            "database": "connected"
         }
     except Exception as e:
         return {
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from models import StatCounter, StatBucket
+from main import get_db
+from datetime import datetime, timedelta
+
+router = APIRouter()
+
+@router.get("/stats")
+async def get_stats(db: Session = Depends(get_db)):
+    """System statistics served from the stat_counters/stat_buckets rollups"""
+    try:
+        counters = {counter.name: counter for counter in db.query(StatCounter).all()}
+
+        # Recent activity (last 24 hours) from the hourly buckets
+        since = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
+        recent = dict(
+            db.query(StatBucket.name, func.sum(StatBucket.value))
+            .filter(StatBucket.bucket_start >= since)
+            .group_by(StatBucket.name)
+            .all()
+        )
+
+        updated_at = max((c.updated_at for c in counters.values() if c.updated_at), default=None)
+
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "updated_at": updated_at.isoformat() if updated_at else None,
+            "statistics": {
+                "total_products": counters["products"].value if "products" in counters else 0,
+                "total_prices": counters["prices"].value if "prices" in counters else 0,
+                "total_deals": counters["deals"].value if "deals" in counters else 0,
+                "recent_prices_24h": int(recent.get("prices") or 0),
+                "recent_deals_24h": int(recent.get("deals") or 0)
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
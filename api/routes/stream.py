@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from main import SessionLocal
+from deal_events import DealBroadcaster
+from typing import Optional
+import asyncio
+import json
+
+router = APIRouter()
+
+# One broadcaster per worker process, shared by every connected client
+broadcaster = DealBroadcaster(SessionLocal)
+
+# Seconds between keep-alive comments so proxies don't close idle streams
+HEARTBEAT_SECONDS = 15
+
+@router.get("/deals/stream")
+async def stream_deals(
+    request: Request,
+    site: Optional[str] = Query(None),
+    min_confidence: Optional[float] = Query(None, ge=0, le=1)
+):
+    """Server-sent events with every new deal matching the filters"""
+    subscription = broadcaster.subscribe(site, min_confidence)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: deal\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir las tablas de rollups de precios (horario y diario)
+a partir de la tabla prices. El mantenimiento normal es incremental; esto
+solo hace falta para el histórico previo a los rollups o tras una corrección.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, select, text
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Base, Price, PriceRollupHourly, PriceRollupDaily, summarize_prices, merge_price_rollup
+
+# Load environment variables
+load_dotenv()
+
+BATCH_SIZE = 5000
+
+def rebuild_price_rollups():
+    """Recalcular price_rollups_hourly y price_rollups_daily desde cero"""
+    print("📈 === RECONSTRUCCIÓN DE ROLLUPS DE PRECIOS ===")
+
+    # Database configuration
+    DATABASE_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT', 5432)}/{os.getenv('POSTGRES_DB')}"
+
+    try:
+        engine = create_engine(DATABASE_URL)
+
+        # Create rollup tables if they don't exist
+        Base.metadata.create_all(bind=engine, tables=[PriceRollupHourly.__table__, PriceRollupDaily.__table__])
+
+        # Delete and rebuild in one transaction. The lock makes the live after_flush
+        # upserts wait until the commit: a price committed before it is in the scan,
+        # one flushed after it is folded in by its own hook, never both.
+        total = 0
+        with engine.begin() as connection:
+            connection.execute(text("LOCK TABLE price_rollups_hourly, price_rollups_daily IN EXCLUSIVE MODE"))
+            connection.execute(PriceRollupHourly.__table__.delete())
+            connection.execute(PriceRollupDaily.__table__.delete())
+
+            last_id = 0
+            while True:
+                batch = connection.execute(
+                    select(Price.id, Price.product_id, Price.price, Price.scraped_at)
+                    .where(Price.id > last_id).order_by(Price.id).limit(BATCH_SIZE)
+                ).all()
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                prices = [(row.product_id, row.price, row.scraped_at) for row in batch]
+                for (model, product_id, bucket_start), agg in summarize_prices(prices).items():
+                    merge_price_rollup(connection, model, product_id, bucket_start, agg)
+                total += len(batch)
+                print(f"🔄 {total} precios procesados")
+
+        print(f"✅ Rollups reconstruidos con {total} precios")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error reconstruyendo rollups: {e}")
+        return False
+
+if __name__ == "__main__":
+    success = rebuild_price_rollups()
+    if not success:
+        sys.exit(1)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular las tablas de estadísticas (stat_counters/stat_buckets).
+Se ejecuta una vez al desplegar los contadores sobre una base con datos, o si
+se sospecha que se desincronizaron. El mantenimiento normal es incremental.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Base, Product, Price, Deal, StatCounter, StatBucket
+
+# Load environment variables
+load_dotenv()
+
+def rebuild_stats():
+    """Recalcular contadores totales y buckets horarios de las últimas 24h"""
+    print("📊 === RECONSTRUCCIÓN DE ESTADÍSTICAS ===")
+
+    # Database configuration
+    DATABASE_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT', 5432)}/{os.getenv('POSTGRES_DB')}"
+
+    try:
+        engine = create_engine(DATABASE_URL)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        # Create stats tables if they don't exist
+        Base.metadata.create_all(bind=engine, tables=[StatCounter.__table__, StatBucket.__table__])
+
+        db = SessionLocal()
+        now = datetime.utcnow()
+        current_hour = now.replace(minute=0, second=0, microsecond=0)
+
+        counted = [
+            ("products", Product, None),
+            ("prices", Price, Price.scraped_at),
+            ("deals", Deal, Deal.created_at),
+        ]
+
+        db.query(StatCounter).delete()
+        db.query(StatBucket).delete()
+
+        for name, model, timestamp_column in counted:
+            total = db.query(model).count()
+            db.add(StatCounter(name=name, value=total, updated_at=now))
+            print(f"✅ {name}: {total}")
+
+            if timestamp_column is None:
+                continue
+
+            for hours_ago in range(24):
+                bucket_start = current_hour - timedelta(hours=hours_ago)
+                value = db.query(model).filter(
+                    timestamp_column >= bucket_start,
+                    timestamp_column < bucket_start + timedelta(hours=1)
+                ).count()
+                if value:
+                    db.add(StatBucket(name=name, bucket_start=bucket_start, value=value))
+
+        db.commit()
+        print("🚀 Estadísticas reconstruidas")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error reconstruyendo estadísticas: {e}")
+        return False
+    finally:
+        if 'db' in locals():
+            db.close()
+
+if __name__ == "__main__":
+    success = rebuild_stats()
+    if not success:
+        sys.exit(1)
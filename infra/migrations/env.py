@@ -34,10 +34,10 @@ def get_url():
     user = os.getenv('POSTGRES_USER')
     password = os.getenv('POSTGRES_PASSWORD')
     host = os.getenv('POSTGRES_HOST', 'localhost')
-    port = os.getenv('POSTGRES_PORT', '3306')
+    port = os.getenv('POSTGRES_PORT', '5432')
     db = os.getenv('POSTGRES_DB')
     
-    return f"mysql+mysqlconnector://{user}:{password}@{host}:{port}/{db}"
+    return f"postgresql://{user}:{password}@{host}:{port}/{db}"
 
 
 def run_migrations_offline() -> None:
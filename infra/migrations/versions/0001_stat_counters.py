@@ -0,0 +1,43 @@
+"""stat_counters and stat_buckets for /api/stats
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases bootstrapped with create_all (api/scripts/create_admin.py) may already have them
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    if 'stat_counters' not in existing:
+        op.create_table(
+            'stat_counters',
+            sa.Column('name', sa.String(50), nullable=False),
+            sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime()),
+            sa.PrimaryKeyConstraint('name'),
+        )
+    if 'stat_buckets' not in existing:
+        op.create_table(
+            'stat_buckets',
+            sa.Column('name', sa.String(50), nullable=False),
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+            # The ON CONFLICT (name, bucket_start) upsert in api/models.py needs this key
+            sa.PrimaryKeyConstraint('name', 'bucket_start'),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('stat_buckets')
+    op.drop_table('stat_counters')
@@ -0,0 +1,44 @@
+"""price_rollups_hourly and price_rollups_daily for the price history endpoint
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+ROLLUP_TABLES = ('price_rollups_hourly', 'price_rollups_daily')
+
+
+def upgrade() -> None:
+    # Databases bootstrapped with create_all (api/scripts/create_admin.py) may already have them
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    for table in ROLLUP_TABLES:
+        if table in existing:
+            continue
+        op.create_table(
+            table,
+            sa.Column('product_id', sa.Integer(), sa.ForeignKey('products.id'), nullable=False),
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            sa.Column('min_price', sa.Float(), nullable=False),
+            sa.Column('max_price', sa.Float(), nullable=False),
+            sa.Column('sum_price', sa.Float(), nullable=False),
+            sa.Column('sample_count', sa.Integer(), nullable=False),
+            sa.Column('last_price', sa.Float(), nullable=False),
+            sa.Column('last_scraped_at', sa.DateTime(), nullable=False),
+            # The ON CONFLICT (product_id, bucket_start) upsert in api/models.py needs this key
+            sa.PrimaryKeyConstraint('product_id', 'bucket_start'),
+        )
+
+
+def downgrade() -> None:
+    for table in ROLLUP_TABLES:
+        op.drop_table(table)
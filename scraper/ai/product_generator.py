@@ -9,6 +9,9 @@ import os
 from typing import List, Dict, Any
 from datetime import datetime
 import requests
+import time
+
+from app import metrics, network_archive
 
 class ProductGenerator:
     """Generador inteligente de productos para scraping"""
@@ -45,7 +48,8 @@ class ProductGenerator:
             Responde SOLO en formato JSON válido con un array de objetos.
             """
             
-            client = openai.OpenAI(api_key=self.openai_api_key)
+            client = openai.OpenAI(api_key=self.openai_api_key, http_client=network_archive.openai_http_client())
+            started = time.perf_counter()
             response = client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
@@ -55,6 +59,7 @@ class ProductGenerator:
                 temperature=0.3,
                 max_tokens=2000
             )
+            metrics.record_openai('product_generation', time.perf_counter() - started, response.usage)
             
             # Parsear respuesta JSON
             ai_response = response.choices[0].message.content.strip()
@@ -3,10 +3,16 @@
 API Clients package for e-commerce sites
 """
 
-from .free_apis import FreeAPIClient, UnifiedFreeAPIClient, search_products_free
-
 __all__ = [
     'FreeAPIClient',
     'UnifiedFreeAPIClient',
     'search_products_free'
 ]
+
+def __getattr__(name):
+    # free_apis pulls in Playwright and aiohttp; importing a light submodule
+    # (site_adapters, circuit_breaker) shouldn't pay for it
+    if name in __all__:
+        from . import free_apis
+        return getattr(free_apis, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
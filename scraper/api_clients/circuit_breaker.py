@@ -0,0 +1,138 @@
+"""
+Per-site circuit breakers for UnifiedFreeAPIClient.
+
+A site that errors or returns no products several times in a row is opened
+and skipped for a cooldown; after it, a single half-open probe decides
+whether the site is closed again or reopened with a doubled cooldown.
+State is persisted in the scraper state dir, so a site that was dead in the
+previous hourly run costs nothing in the next one.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.state import read_json, write_json
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_FILE = "site_breakers.json"
+
+# Consecutive failures/empty results before a site is skipped
+FAILURE_THRESHOLD = int(os.getenv("SITE_BREAKER_FAILURES", "3"))
+# First cooldown; doubles every time a half-open probe fails, up to the max
+COOLDOWN_SECONDS = float(os.getenv("SITE_BREAKER_COOLDOWN_SECONDS", "3600"))
+MAX_COOLDOWN_SECONDS = float(os.getenv("SITE_BREAKER_MAX_COOLDOWN_SECONDS", str(24 * 3600)))
+
+class SiteBreaker:
+    """Breaker state for one site"""
+
+    def __init__(self, site: str, state: str = CLOSED, failures: int = 0, opened_at: float = 0.0,
+                 trips: int = 0, last_reason: Optional[str] = None):
+        self.site = site
+        self.state = state
+        self.failures = failures
+        self.opened_at = opened_at
+        self.trips = trips
+        self.last_reason = last_reason
+        self.probe_in_flight = False
+
+    @property
+    def cooldown(self) -> float:
+        return min(COOLDOWN_SECONDS * (2 ** max(self.trips - 1, 0)), MAX_COOLDOWN_SECONDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_at": self.opened_at,
+            "trips": self.trips,
+            "last_reason": self.last_reason,
+        }
+
+class CircuitBreakerBoard:
+    """Breakers for every site, loaded from and saved to the state dir"""
+
+    def __init__(self, state_file: str = STATE_FILE):
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        saved = read_json(state_file, {}) or {}
+        self.breakers: Dict[str, SiteBreaker] = {
+            site: SiteBreaker(site, **data) for site, data in saved.items()
+        }
+
+    def _breaker(self, site: str) -> SiteBreaker:
+        if site not in self.breakers:
+            self.breakers[site] = SiteBreaker(site)
+        return self.breakers[site]
+
+    def state(self, site: str) -> str:
+        return self._breaker(site).state
+
+    def allow(self, site: str) -> bool:
+        """Whether site should be searched now (claims the half-open probe if it's due)"""
+        with self._lock:
+            breaker = self._breaker(site)
+            if breaker.state == CLOSED:
+                return True
+            if breaker.state == OPEN:
+                if time.time() - breaker.opened_at < breaker.cooldown:
+                    return False
+                breaker.state = HALF_OPEN
+                print(f"🔌 {site}: circuito semiabierto, probando de nuevo")
+            if breaker.probe_in_flight:
+                return False
+            breaker.probe_in_flight = True
+            return True
+
+    def record_success(self, site: str):
+        with self._lock:
+            breaker = self._breaker(site)
+            changed = breaker.state != CLOSED or breaker.failures
+            if breaker.state != CLOSED:
+                print(f"✅ {site}: circuito cerrado, el sitio volvió a responder")
+            breaker.state = CLOSED
+            breaker.failures = 0
+            breaker.trips = 0
+            breaker.probe_in_flight = False
+            breaker.last_reason = None
+            if changed:
+                self._save()
+
+    def record_failure(self, site: str, reason: str):
+        """An error or an empty result"""
+        with self._lock:
+            breaker = self._breaker(site)
+            breaker.failures += 1
+            breaker.last_reason = reason
+            if breaker.state == HALF_OPEN or (breaker.state == CLOSED and breaker.failures >= FAILURE_THRESHOLD):
+                breaker.state = OPEN
+                breaker.opened_at = time.time()
+                breaker.trips += 1
+                print(f"🚫 {site}: circuito abierto tras {breaker.failures} fallos ({reason}), "
+                      f"se omite por {breaker.cooldown / 60:.0f} min")
+            breaker.probe_in_flight = False
+            self._save()
+
+    def release(self, site: str):
+        """Give back a half-open probe that didn't complete (e.g. cancelled)"""
+        with self._lock:
+            self._breaker(site).probe_in_flight = False
+
+    def _save(self):
+        try:
+            write_json(self.state_file, {site: b.to_dict() for site, b in self.breakers.items()})
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el estado de los circuitos: {e}")
+
+_board: Optional[CircuitBreakerBoard] = None
+
+def get_breaker_board() -> CircuitBreakerBoard:
+    """Process-wide board, shared by every UnifiedFreeAPIClient"""
+    global _board
+    if _board is None:
+        _board = CircuitBreakerBoard()
+    return _board
@@ -1,1452 +1,604 @@
 #!/usr/bin/env python3
 """
 Free APIs and improved scraping without API keys
+
+Every retailer is described by a SiteAdapter (see site_adapters.py) and run by
+the same engine: open the results page with the adapter's fetch tier, pull all
+product cards in a single round trip, then parse names/prices/urls in Python.
 """
 
-import requests
 import asyncio
+import os
 import aiohttp
-from typing import List, Dict, Any, Optional
-import json
+from typing import List, Dict, Any, Optional, Union
 import time
+from urllib.parse import urljoin
 from playwright.async_api import async_playwright
-import random
+
+from app.browser_hooks import prepare_context
+from app.profiler import profiler
+from app import metrics, network_archive
+from app.concurrency import get_limiter
+from app.resource_governor import get_governor
+from api_clients import interception  # noqa: F401 - registers the request blocking hook
+from api_clients import session_state
+from api_clients.circuit_breaker import get_breaker_board
+from api_clients.site_adapters import SITE_ADAPTERS, SiteAdapter, HTTP, configured_adapters, looks_like_price
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+LAUNCH_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+CONTEXT_OPTIONS = {
+    'user_agent': USER_AGENT,
+    'viewport': {'width': 1920, 'height': 1080},
+    'locale': 'es-MX',
+    # Service worker fetches bypass context.route, so the interception profile couldn't see them
+    'service_workers': 'block'
+}
+
+# Cards pulled per search; invalid ones are skipped until `limit` products are parsed
+CARDS_PER_RESULT = 3
+# Extra wait for late cards once the first one rendered
+NETWORK_IDLE_MS = 2000
+
+# Runs in the page: find the cards (or text-scan fallbacks) and return the raw
+# fields of each one, instead of several driver round trips per card.
+EXTRACT_CARDS_JS = """
+(spec) => {
+    const all = (root, selector) => {
+        try { return Array.from(root.querySelectorAll(selector)); } catch (e) { return []; }
+    };
+    const first = (root, selector) => {
+        try { return root.querySelector(selector); } catch (e) { return null; }
+    };
+    const textOf = (el) => (el && el.innerText) || '';
+
+    let cards = [];
+    for (const selector of spec.cardSelectors) {
+        cards = all(document, selector);
+        if (cards.length) break;
+    }
+    if (!cards.length) {
+        for (const scan of spec.fallbackScans) {
+            for (const el of all(document, scan.selector).slice(0, scan.scan)) {
+                const text = textOf(el);
+                const lower = text.toLowerCase();
+                if (text.length > scan.minLength && scan.keywords.some((keyword) => lower.includes(keyword))) {
+                    cards.push(el);
+                    if (cards.length >= scan.keep) break;
+                }
+            }
+            if (cards.length) break;
+        }
+    }
+
+    return cards.slice(0, spec.maxCards).map((card) => {
+        const img = first(card, spec.imageSelector);
+        return {
+            text: textOf(card),
+            titles: spec.titleSelectors.map((selector) => {
+                const el = first(card, selector);
+                return el ? textOf(el) : null;
+            }),
+            prices: spec.priceSelectors.map((selector) => {
+                const el = first(card, selector);
+                return el ? textOf(el) : null;
+            }),
+            hrefs: spec.urlSelectors.map((selector) => {
+                const el = first(card, selector);
+                return el ? el.getAttribute('href') : null;
+            }),
+            image: img ? img.getAttribute('src') : null,
+            imageTitle: img ? img.getAttribute('title') : null,
+            imageAlt: img ? img.getAttribute('alt') : null
+        };
+    });
+}
+"""
+
+def _first_text_line(text: str, skip_prefixes) -> Optional[str]:
+    for line in text.split('\n'):
+        line = line.strip()
+        if line and len(line) > 10 and not line.startswith(skip_prefixes):
+            return line
+    return None
+
+def parse_card(adapter: SiteAdapter, card: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Turn the raw fields of one card into a product, or None if it isn't one"""
+    text = card.get('text') or ''
+
+    name = None
+    if adapter.title_from_image:
+        name = card.get('imageTitle')
+        if not name or len(name.strip()) <= 5:
+            name = card.get('imageAlt')
+        if name and len(name.strip()) <= 5:
+            name = None
+    if adapter.title_selectors:
+        titles = [title.strip() for title in card.get('titles', []) if title and title.strip()]
+        name = name or next((title for title in titles if len(title) > 10), titles[0] if titles else None)
+    elif not name:
+        name = _first_text_line(text, adapter.title_skip_prefixes)
+    if not name:
+        return None
+
+    if adapter.price_selectors:
+        price = next((p for p in card.get('prices', []) if p and looks_like_price(p)), None)
+    else:
+        price = adapter.price_parser(text)
+    if not price:
+        return None
+
+    href = next((href for href in card.get('hrefs', []) if href), None)
+
+    return {
+        'name': name.strip(),
+        'price': price.strip(),
+        'url': urljoin(adapter.base_url + '/', href) if href else '',
+        'image': card.get('image') or '',
+        'site': adapter.name
+    }
+
+def _extraction_spec(adapter: SiteAdapter, max_cards: int) -> Dict[str, Any]:
+    return {
+        'cardSelectors': adapter.card_selectors,
+        'fallbackScans': [
+            {
+                'selector': scan.selector,
+                'scan': scan.scan,
+                'keep': scan.keep,
+                'minLength': scan.min_length,
+                'keywords': [keyword.lower() for keyword in scan.keywords]
+            }
+            for scan in adapter.fallback_scans
+        ],
+        'titleSelectors': adapter.title_selectors,
+        'priceSelectors': adapter.price_selectors,
+        'urlSelectors': adapter.url_selectors,
+        'imageSelector': adapter.image_selector,
+        'maxCards': max_cards
+    }
+
+def _extract_cards_from_html(html: str, adapter: SiteAdapter, max_cards: int) -> List[Dict[str, Any]]:
+    """HTTP tier: same extraction as EXTRACT_CARDS_JS over server-rendered HTML"""
+    from selectolax.parser import HTMLParser
+
+    tree = HTMLParser(html)
+
+    def text_of(node) -> str:
+        return node.text(separator='\n', strip=True) if node is not None else ''
+
+    cards = []
+    for selector in adapter.card_selectors:
+        cards = tree.css(selector)
+        if cards:
+            break
+    if not cards:
+        for scan in adapter.fallback_scans:
+            for node in tree.css(scan.selector)[:scan.scan]:
+                text = text_of(node)
+                if len(text) > scan.min_length and any(keyword.lower() in text.lower() for keyword in scan.keywords):
+                    cards.append(node)
+                    if len(cards) >= scan.keep:
+                        break
+            if cards:
+                break
+
+    raw = []
+    for card in cards[:max_cards]:
+        img = card.css_first(adapter.image_selector)
+        raw.append({
+            'text': text_of(card),
+            'titles': [text_of(card.css_first(selector)) or None for selector in adapter.title_selectors],
+            'prices': [text_of(card.css_first(selector)) or None for selector in adapter.price_selectors],
+            'hrefs': [
+                (card.css_first(selector).attributes.get('href') if card.css_first(selector) is not None else None)
+                for selector in adapter.url_selectors
+            ],
+            'image': img.attributes.get('src') if img is not None else None,
+            'imageTitle': img.attributes.get('title') if img is not None else None,
+            'imageAlt': img.attributes.get('alt') if img is not None else None
+        })
+    return raw
+
+class _WarmBrowser:
+    """A shared browser, its per-site contexts and how many pages it has served.
+
+    The browser holds one of the governor's browser slots and each context one
+    of its context slots, from creation until close.
+    """
+
+    def __init__(self, browser, governor):
+        self.browser = browser
+        self.governor = governor
+        self.contexts: Dict[str, Any] = {}
+        self.site_in_flight: Dict[str, int] = {}
+        self.last_used: Dict[str, float] = {}
+        self.pages_served = 0
+        self.in_flight = 0
+        self.retired = False
+        self.closed = False
+
+    def idle_sites(self) -> List[str]:
+        """Sites whose context has no page open, least recently used first"""
+        idle = [site for site in self.contexts if not self.site_in_flight.get(site)]
+        return sorted(idle, key=lambda site: self.last_used.get(site, 0.0))
+
+    async def drop(self, site: str):
+        context = self.contexts.pop(site, None)
+        if context is None:
+            return
+        self.last_used.pop(site, None)
+        try:
+            await context.close()
+        except Exception:
+            pass
+        await self.governor.contexts.release()
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for site in list(self.contexts):
+            await self.drop(site)
+        try:
+            await self.browser.close()
+        except Exception:
+            pass
+        await self.governor.browsers.release()
 
 class FreeAPIClient:
-    """Free API client that doesn't require API keys"""
-    
-    def __init__(self):
+    """Free API client that doesn't require API keys
+
+    With warm_sessions=True one browser is kept for the client's lifetime and
+    each site gets its own long-lived context (cookies, consent banners and
+    cache survive between queries); searches open a page in it. Otherwise
+    every search launches and closes its own browser. Either way each site
+    gets at most its concurrency limit of searches at a time
+    (app/concurrency.py), and the resource governor caps the total
+    (app/resource_governor.py) and decides when the warm browser is recycled.
+    The warm browser holds a governor browser slot for its whole life, and
+    its contexts count against the governor's context cap; at the cap the
+    least recently used idle context is closed to make room.
+    """
+
+    def __init__(self, warm_sessions: bool = False):
         self.session = None
-        self.browser_semaphore = asyncio.Semaphore(3)  # Limit to 3 concurrent browsers
-    
+        self.governor = get_governor()
+        self.limiter = get_limiter()
+        self.warm_sessions = warm_sessions
+        self._playwright = None
+        self._warm: Optional[_WarmBrowser] = None
+        # Recycled browsers still finishing their last pages
+        self._retiring: List[_WarmBrowser] = []
+        self._browser_lock = asyncio.Lock()
+        # Set whenever a warm page finishes, so a context waiting for room can look again
+        self._page_released = asyncio.Event()
+
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = network_archive.client_session(headers={'User-Agent': USER_AGENT, 'Accept-Language': 'es-MX'})
         return self
-    
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             await self.session.close()
-    
-    async def search_mercadolibre_free(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Search MercadoLibre using scraping (API blocked)"""
-        try:
-            print(f"🔍 MercadoLibre Scraping: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
-                try:
-                    # MercadoLibre search URL
-                    search_url = f"https://listado.mercadolibre.com.mx/{query.replace(' ', '-')}"
-                    print(f"🌐 Navigating to: {search_url}")
-                    
-                    await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
-                    await page.wait_for_timeout(5000)
-                    
-                    # Wait for products with multiple selectors
-                    product_selectors = [
-                        '.ui-search-layout__item',
-                        '.ui-search-item',
-                        '.ui-search-results .ui-search-item',
-                        '[data-testid="product"]',
-                        '.item',
-                        '.ui-search-item__wrapper'
-                    ]
-                    
-                    products_found = False
-                    product_elements = []
-                    
-                    for selector in product_selectors:
-                        try:
-                            await page.wait_for_selector(selector, timeout=5000)
-                            product_elements = await page.query_selector_all(selector)
-                            if product_elements:
-                                print(f"📦 Found {len(product_elements)} products with selector: {selector}")
-                                products_found = True
-                                break
-                        except:
-                            continue
-                    
-                    if not products_found:
-                        print("❌ No products found with any selector")
-                        return []
-                    
-                    products = []
-                    for element in product_elements[:limit]:
-                        try:
-                            # Extract product data with updated selectors
-                            # Get name from image title or text content
-                            name = None
-                            
-                            # Try image title first
-                            img_elem = await element.query_selector('img')
-                            if img_elem:
-                                name = await img_elem.get_attribute('title')
-                                if name and len(name.strip()) > 5:
-                                    pass  # Use this name
-                                else:
-                                    name = await img_elem.get_attribute('alt')
-                            
-                            # If no name from image, try text content
-                            if not name or len(name.strip()) <= 5:
-                                all_text = await element.inner_text()
-                                lines = all_text.split('\n')
-                                for line in lines:
-                                    if line.strip() and len(line.strip()) > 10 and not line.strip().startswith('$'):
-                                        name = line.strip()
-                                        break
-                            
-                            if not name or len(name.strip()) <= 5:
-                                continue
-                            
-                            # Extract price from text content
-                            price = None
-                            all_text = await element.inner_text()
-                            
-                            # Look for price patterns
-                            import re
-                            price_patterns = [
-                                r'\$\s*[\d,]+',
-                                r'[\d,]+\s*pesos',
-                                r'[\d,]+\s*MXN'
-                            ]
-                            
-                            for pattern in price_patterns:
-                                matches = re.findall(pattern, all_text)
-                                if matches:
-                                    price = matches[0]
-                                    break
-                            
-                            # If no pattern match, look for $ followed by numbers
-                            if not price:
-                                lines = all_text.split('\n')
-                                for line in lines:
-                                    if '$' in line and any(char.isdigit() for char in line):
-                                        price = line.strip()
-                                        break
-                            
-                            if not price:
-                                continue
-                            
-                            # URL extraction
-                            link_selectors = ['a', '.ui-search-link', '[data-testid="product-link"]']
-                            url = ''
-                            for link_sel in link_selectors:
-                                try:
-                                    link_elem = await element.query_selector(link_sel)
-                                    if link_elem:
-                                        url = await link_elem.get_attribute('href')
-                                        if url:
-                                            break
-                                except:
-                                    continue
-                            
-                            # Image extraction
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': url if url else '',
-                                'image': image,
-                                'site': 'MercadoLibre'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            print(f"⚠️ Error processing MercadoLibre product: {e}")
-                            continue
-                    
-                    print(f"✅ MercadoLibre Scraping: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ MercadoLibre Scraping error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ MercadoLibre Scraping error: {e}")
-            return []
-    
-    async def search_amazon_improved_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Improved Amazon scraping with better selectors"""
-        try:
-            print(f"🔍 Amazon Improved: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
-                try:
-                    # Amazon search URL
-                    search_url = f"https://www.amazon.com.mx/s?k={query.replace(' ', '+')}"
-                    print(f"🌐 Navigating to: {search_url}")
-                    
-                    await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
-                    await page.wait_for_timeout(5000)
-                    
-                    # Wait for products to load with multiple selectors
-                    product_selectors = [
-                        '[data-component-type="s-search-result"]',
-                        '.s-result-item',
-                        '[data-asin]',
-                        '.s-card-container'
-                    ]
-                    
-                    products_found = False
-                    product_elements = []
-                    
-                    for selector in product_selectors:
-                        try:
-                            await page.wait_for_selector(selector, timeout=5000)
-                            product_elements = await page.query_selector_all(selector)
-                            if product_elements:
-                                print(f"📦 Found {len(product_elements)} products with selector: {selector}")
-                                products_found = True
-                                break
-                        except:
-                            continue
-                    
-                    if not products_found:
-                        print("❌ No products found with any selector")
-                        return []
-                    
-                    products = []
-                    for element in product_elements[:limit]:
-                        try:
-                            # Extract product data with multiple selectors
-                            name_selectors = [
-                                'h2 a span',
-                                'h2 span',
-                                '.s-size-mini span',
-                                'h2',
-                                '.s-link-style',
-                                '[data-cy="title-recipe-title"]',
-                                '.s-title-instructions-style'
-                            ]
-                            
-                            name = None
-                            for selector in name_selectors:
-                                try:
-                                    name_elem = await element.query_selector(selector)
-                                    if name_elem:
-                                        name = await name_elem.inner_text()
-                                        if name and len(name.strip()) > 10:
-                                            break
-                                except:
-                                    continue
-                            
-                            if not name:
-                                continue
-                            
-                            # Price extraction with more selectors
-                            price_selectors = [
-                                '.a-price-whole',
-                                '.a-price .a-offscreen',
-                                '.a-price-range',
-                                '.a-price-symbol',
-                                '[data-a-price-amount]',
-                                '.a-price',
-                                '.a-offscreen'
-                            ]
-                            
-                            price = None
-                            for selector in price_selectors:
-                                try:
-                                    price_elem = await element.query_selector(selector)
-                                    if price_elem:
-                                        price = await price_elem.inner_text()
-                                        if price and ('$' in price or 'MXN' in price or price.replace('.', '').replace(',', '').isdigit()):
-                                            break
-                                except:
-                                    continue
-                            
-                            if not price:
-                                continue
-                            
-                            # URL extraction
-                            link_elem = await element.query_selector('h2 a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            # Image extraction
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.amazon.com.mx{url}" if url else '',
-                                'image': image,
-                                'site': 'Amazon'
-                            }
-                            products.append(product)
-                            
-                        except Exception as e:
-                            print(f"⚠️ Error processing Amazon product: {e}")
-                            continue
-                    
-                    print(f"✅ Amazon Improved: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ Amazon Improved error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Amazon Improved error: {e}")
-            return []
-    
-    async def search_walmart_improved_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Improved Walmart scraping with updated selectors"""
-        try:
-            print(f"🔍 Walmart Improved: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
-                try:
-                    # Walmart search URL
-                    search_url = f"https://www.walmart.com.mx/search?q={query.replace(' ', '+')}"
-                    print(f"🌐 Navigating to: {search_url}")
-                    
-                    await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
-                    await page.wait_for_timeout(5000)
-                    
-                    # Try to find products with multiple strategies
-                    products = []
-                    
-                    # Strategy 1: Look for product cards
-                    product_selectors = [
-                        '[data-automation-id="product-title"]',
-                        '.product-title',
-                        '.item-title',
-                        '[data-testid="product-title"]',
-                        '.product-item',
-                        '.item',
-                        '.product',
-                        '[data-testid="product"]',
-                        '.product-card',
-                        '.search-result-item'
-                    ]
-                    
-                    product_elements = []
-                    for selector in product_selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                print(f"📦 Found {len(elements)} products with selector: {selector}")
-                                product_elements = elements
-                                break
-                        except:
-                            continue
-                    
-                    if not product_elements:
-                        # Strategy 2: Look for any elements with product-like content
-                        all_elements = await page.query_selector_all('*')
-                        for element in all_elements[:100]:  # Check first 100 elements
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 20 and ('$' in text or 'peso' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 10:  # Limit to 10
-                                        break
-                            except:
-                                continue
-                    
-                    if not product_elements:
-                        print("❌ No products found with any strategy")
-                        return []
-                    
-                    # Extract products
-                    for element in product_elements[:limit]:
-                        try:
-                            # Get all text content
-                            all_text = await element.inner_text()
-                            
-                            # Extract name (first meaningful line)
-                            lines = all_text.split('\n')
-                            name = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and len(line) > 10 and not line.startswith('$') and not line.startswith('peso'):
-                                    name = line
-                                    break
-                            
-                            if not name:
-                                continue
-                            
-                            # Extract price using regex
-                            import re
-                            price_patterns = [
-                                r'\$\s*[\d,]+',
-                                r'[\d,]+\s*pesos',
-                                r'[\d,]+\s*MXN'
-                            ]
-                            
-                            price = None
-                            for pattern in price_patterns:
-                                matches = re.findall(pattern, all_text)
-                                if matches:
-                                    price = matches[0]
-                                    break
-                            
-                            # If no pattern match, look for $ followed by numbers
-                            if not price:
-                                for line in lines:
-                                    if '$' in line and any(char.isdigit() for char in line):
-                                        price = line.strip()
-                                        break
-                            
-                            if not price:
-                                continue
-                            
-                            # Find URL
-                            link_elem = await element.query_selector('a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            # Find image
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.walmart.com.mx{url}" if url else '',
-                                'image': image,
-                                'site': 'Walmart'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            print(f"⚠️ Error processing Walmart product: {e}")
-                            continue
-                    
-                    print(f"✅ Walmart Improved: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ Walmart Improved error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Walmart Improved error: {e}")
-            return []
-    
-    async def search_liverpool_improved_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Improved Liverpool scraping with updated selectors"""
-        try:
-            print(f"🔍 Liverpool Improved: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
-                try:
-                    # Liverpool search URL - try different approaches
-                    search_urls = [
-                        f"https://www.liverpool.com.mx/tienda/home/search?text={query.replace(' ', '%20')}",
-                        f"https://www.liverpool.com.mx/search?q={query.replace(' ', '+')}",
-                        f"https://www.liverpool.com.mx/tienda/home/search?q={query.replace(' ', '+')}",
-                        f"https://www.liverpool.com.mx/search?query={query.replace(' ', '+')}",
-                        f"https://www.liverpool.com.mx/tienda/search?q={query.replace(' ', '+')}"
-                    ]
-                    
-                    # Try each URL until one works
-                    for search_url in search_urls:
-                        try:
-                            print(f"🌐 Trying Liverpool URL: {search_url}")
-                            await page.goto(search_url, wait_until='domcontentloaded', timeout=15000)
-                            await page.wait_for_timeout(8000)  # Wait longer for JS to load
-                            
-                            # Check if page loaded successfully
-                            title = await page.title()
-                            if "Liverpool" in title or "producto" in title.lower():
-                                print(f"✅ Liverpool page loaded: {title}")
-                                
-                                # Wait for products to load dynamically
-                                try:
-                                    await page.wait_for_selector('.product-item, .item, .product, .product-card', timeout=10000)
-                                    print("✅ Liverpool products loaded dynamically")
-                                except:
-                                    print("⚠️ Liverpool products not loaded dynamically, trying anyway...")
-                                break
-                        except Exception as e:
-                            print(f"❌ Liverpool URL failed: {e}")
-                            continue
-                    
-                    # Try to find products with multiple strategies
-                    products = []
-                    
-                    # Strategy 1: Look for product cards with more selectors
-                    product_selectors = [
-                        '.product-item',
-                        '.product-card',
-                        '.item',
-                        '[data-testid="product-item"]',
-                        '.product',
-                        '.product-tile',
-                        '.tile-product',
-                        '.product-tile-item',
-                        '.product-grid-item',
-                        '.grid-item',
-                        '.search-result-item',
-                        '.product-list-item',
-                        '.item-product',
-                        '.product-container'
-                    ]
-                    
-                    product_elements = []
-                    for selector in product_selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                print(f"📦 Found {len(elements)} products with selector: {selector}")
-                                product_elements = elements
-                                break
-                        except:
-                            continue
-                    
-                    if not product_elements:
-                        # Strategy 2: Look for any elements with product-like content
-                        print("🔍 Liverpool trying fallback strategy...")
-                        all_elements = await page.query_selector_all('*')
-                        for element in all_elements[:300]:  # Check even more elements
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 20 and ('$' in text or 'peso' in text.lower() or 'precio' in text.lower() or 'iPhone' in text or 'producto' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 20:  # Even more products
-                                        break
-                            except:
-                                continue
-                    
-                    if not product_elements:
-                        # Strategy 3: Try to find any clickable elements that might be products
-                        print("🔍 Liverpool trying clickable elements strategy...")
-                        clickable_elements = await page.query_selector_all('a, button, [onclick], [data-testid]')
-                        for element in clickable_elements[:100]:
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 10 and ('$' in text or 'iPhone' in text or 'producto' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 10:
-                                        break
-                            except:
-                                continue
-                    
-                    if not product_elements:
-                        print("❌ Liverpool: No products found with any strategy")
-                        return []
-                    
-                    # Extract products
-                    for element in product_elements[:limit]:
-                        try:
-                            # Get all text content
-                            all_text = await element.inner_text()
-                            
-                            # Extract name (first meaningful line)
-                            lines = all_text.split('\n')
-                            name = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and len(line) > 10 and not line.startswith('$') and not line.startswith('peso'):
-                                    name = line
-                                    break
-                            
-                            if not name:
-                                continue
-                            
-                            # Extract price using regex
-                            import re
-                            price_patterns = [
-                                r'\$\s*[\d,]+',
-                                r'[\d,]+\s*pesos',
-                                r'[\d,]+\s*MXN'
-                            ]
-                            
-                            price = None
-                            for pattern in price_patterns:
-                                matches = re.findall(pattern, all_text)
-                                if matches:
-                                    price = matches[0]
-                                    break
-                            
-                            # If no pattern match, look for $ followed by numbers
-                            if not price:
-                                for line in lines:
-                                    if '$' in line and any(char.isdigit() for char in line):
-                                        price = line.strip()
-                                        break
-                            
-                            if not price:
-                                continue
-                            
-                            # Find URL
-                            link_elem = await element.query_selector('a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            # Find image
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.liverpool.com.mx{url}" if url else '',
-                                'image': image,
-                                'site': 'Liverpool'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            print(f"⚠️ Error processing Liverpool product: {e}")
-                            continue
-                    
-                    print(f"✅ Liverpool Improved: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ Liverpool Improved error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Liverpool Improved error: {e}")
-            return []
-    
-    async def search_coppel_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Coppel scraping"""
-        try:
-            print(f"🔍 Coppel: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
+        await self.close_browser()
+
+    async def close_browser(self):
+        """Close the warm browser and its site contexts (no-op without warm sessions)"""
+        for warm in self._retiring + ([self._warm] if self._warm else []):
+            await warm.close()
+        self._retiring = []
+        self._warm = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _acquire_context(self, adapter: SiteAdapter):
+        """Warm browser and context for adapter's site, launching or recycling the browser if needed"""
+        async with self._browser_lock:
+            warm = self._warm
+            if warm is not None:
+                reason = None
+                if not warm.browser.is_connected():
+                    reason = 'disconnected'
+                elif self.governor.should_recycle(warm.pages_served):
+                    reason = 'recycle'
+                if reason:
+                    print(f"♻️ Reciclando navegador compartido tras {warm.pages_served} páginas ({reason})")
+                    self.governor.note_recycle(reason)
+                    warm.retired = True
+                    self._warm = None
+                    if warm.in_flight:
+                        self._retiring.append(warm)
+                    else:
+                        await warm.close()
+
+            if self._warm is None:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                print("🌐 Iniciando navegador compartido para sesiones por sitio")
+                await self.governor.browsers.acquire()
                 try:
-                    search_url = f"https://www.coppel.com/buscar?q={query.replace(' ', '+')}"
-                    print(f"🌐 Navigating to: {search_url}")
-                    
-                    await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
-                    await page.wait_for_timeout(5000)
-                    
-                    # Look for products
-                    product_elements = []
-                    selectors = ['.product-item', '.item', '.product', '.product-card']
-                    
-                    for selector in selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                product_elements = elements
-                                break
-                        except:
-                            continue
-                    
-                    if not product_elements:
-                        # Fallback: look for elements with price content
-                        all_elements = await page.query_selector_all('*')
-                        for element in all_elements[:50]:
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 20 and ('$' in text or 'peso' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 10:
-                                        break
-                            except:
-                                continue
-                    
-                    products = []
-                    for element in product_elements[:limit]:
-                        try:
-                            all_text = await element.inner_text()
-                            lines = all_text.split('\n')
-                            
-                            # Extract name
-                            name = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and len(line) > 10 and not line.startswith('$'):
-                                    name = line
-                                    break
-                            
-                            if not name:
-                                continue
-                            
-                            # Extract price
-                            import re
-                            price = None
-                            for line in lines:
-                                if '$' in line and any(char.isdigit() for char in line):
-                                    price = line.strip()
-                                    break
-                            
-                            if not price:
-                                continue
-                            
-                            # Find URL and image
-                            link_elem = await element.query_selector('a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.coppel.com{url}" if url else '',
-                                'image': image,
-                                'site': 'Coppel'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            continue
-                    
-                    print(f"✅ Coppel: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ Coppel error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Coppel error: {e}")
-            return []
-    
-    async def search_elektra_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Elektra scraping"""
-        try:
-            print(f"🔍 Elektra: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
+                    browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+                except BaseException:
+                    await self.governor.browsers.release()
+                    raise
+                self._warm = _WarmBrowser(browser, self.governor)
+
+            warm = self._warm
+            context = warm.contexts.get(adapter.name)
+            if context is None:
+                await self._reserve_context(warm)
                 try:
-                    search_url = f"https://www.elektra.com.mx/buscar?q={query.replace(' ', '+')}"
-                    print(f"🌐 Navigating to: {search_url}")
-                    
-                    await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
-                    await page.wait_for_timeout(5000)
-                    
-                    # Look for products
-                    product_elements = []
-                    selectors = ['.product-item', '.item', '.product', '.product-card']
-                    
-                    for selector in selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                product_elements = elements
-                                break
-                        except:
-                            continue
-                    
-                    if not product_elements:
-                        # Fallback: look for elements with price content
-                        all_elements = await page.query_selector_all('*')
-                        for element in all_elements[:50]:
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 20 and ('$' in text or 'peso' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 10:
-                                        break
-                            except:
-                                continue
-                    
-                    products = []
-                    for element in product_elements[:limit]:
-                        try:
-                            all_text = await element.inner_text()
-                            lines = all_text.split('\n')
-                            
-                            # Extract name
-                            name = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and len(line) > 10 and not line.startswith('$'):
-                                    name = line
-                                    break
-                            
-                            if not name:
-                                continue
-                            
-                            # Extract price
-                            price = None
-                            for line in lines:
-                                if '$' in line and any(char.isdigit() for char in line):
-                                    price = line.strip()
-                                    break
-                            
-                            if not price:
-                                continue
-                            
-                            # Find URL and image
-                            link_elem = await element.query_selector('a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.elektra.com.mx{url}" if url else '',
-                                'image': image,
-                                'site': 'Elektra'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            continue
-                    
-                    print(f"✅ Elektra: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ Elektra error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Elektra error: {e}")
-            return []
-    
-    async def search_aurrera_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Aurrera scraping"""
-        try:
-            print(f"🔍 Aurrera: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
+                    context = await warm.browser.new_context(**session_state.context_options(adapter.name, CONTEXT_OPTIONS))
+                    await prepare_context(context, adapter.name)
+                except BaseException:
+                    await self.governor.contexts.release()
+                    raise
+                warm.contexts[adapter.name] = context
+            warm.pages_served += 1
+            warm.in_flight += 1
+            warm.site_in_flight[adapter.name] = warm.site_in_flight.get(adapter.name, 0) + 1
+            warm.last_used[adapter.name] = time.monotonic()
+            return warm, context
+
+    async def _reserve_context(self, warm: _WarmBrowser):
+        """Take a context slot, closing idle contexts (LRU) or waiting for a page to finish while at the cap"""
+        contexts = self.governor.contexts
+        while contexts.in_use >= contexts.limit:
+            idle = warm.idle_sites()
+            if idle:
+                await warm.drop(idle[0])
+                continue
+            self._page_released.clear()
+            await self._page_released.wait()
+        await contexts.acquire()
+
+    async def _release_context(self, warm: _WarmBrowser, site: str):
+        warm.in_flight -= 1
+        warm.site_in_flight[site] -= 1
+        if warm.retired and warm.in_flight == 0 and warm in self._retiring:
+            self._retiring.remove(warm)
+            await warm.close()
+        self._page_released.set()
+
+    async def _drop_site_context(self, warm: _WarmBrowser, site: str):
+        """Forget a warm context whose cookies led to a challenge; the next search starts clean"""
+        await warm.drop(site)
+
+    async def search_site(self, site: Union[str, SiteAdapter], query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Search one retailer with its adapter. Navigation/browser errors propagate to the caller."""
+        adapter = SITE_ADAPTERS[site] if isinstance(site, str) else site
+        print(f"🔍 {adapter.name}: Searching for '{query}'")
+
+        max_cards = max(limit, 1) * CARDS_PER_RESULT
+        async with self.limiter.site(adapter.name):
+            if adapter.fetch_tier == HTTP:
+                cards = await self._fetch_cards_http(adapter, query, max_cards)
+            else:
+                cards = await self._fetch_cards_browser(adapter, query, max_cards)
+
+        products = []
+        for card in cards:
+            product = parse_card(adapter, card)
+            if product:
+                products.append(product)
+                if len(products) >= limit:
+                    break
+
+        print(f"✅ {adapter.name}: Found {len(products)} products ({len(cards)} cards)")
+        return products
+
+    async def _fetch_cards_browser(self, adapter: SiteAdapter, query: str, max_cards: int) -> List[Dict[str, Any]]:
+        if self.warm_sessions:
+            async with self.governor.page():
+                warm, context = await self._acquire_context(adapter)
                 try:
-                    # Try different Aurrera URLs
-                    search_urls = [
-                        f"https://www.aurrera.com.mx/search?q={query.replace(' ', '+')}",
-                        f"https://www.aurrera.com.mx/buscar?q={query.replace(' ', '+')}",
-                        f"https://www.aurrera.com.mx/tienda/search?q={query.replace(' ', '+')}",
-                        f"https://www.aurrera.com.mx/search?query={query.replace(' ', '+')}",
-                        f"https://www.aurrera.com.mx/search?text={query.replace(' ', '+')}"
-                    ]
-                    
-                    for search_url in search_urls:
-                        try:
-                            print(f"🌐 Trying Aurrera URL: {search_url}")
-                            await page.goto(search_url, wait_until='domcontentloaded', timeout=15000)
-                            await page.wait_for_timeout(3000)
-                            
-                            # Check if page loaded
-                            title = await page.title()
-                            if "Aurrera" in title or "Walmart" in title:
-                                print(f"✅ Aurrera page loaded: {title}")
-                                break
-                        except Exception as e:
-                            print(f"❌ Aurrera URL failed: {e}")
-                            continue
-                    
-                    # Look for products
-                    product_elements = []
-                    selectors = ['.product-item', '.item', '.product', '.product-card']
-                    
-                    for selector in selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                product_elements = elements
-                                break
-                        except:
-                            continue
-                    
-                    if not product_elements:
-                        # Fallback: look for elements with price content
-                        all_elements = await page.query_selector_all('*')
-                        for element in all_elements[:50]:
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 20 and ('$' in text or 'peso' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 10:
-                                        break
-                            except:
-                                continue
-                    
-                    products = []
-                    for element in product_elements[:limit]:
+                    page = await context.new_page()
+                    try:
+                        cards = await self._extract_from_page(page, adapter, query, max_cards)
+                    except session_state.ChallengePageError:
+                        await self._drop_site_context(warm, adapter.name)
+                        raise
+                    finally:
                         try:
-                            all_text = await element.inner_text()
-                            lines = all_text.split('\n')
-                            
-                            # Extract name
-                            name = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and len(line) > 10 and not line.startswith('$'):
-                                    name = line
-                                    break
-                            
-                            if not name:
-                                continue
-                            
-                            # Extract price
-                            price = None
-                            for line in lines:
-                                if '$' in line and any(char.isdigit() for char in line):
-                                    price = line.strip()
-                                    break
-                            
-                            if not price:
-                                continue
-                            
-                            # Find URL and image
-                            link_elem = await element.query_selector('a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.aurrera.com.mx{url}" if url else '',
-                                'image': image,
-                                'site': 'Aurrera'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            continue
-                    
-                    print(f"✅ Aurrera: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ Aurrera error: {e}")
-                    return []
+                            await page.close()
+                        except Exception:
+                            pass
+                    if cards:
+                        await session_state.remember(adapter.name, context)
+                    return cards
                 finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Aurrera error: {e}")
-            return []
-    
-    async def search_costco_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Costco scraping"""
-        try:
-            print(f"🔍 Costco: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
+                    await self._release_context(warm, adapter.name)
+
+        async with self.governor.browser(), async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+            try:
+                context = await browser.new_context(**session_state.context_options(adapter.name, CONTEXT_OPTIONS))
+                await prepare_context(context, adapter.name)
                 page = await context.new_page()
-                
-                try:
-                    # Try different Costco URLs
-                    search_urls = [
-                        f"https://www.costco.com.mx/search?keyword={query.replace(' ', '+')}",
-                        f"https://www.costco.com.mx/search?q={query.replace(' ', '+')}",
-                        f"https://www.costco.com.mx/search?text={query.replace(' ', '+')}",
-                        f"https://www.costco.com.mx/search?query={query.replace(' ', '+')}",
-                        f"https://www.costco.com.mx/search?search={query.replace(' ', '+')}"
-                    ]
-                    
-                    for search_url in search_urls:
-                        try:
-                            print(f"🌐 Trying Costco URL: {search_url}")
-                            await page.goto(search_url, wait_until='domcontentloaded', timeout=15000)
-                            await page.wait_for_timeout(3000)
-                            
-                            # Check if page loaded
-                            title = await page.title()
-                            if "Costco" in title or "producto" in title.lower():
-                                print(f"✅ Costco page loaded: {title}")
-                                break
-                        except Exception as e:
-                            print(f"❌ Costco URL failed: {e}")
-                            continue
-                    
-                    # Look for products
-                    product_elements = []
-                    selectors = ['.product-item', '.item', '.product', '.product-card']
-                    
-                    for selector in selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                product_elements = elements
-                                break
-                        except:
-                            continue
-                    
-                    if not product_elements:
-                        # Fallback: look for elements with price content
-                        all_elements = await page.query_selector_all('*')
-                        for element in all_elements[:50]:
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 20 and ('$' in text or 'peso' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 10:
-                                        break
-                            except:
-                                continue
-                    
-                    products = []
-                    for element in product_elements[:limit]:
-                        try:
-                            all_text = await element.inner_text()
-                            lines = all_text.split('\n')
-                            
-                            # Extract name
-                            name = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and len(line) > 10 and not line.startswith('$'):
-                                    name = line
-                                    break
-                            
-                            if not name:
-                                continue
-                            
-                            # Extract price
-                            price = None
-                            for line in lines:
-                                if '$' in line and any(char.isdigit() for char in line):
-                                    price = line.strip()
-                                    break
-                            
-                            if not price:
-                                continue
-                            
-                            # Find URL and image
-                            link_elem = await element.query_selector('a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.costco.com.mx{url}" if url else '',
-                                'image': image,
-                                'site': 'Costco'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            continue
-                    
-                    print(f"✅ Costco: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ Costco error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Costco error: {e}")
-            return []
-    
-    async def search_sams_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Sams scraping"""
+                cards = await self._extract_from_page(page, adapter, query, max_cards)
+                if cards:
+                    await session_state.remember(adapter.name, context)
+                return cards
+            finally:
+                await browser.close()
+
+    async def _extract_from_page(self, page, adapter: SiteAdapter, query: str, max_cards: int) -> List[Dict[str, Any]]:
+        """Load the first usable results page and pull its cards in one evaluate()"""
+        urls = adapter.search_urls(query)
+        last_error = None
+        loaded = False
+        for search_url in urls:
+            try:
+                print(f"🌐 Navigating to: {search_url}")
+                await page.goto(search_url, wait_until='domcontentloaded', timeout=adapter.goto_timeout_ms)
+                loaded = True
+                if len(urls) == 1 or not adapter.title_keywords:
+                    break
+                title = (await page.title()).lower()
+                if any(keyword.lower() in title for keyword in adapter.title_keywords):
+                    print(f"✅ {adapter.name} page loaded: {title}")
+                    break
+            except Exception as e:
+                last_error = e
+                print(f"❌ {adapter.name} URL failed: {e}")
+        if not loaded:
+            raise last_error or RuntimeError(f"{adapter.name}: no search URL loaded")
+        if await session_state.is_challenge(page):
+            session_state.invalidate(adapter.name)
+            raise session_state.ChallengePageError(f"{adapter.name}: página de verificación anti-bot ({page.url})")
+
+        # Wait for the first card (bounded by settle_ms) instead of sleeping a fixed time
         try:
-            print(f"🔍 Sams: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
-                try:
-                    search_url = f"https://www.sams.com.mx/search?q={query.replace(' ', '+')}"
-                    print(f"🌐 Navigating to: {search_url}")
-                    
-                    await page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
-                    await page.wait_for_timeout(5000)
-                    
-                    # Look for products
-                    product_elements = []
-                    selectors = ['.product-item', '.item', '.product', '.product-card']
-                    
-                    for selector in selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                product_elements = elements
-                                break
-                        except:
-                            continue
-                    
-                    if not product_elements:
-                        # Fallback: look for elements with price content
-                        all_elements = await page.query_selector_all('*')
-                        for element in all_elements[:50]:
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 20 and ('$' in text or 'peso' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 10:
-                                        break
-                            except:
-                                continue
-                    
-                    products = []
-                    for element in product_elements[:limit]:
-                        try:
-                            all_text = await element.inner_text()
-                            lines = all_text.split('\n')
-                            
-                            # Extract name
-                            name = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and len(line) > 10 and not line.startswith('$'):
-                                    name = line
-                                    break
-                            
-                            if not name:
-                                continue
-                            
-                            # Extract price
-                            price = None
-                            for line in lines:
-                                if '$' in line and any(char.isdigit() for char in line):
-                                    price = line.strip()
-                                    break
-                            
-                            if not price:
-                                continue
-                            
-                            # Find URL and image
-                            link_elem = await element.query_selector('a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.sams.com.mx{url}" if url else '',
-                                'image': image,
-                                'site': 'Sams'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            continue
-                    
-                    print(f"✅ Sams: Found {len(products)} products")
-                    return products
-                    
-                except Exception as e:
-                    print(f"❌ Sams error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Sams error: {e}")
-            return []
-    
-    async def search_samsung_scraping(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Samsung scraping"""
+            await page.wait_for_selector(', '.join(adapter.card_selectors), timeout=adapter.settle_ms)
+            await page.wait_for_load_state('networkidle', timeout=NETWORK_IDLE_MS)
+        except Exception:
+            pass
+
+        return await page.evaluate(EXTRACT_CARDS_JS, _extraction_spec(adapter, max_cards))
+
+    async def _fetch_cards_http(self, adapter: SiteAdapter, query: str, max_cards: int) -> List[Dict[str, Any]]:
+        session = self.session or network_archive.client_session(headers={'User-Agent': USER_AGENT, 'Accept-Language': 'es-MX'})
         try:
-            print(f"🔍 Samsung: Searching for '{query}'")
-            
-            async with async_playwright() as playwright:
-                browser = await playwright.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-                )
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    viewport={'width': 1920, 'height': 1080},
-                    locale='es-MX'
-                )
-                page = await context.new_page()
-                
+            last_error = None
+            for search_url in adapter.search_urls(query):
                 try:
-                    # Try different Samsung URLs
-                    search_urls = [
-                        f"https://www.samsung.com/mx/search/?searchvalue={query.replace(' ', '+')}",
-                        f"https://www.samsung.com/mx/search?q={query.replace(' ', '+')}",
-                        f"https://www.samsung.com/mx/search?query={query.replace(' ', '+')}"
-                    ]
-                    
-                    for search_url in search_urls:
-                        try:
-                            print(f"🌐 Trying Samsung URL: {search_url}")
-                            await page.goto(search_url, wait_until='domcontentloaded', timeout=15000)
-                            await page.wait_for_timeout(3000)
-                            
-                            # Check if page loaded
-                            title = await page.title()
-                            if "Samsung" in title or "producto" in title.lower():
-                                print(f"✅ Samsung page loaded: {title}")
-                                break
-                        except Exception as e:
-                            print(f"❌ Samsung URL failed: {e}")
-                            continue
-                    
-                    # Look for products with Samsung-specific selectors
-                    product_elements = []
-                    selectors = [
-                        '.product-item', '.item', '.product', '.product-card',
-                        '.product-tile', '.tile-product', '.product-tile-item',
-                        '.product-grid-item', '.grid-item', '.search-result-item',
-                        '.product-list-item', '.item-product', '.product-container',
-                        '.samsung-product', '.product-box', '.product-wrapper'
-                    ]
-                    
-                    for selector in selectors:
-                        try:
-                            elements = await page.query_selector_all(selector)
-                            if elements:
-                                print(f"📦 Samsung found {len(elements)} products with selector: {selector}")
-                                product_elements = elements
-                                break
-                        except:
-                            continue
-                    
-                    if not product_elements:
-                        # Fallback: look for elements with price content
-                        print("🔍 Samsung trying fallback strategy...")
-                        all_elements = await page.query_selector_all('*')
-                        for element in all_elements[:200]:  # Check even more elements
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 20 and ('$' in text or 'peso' in text.lower() or 'precio' in text.lower() or 'iPhone' in text or 'producto' in text.lower() or 'samsung' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 20:  # Even more products
-                                        break
-                            except:
-                                continue
-                    
-                    if not product_elements:
-                        # Strategy 3: Try to find any clickable elements that might be products
-                        print("🔍 Samsung trying clickable elements strategy...")
-                        clickable_elements = await page.query_selector_all('a, button, [onclick], [data-testid]')
-                        for element in clickable_elements[:100]:
-                            try:
-                                text = await element.inner_text()
-                                if text and len(text) > 10 and ('$' in text or 'iPhone' in text or 'producto' in text.lower() or 'samsung' in text.lower()):
-                                    product_elements.append(element)
-                                    if len(product_elements) >= 10:
-                                        break
-                            except:
-                                continue
-                    
-                    products = []
-                    for element in product_elements[:limit]:
-                        try:
-                            all_text = await element.inner_text()
-                            lines = all_text.split('\n')
-                            
-                            # Extract name
-                            name = None
-                            for line in lines:
-                                line = line.strip()
-                                if line and len(line) > 10 and not line.startswith('$'):
-                                    name = line
-                                    break
-                            
-                            if not name:
-                                continue
-                            
-                            # Extract price
-                            price = None
-                            for line in lines:
-                                if '$' in line and any(char.isdigit() for char in line):
-                                    price = line.strip()
-                                    break
-                            
-                            if not price:
-                                continue
-                            
-                            # Find URL and image
-                            link_elem = await element.query_selector('a')
-                            url = await link_elem.get_attribute('href') if link_elem else ''
-                            
-                            img_elem = await element.query_selector('img')
-                            image = await img_elem.get_attribute('src') if img_elem else ''
-                            
-                            product = {
-                                'name': name.strip(),
-                                'price': price.strip(),
-                                'url': f"https://www.samsung.com{url}" if url else '',
-                                'image': image,
-                                'site': 'Samsung'
-                            }
-                            products.append(product)
-                                
-                        except Exception as e:
-                            continue
-                    
-                    print(f"✅ Samsung: Found {len(products)} products")
-                    return products
-                    
+                    print(f"🌐 Fetching: {search_url}")
+                    timeout = aiohttp.ClientTimeout(total=adapter.goto_timeout_ms / 1000)
+                    async with session.get(search_url, timeout=timeout) as response:
+                        response.raise_for_status()
+                        html = await response.text()
+                    cards = _extract_cards_from_html(html, adapter, max_cards)
+                    if cards:
+                        return cards
                 except Exception as e:
-                    print(f"❌ Samsung error: {e}")
-                    return []
-                finally:
-                    await browser.close()
-                    
-        except Exception as e:
-            print(f"❌ Samsung error: {e}")
+                    last_error = e
+                    print(f"❌ {adapter.name} URL failed: {e}")
+            if last_error:
+                raise last_error
             return []
+        finally:
+            if session is not self.session:
+                await session.close()
 
 # Unified free client
 class UnifiedFreeAPIClient:
     """Unified client using free APIs and improved scraping"""
-    
-    def __init__(self):
-        self.free_client = FreeAPIClient()
-        self.site_semaphore = asyncio.Semaphore(5)  # Limit to 5 concurrent sites
-    
-    async def search_all_sites_free(self, query: str, limit_per_site: int = 5) -> Dict[str, List[Dict[str, Any]]]:
-        """Search all sites using free methods with limited concurrency"""
-        print(f"🚀 Free APIs: Searching '{query}' across ALL sites...")
-        
-        # Create semaphore-limited tasks for all sites
-        async def limited_search(site_name, search_func):
-            async with self.site_semaphore:
-                try:
-                    return await search_func(query, limit_per_site)
-                except Exception as e:
-                    print(f"❌ {site_name} error: {e}")
-                    return []
-        
-        tasks = [
-            limited_search("MercadoLibre", self.free_client.search_mercadolibre_free),
-            limited_search("Amazon", self.free_client.search_amazon_improved_scraping),
-            limited_search("Walmart", self.free_client.search_walmart_improved_scraping),
-            limited_search("Liverpool", self.free_client.search_liverpool_improved_scraping),
-            limited_search("Coppel", self.free_client.search_coppel_scraping),
-            limited_search("Elektra", self.free_client.search_elektra_scraping),
-            limited_search("Aurrera", self.free_client.search_aurrera_scraping),
-            limited_search("Costco", self.free_client.search_costco_scraping),
-            limited_search("Sams", self.free_client.search_sams_scraping),
-            limited_search("Samsung", self.free_client.search_samsung_scraping)
-        ]
-        
-        # Execute all tasks in parallel with limited concurrency
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Organize results
+
+    def __init__(self, warm_sessions: bool = False):
+        self.free_client = FreeAPIClient(warm_sessions=warm_sessions)
+        self.site_searches = get_limiter().stage('site_search')
+        self.breakers = get_breaker_board()
+
+    async def __aenter__(self):
+        await self.free_client.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.free_client.__aexit__(exc_type, exc_val, exc_tb)
+
+    def _adapters(self, sites: Optional[List[str]] = None) -> List[SiteAdapter]:
+        adapters = configured_adapters()
+        if sites:
+            adapters = [adapter for adapter in adapters if adapter.name in sites]
+        return adapters
+
+    async def _search_site(self, adapter: SiteAdapter, query: str, limit_per_site: int, skipped: set) -> List[Dict[str, Any]]:
+        """One (site, query) search behind the global slot limit and the site's circuit breaker"""
+        site_name = adapter.name
+        # Sitios con el circuito abierto no cuestan nada hasta que les toque la prueba
+        if not self.breakers.allow(site_name):
+            skipped.add(site_name)
+            metrics.SITE_SEARCHES.labels(site_name, 'skipped').inc()
+            return []
+
+        async with self.site_searches:
+            outcome = 'error'
+            started = time.perf_counter()
+            try:
+                with profiler.span(f'site_search.{site_name}', query):
+                    results = await self.free_client.search_site(adapter, query, limit_per_site)
+                outcome = 'ok' if results else 'empty'
+                return results
+            except asyncio.CancelledError:
+                outcome = 'cancelled'
+                raise
+            except Exception as e:
+                print(f"❌ {site_name} error: {e}")
+                return []
+            finally:
+                metrics.record_site_search(site_name, time.perf_counter() - started, outcome)
+                if outcome == 'ok':
+                    self.breakers.record_success(site_name)
+                elif outcome == 'cancelled':
+                    self.breakers.release(site_name)
+                else:
+                    self.breakers.record_failure(site_name, outcome)
+                metrics.SITE_CIRCUIT_STATE.labels(site_name).set(
+                    metrics.CIRCUIT_STATES.index(self.breakers.state(site_name))
+                )
+
+    async def search_all_sites_free(self, query: str, limit_per_site: int = 5,
+                                    sites: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Search every enabled site (or only `sites`) with limited concurrency"""
+        adapters = self._adapters(sites)
+        print(f"🚀 Free APIs: Searching '{query}' across {len(adapters)} sites...")
+
+        skipped = set()
+        # Heaviest sites first, so they get the first search slots
+        results = await asyncio.gather(
+            *(self._search_site(adapter, query, limit_per_site, skipped) for adapter in adapters),
+            return_exceptions=True
+        )
+
         all_results = {
-            'MercadoLibre': results[0] if not isinstance(results[0], Exception) else [],
-            'Amazon': results[1] if not isinstance(results[1], Exception) else [],
-            'Walmart': results[2] if not isinstance(results[2], Exception) else [],
-            'Liverpool': results[3] if not isinstance(results[3], Exception) else [],
-            'Coppel': results[4] if not isinstance(results[4], Exception) else [],
-            'Elektra': results[5] if not isinstance(results[5], Exception) else [],
-            'Aurrera': results[6] if not isinstance(results[6], Exception) else [],
-            'Costco': results[7] if not isinstance(results[7], Exception) else [],
-            'Sams': results[8] if not isinstance(results[8], Exception) else [],
-            'Samsung': results[9] if not isinstance(results[9], Exception) else []
+            adapter.name: result if not isinstance(result, BaseException) else []
+            for adapter, result in zip(adapters, results)
         }
-        
-        # Print summary
+        self._print_summary(all_results, skipped)
+        return all_results
+
+    async def search_many(self, queries: List[str], limit_per_site: int = 5,
+                          sites: Optional[List[str]] = None) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Search every query on every site; returns {query: {site: products}}.
+
+        Meant for a client created with warm_sessions=True: each site's context
+        is set up once and the whole query list walks through it.
+        """
+        adapters = self._adapters(sites)
+        queries = list(dict.fromkeys(queries))
+        print(f"🚀 Free APIs: {len(queries)} búsquedas en {len(adapters)} sitios...")
+
+        skipped = set()
+        # Query-major order, so every site has work queued from the start
+        pairs = [(query, adapter) for query in queries for adapter in adapters]
+        results = await asyncio.gather(
+            *(self._search_site(adapter, query, limit_per_site, skipped) for query, adapter in pairs),
+            return_exceptions=True
+        )
+
+        by_query: Dict[str, Dict[str, List[Dict[str, Any]]]] = {query: {} for query in queries}
+        for (query, adapter), result in zip(pairs, results):
+            by_query[query][adapter.name] = result if not isinstance(result, BaseException) else []
+
+        per_site = {
+            adapter.name: [product for query in queries for product in by_query[query][adapter.name]]
+            for adapter in adapters
+        }
+        self._print_summary(per_site, skipped)
+        return by_query
+
+    @staticmethod
+    def _print_summary(all_results: Dict[str, List[Dict[str, Any]]], skipped: set):
         total_products = sum(len(products) for products in all_results.values())
         working_sites = sum(1 for products in all_results.values() if len(products) > 0)
-        
+
         print(f"📊 Free APIs Summary: {total_products} total products found")
-        print(f"🎯 Working sites: {working_sites}/{len(all_results)}")
+        print(f"🎯 Working sites: {working_sites}/{len(all_results)}" + (f" ({len(skipped)} omitidos por circuito abierto)" if skipped else ""))
         for site, products in all_results.items():
-            status = "✅" if len(products) > 0 else "❌"
+            status = "⏭️" if site in skipped and not products else "✅" if len(products) > 0 else "❌"
             print(f"   {status} {site}: {len(products)} products")
-        
-        return all_results
 
 # Convenience function
 async def search_products_free(query: str, limit_per_site: int = 5) -> Dict[str, List[Dict[str, Any]]]:
@@ -1454,4 +606,3 @@ async def search_products_free(query: str, limit_per_site: int = 5) -> Dict[str,
     client = UnifiedFreeAPIClient()
     async with client.free_client:
         return await client.search_all_sites_free(query, limit_per_site)
-
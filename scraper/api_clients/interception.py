@@ -0,0 +1,107 @@
+"""
+Request interception profile for scraping contexts.
+
+Every context that goes through prepare_context() gets a route handler that
+aborts requests the extraction never needs: images, media, fonts and
+stylesheets by resource type, and trackers/ad networks by domain. Documents,
+scripts and XHR from the retailer itself go through, so client-rendered
+results still appear.
+
+Sites that need something from the blocked set get a per-site allowlist in
+SITE_ALLOWLISTS, or in config/sites.json ("allow_resources" with resource
+types, "allow_domains" with domains). SCRAPER_BLOCK_RESOURCES=0 turns the
+whole layer off.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Optional
+from urllib.parse import urlsplit
+
+from app.browser_hooks import register_context_hook
+from app import metrics
+from api_clients.site_adapters import load_site_config
+
+ENABLED = os.getenv("SCRAPER_BLOCK_RESOURCES", "1").lower() not in ("0", "false", "no")
+
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+
+# Matched against the request host and each of its parent domains
+BLOCKED_DOMAINS = frozenset({
+    # Ads
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "adservice.google.com",
+    "adnxs.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com", "rubiconproject.com",
+    "pubmatic.com", "amazon-adsystem.com", "mercadoads.com", "adsrvr.org", "smartadserver.com",
+    # Analytics and tag managers
+    "google-analytics.com", "googletagmanager.com", "analytics.google.com",
+    "connect.facebook.net", "scorecardresearch.com", "quantserve.com", "hotjar.com", "clarity.ms",
+    "bat.bing.com", "analytics.tiktok.com", "segment.io", "segment.com", "amplitude.com",
+    "mixpanel.com", "newrelic.com", "nr-data.net", "fullstory.com", "quantummetric.com",
+    "branch.io", "appsflyer.com", "demdex.net", "omtrdc.net", "everesttech.net",
+})
+
+# Stylesheets stay on for the sites scraped by text scans: innerText skips
+# content the site's CSS hides, and without CSS that noise lands in the cards
+SITE_ALLOWLISTS: Dict[str, Dict[str, Iterable[str]]] = {
+    "Liverpool": {"resources": ("stylesheet",)},
+    "Samsung": {"resources": ("stylesheet",)},
+}
+
+@dataclass(frozen=True)
+class InterceptionProfile:
+    blocked_types: FrozenSet[str]
+    blocked_domains: FrozenSet[str]
+    allowed_domains: FrozenSet[str] = frozenset()
+
+    def block_reason(self, resource_type: str, url: str) -> Optional[str]:
+        """'type' or 'domain' if the request should be aborted, None to let it through"""
+        host = urlsplit(url).hostname or ""
+        if _matches(host, self.allowed_domains):
+            return None
+        if resource_type in self.blocked_types:
+            return "type"
+        if _matches(host, self.blocked_domains):
+            return "domain"
+        return None
+
+def _matches(host: str, domains: FrozenSet[str]) -> bool:
+    """host or one of its parent domains is in domains (one set lookup per label)"""
+    if not domains or not host:
+        return False
+    labels = host.split(".")
+    return any(".".join(labels[i:]) in domains for i in range(len(labels) - 1))
+
+_profiles: Dict[str, InterceptionProfile] = {}
+
+def profile_for(site: str) -> InterceptionProfile:
+    """Default profile minus the site's allowlist (cached per site)"""
+    if site not in _profiles:
+        allow = SITE_ALLOWLISTS.get(site, {})
+        config = load_site_config().get(site, {})
+        allowed_types = set(allow.get("resources", ())) | set(config.get("allow_resources", ()))
+        allowed_domains = set(allow.get("domains", ())) | set(config.get("allow_domains", ()))
+        _profiles[site] = InterceptionProfile(
+            blocked_types=BLOCKED_RESOURCE_TYPES - allowed_types,
+            blocked_domains=BLOCKED_DOMAINS,
+            allowed_domains=frozenset(allowed_domains),
+        )
+    return _profiles[site]
+
+async def _intercept_context(context, site: str):
+    if not ENABLED:
+        return
+    profile = profile_for(site)
+
+    async def handle(route):
+        request = route.request
+        reason = profile.block_reason(request.resource_type, request.url)
+        if reason:
+            metrics.REQUESTS_BLOCKED.labels(site, reason).inc()
+            await route.abort("blockedbyclient")
+        else:
+            # Leave the request to routes registered before this one (or the network)
+            await route.fallback()
+
+    await context.route("**/*", handle)
+
+register_context_hook(_intercept_context)
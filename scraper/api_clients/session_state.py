@@ -0,0 +1,80 @@
+"""
+Per-site browser storage state (cookies and localStorage) kept between runs.
+
+After a search that produced results, the context's storage_state() is saved
+in the scraper state dir; new contexts for that site start from it, so
+consent banners, location prompts and first-visit redirects are already
+dealt with. Snapshots expire after SESSION_STATE_TTL_SECONDS and are dropped
+as soon as a site answers with a bot challenge, since the cookies that led
+there are the ones to get rid of.
+"""
+
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from app.state import read_json, state_path, write_json
+
+SESSION_STATE_TTL_SECONDS = float(os.getenv("SESSION_STATE_TTL_SECONDS", str(12 * 3600)))
+# A warm context succeeds on every query; one snapshot per site per interval is enough
+SAVE_INTERVAL_SECONDS = float(os.getenv("SESSION_STATE_SAVE_INTERVAL_SECONDS", "300"))
+
+# Title/URL markers of challenge and block pages (Amazon captcha, PerimeterX,
+# Cloudflare, Akamai, Google's unusual traffic page)
+CHALLENGE_MARKERS = (
+    "captcha", "robot check", "are you a human", "pardon our interruption", "access denied",
+    "just a moment", "attention required", "unusual traffic", "verifica que eres humano",
+    "/errors/validatecaptcha", "px-captcha", "cf-chl", "/sorry/index",
+)
+
+_last_saved: Dict[str, float] = {}
+
+def _file_name(site: str) -> str:
+    return f"storage_{re.sub(r'[^A-Za-z0-9_.-]', '_', site)}.json"
+
+def load(site: str) -> Optional[Dict[str, Any]]:
+    """Saved storage state for site, or None if missing or expired"""
+    saved = read_json(_file_name(site))
+    if not saved or time.time() - saved.get("saved_at", 0) > SESSION_STATE_TTL_SECONDS:
+        return None
+    return saved.get("state")
+
+def context_options(site: str, base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """new_context() kwargs: base options plus the site's saved state, if any"""
+    options = dict(base or {})
+    state = load(site)
+    if state:
+        options["storage_state"] = state
+    return options
+
+async def remember(site: str, context, force: bool = False):
+    """Snapshot context after a successful search (at most once per SAVE_INTERVAL_SECONDS)"""
+    now = time.time()
+    if not force and now - _last_saved.get(site, 0) < SAVE_INTERVAL_SECONDS:
+        return
+    _last_saved[site] = now
+    try:
+        state = await context.storage_state()
+        write_json(_file_name(site), {"saved_at": now, "state": state})
+    except Exception as e:
+        print(f"⚠️ No se pudo guardar la sesión de {site}: {e}")
+
+def invalidate(site: str):
+    _last_saved.pop(site, None)
+    try:
+        os.unlink(state_path(_file_name(site)))
+        print(f"🧹 {site}: sesión guardada descartada")
+    except FileNotFoundError:
+        pass
+
+async def is_challenge(page) -> bool:
+    """Whether page is a captcha / bot-check page instead of results"""
+    try:
+        haystack = f"{page.url} {await page.title()}".lower()
+    except Exception:
+        return False
+    return any(marker in haystack for marker in CHALLENGE_MARKERS)
+
+class ChallengePageError(RuntimeError):
+    """The site answered with a bot challenge instead of results"""
@@ -0,0 +1,326 @@
+"""
+Declarative site adapters for the retail search engine in free_apis.py.
+
+Each retailer is a SiteAdapter spec: search URL templates, fetch tier, card
+selectors (plus text-scan fallbacks), title/price/url/image selectors and a
+price parser. The shared engine (FreeAPIClient.search_site) runs any spec, so
+an engine improvement applies to every site and adding a retailer means adding
+one entry to SITE_ADAPTERS.
+
+Which sites run, their fetch tier and their weight come from
+config/sites.json; SCRAPER_SITES (comma separated) narrows the list for a run.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+SITES_CONFIG_FILE = os.getenv(
+    "SCRAPER_SITES_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "sites.json")
+)
+
+# Fetch tiers: a full Playwright page, or one plain GET parsed with selectolax
+# (only for server-rendered result pages)
+BROWSER = "browser"
+HTTP = "http"
+
+PRICE_PATTERNS = [
+    r'\$\s*[\d,]+',
+    r'[\d,]+\s*pesos',
+    r'[\d,]+\s*MXN'
+]
+
+def price_from_dollar_line(text: str) -> Optional[str]:
+    """First line that has a $ and a digit"""
+    for line in text.split('\n'):
+        if '$' in line and any(char.isdigit() for char in line):
+            return line.strip()
+    return None
+
+def price_from_patterns(text: str) -> Optional[str]:
+    """$ / pesos / MXN amounts, falling back to the first line with a $"""
+    for pattern in PRICE_PATTERNS:
+        matches = re.findall(pattern, text)
+        if matches:
+            return matches[0]
+    return price_from_dollar_line(text)
+
+def looks_like_price(text: str) -> bool:
+    return '$' in text or 'MXN' in text or text.replace('.', '').replace(',', '').isdigit()
+
+@dataclass(frozen=True)
+class TextScan:
+    """Fallback when no card selector matches: keep elements whose text looks like a product"""
+    selector: str
+    scan: int
+    keep: int
+    min_length: int
+    keywords: Tuple[str, ...]
+
+DEFAULT_SCAN = TextScan('*', scan=50, keep=10, min_length=20, keywords=('$', 'peso'))
+
+@dataclass
+class SiteAdapter:
+    name: str
+    base_url: str
+    # {query_plus}, {query_dash} and {query_pct} are filled in; several templates are tried in order
+    url_templates: List[str]
+    card_selectors: List[str]
+    fetch_tier: str = BROWSER
+    fallback_scans: List[TextScan] = field(default_factory=lambda: [DEFAULT_SCAN])
+    # Empty: the title is the first meaningful line of the card text
+    title_selectors: List[str] = field(default_factory=list)
+    title_from_image: bool = False
+    title_skip_prefixes: Tuple[str, ...] = ('$',)
+    # Empty: price_parser runs over the card text
+    price_selectors: List[str] = field(default_factory=list)
+    price_parser: Callable[[str], Optional[str]] = price_from_dollar_line
+    url_selectors: List[str] = field(default_factory=lambda: ['a'])
+    image_selector: str = 'img'
+    # With several URL templates, the first page whose title has one of these wins
+    title_keywords: Tuple[str, ...] = ()
+    goto_timeout_ms: int = 30000
+    # Upper bound on waiting for cards after load (the old code slept this long unconditionally)
+    settle_ms: int = 5000
+    weight: float = 1.0
+    enabled: bool = True
+
+    def search_urls(self, query: str) -> List[str]:
+        values = {
+            'query_plus': query.replace(' ', '+'),
+            'query_dash': query.replace(' ', '-'),
+            'query_pct': query.replace(' ', '%20'),
+        }
+        return [template.format(**values) for template in self.url_templates]
+
+# Card selectors most retailers fall back to
+GENERIC_CARDS = ['.product-item', '.item', '.product', '.product-card']
+
+SITE_ADAPTERS: Dict[str, SiteAdapter] = {}
+
+def register_site_adapter(adapter: SiteAdapter) -> SiteAdapter:
+    SITE_ADAPTERS[adapter.name] = adapter
+    return adapter
+
+register_site_adapter(SiteAdapter(
+    name='MercadoLibre',
+    base_url='https://listado.mercadolibre.com.mx',
+    url_templates=['https://listado.mercadolibre.com.mx/{query_dash}'],
+    card_selectors=[
+        '.ui-search-layout__item',
+        '.ui-search-item',
+        '.ui-search-results .ui-search-item',
+        '[data-testid="product"]',
+        '.item',
+        '.ui-search-item__wrapper'
+    ],
+    fallback_scans=[],
+    title_from_image=True,
+    price_parser=price_from_patterns,
+    url_selectors=['a', '.ui-search-link', '[data-testid="product-link"]'],
+))
+
+register_site_adapter(SiteAdapter(
+    name='Amazon',
+    base_url='https://www.amazon.com.mx',
+    url_templates=['https://www.amazon.com.mx/s?k={query_plus}'],
+    card_selectors=[
+        '[data-component-type="s-search-result"]',
+        '.s-result-item',
+        '[data-asin]',
+        '.s-card-container'
+    ],
+    fallback_scans=[],
+    title_selectors=[
+        'h2 a span',
+        'h2 span',
+        '.s-size-mini span',
+        'h2',
+        '.s-link-style',
+        '[data-cy="title-recipe-title"]',
+        '.s-title-instructions-style'
+    ],
+    price_selectors=[
+        '.a-price-whole',
+        '.a-price .a-offscreen',
+        '.a-price-range',
+        '.a-price-symbol',
+        '[data-a-price-amount]',
+        '.a-price',
+        '.a-offscreen'
+    ],
+    url_selectors=['h2 a'],
+))
+
+register_site_adapter(SiteAdapter(
+    name='Walmart',
+    base_url='https://www.walmart.com.mx',
+    url_templates=['https://www.walmart.com.mx/search?q={query_plus}'],
+    card_selectors=[
+        '[data-automation-id="product-title"]',
+        '.product-title',
+        '.item-title',
+        '[data-testid="product-title"]',
+        '.product-item',
+        '.item',
+        '.product',
+        '[data-testid="product"]',
+        '.product-card',
+        '.search-result-item'
+    ],
+    fallback_scans=[TextScan('*', scan=100, keep=10, min_length=20, keywords=('$', 'peso'))],
+    title_skip_prefixes=('$', 'peso'),
+    price_parser=price_from_patterns,
+))
+
+register_site_adapter(SiteAdapter(
+    name='Liverpool',
+    base_url='https://www.liverpool.com.mx',
+    url_templates=[
+        'https://www.liverpool.com.mx/tienda/home/search?text={query_pct}',
+        'https://www.liverpool.com.mx/search?q={query_plus}',
+        'https://www.liverpool.com.mx/tienda/home/search?q={query_plus}',
+        'https://www.liverpool.com.mx/search?query={query_plus}',
+        'https://www.liverpool.com.mx/tienda/search?q={query_plus}'
+    ],
+    card_selectors=[
+        '.product-item',
+        '.product-card',
+        '.item',
+        '[data-testid="product-item"]',
+        '.product',
+        '.product-tile',
+        '.tile-product',
+        '.product-tile-item',
+        '.product-grid-item',
+        '.grid-item',
+        '.search-result-item',
+        '.product-list-item',
+        '.item-product',
+        '.product-container'
+    ],
+    fallback_scans=[
+        TextScan('*', scan=300, keep=20, min_length=20, keywords=('$', 'peso', 'precio', 'iphone', 'producto')),
+        TextScan('a, button, [onclick], [data-testid]', scan=100, keep=10, min_length=10,
+                 keywords=('$', 'iphone', 'producto')),
+    ],
+    title_skip_prefixes=('$', 'peso'),
+    price_parser=price_from_patterns,
+    title_keywords=('Liverpool', 'producto'),
+    goto_timeout_ms=15000,
+    settle_ms=8000,
+))
+
+register_site_adapter(SiteAdapter(
+    name='Coppel',
+    base_url='https://www.coppel.com',
+    url_templates=['https://www.coppel.com/buscar?q={query_plus}'],
+    card_selectors=GENERIC_CARDS,
+))
+
+register_site_adapter(SiteAdapter(
+    name='Elektra',
+    base_url='https://www.elektra.com.mx',
+    url_templates=['https://www.elektra.com.mx/buscar?q={query_plus}'],
+    card_selectors=GENERIC_CARDS,
+))
+
+register_site_adapter(SiteAdapter(
+    name='Aurrera',
+    base_url='https://www.aurrera.com.mx',
+    url_templates=[
+        'https://www.aurrera.com.mx/search?q={query_plus}',
+        'https://www.aurrera.com.mx/buscar?q={query_plus}',
+        'https://www.aurrera.com.mx/tienda/search?q={query_plus}',
+        'https://www.aurrera.com.mx/search?query={query_plus}',
+        'https://www.aurrera.com.mx/search?text={query_plus}'
+    ],
+    card_selectors=GENERIC_CARDS,
+    title_keywords=('Aurrera', 'Walmart'),
+    goto_timeout_ms=15000,
+    settle_ms=3000,
+))
+
+register_site_adapter(SiteAdapter(
+    name='Costco',
+    base_url='https://www.costco.com.mx',
+    url_templates=[
+        'https://www.costco.com.mx/search?keyword={query_plus}',
+        'https://www.costco.com.mx/search?q={query_plus}',
+        'https://www.costco.com.mx/search?text={query_plus}',
+        'https://www.costco.com.mx/search?query={query_plus}',
+        'https://www.costco.com.mx/search?search={query_plus}'
+    ],
+    card_selectors=GENERIC_CARDS,
+    title_keywords=('Costco', 'producto'),
+    goto_timeout_ms=15000,
+    settle_ms=3000,
+))
+
+register_site_adapter(SiteAdapter(
+    name='Sams',
+    base_url='https://www.sams.com.mx',
+    url_templates=['https://www.sams.com.mx/search?q={query_plus}'],
+    card_selectors=GENERIC_CARDS,
+))
+
+register_site_adapter(SiteAdapter(
+    name='Samsung',
+    base_url='https://www.samsung.com',
+    url_templates=[
+        'https://www.samsung.com/mx/search/?searchvalue={query_plus}',
+        'https://www.samsung.com/mx/search?q={query_plus}',
+        'https://www.samsung.com/mx/search?query={query_plus}'
+    ],
+    card_selectors=GENERIC_CARDS + [
+        '.product-tile', '.tile-product', '.product-tile-item',
+        '.product-grid-item', '.grid-item', '.search-result-item',
+        '.product-list-item', '.item-product', '.product-container',
+        '.samsung-product', '.product-box', '.product-wrapper'
+    ],
+    fallback_scans=[
+        TextScan('*', scan=200, keep=20, min_length=20,
+                 keywords=('$', 'peso', 'precio', 'iphone', 'producto', 'samsung')),
+        TextScan('a, button, [onclick], [data-testid]', scan=100, keep=10, min_length=10,
+                 keywords=('$', 'iphone', 'producto', 'samsung')),
+    ],
+    title_keywords=('Samsung', 'producto'),
+    goto_timeout_ms=15000,
+    settle_ms=3000,
+))
+
+def load_site_config(path: str = SITES_CONFIG_FILE) -> Dict[str, dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('sites', {})
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Configuración de sitios ilegible ({path}), usando valores por defecto: {e}")
+        return {}
+
+def configured_adapters(config: Optional[Dict[str, dict]] = None) -> List[SiteAdapter]:
+    """Enabled adapters with config overrides applied, heaviest first.
+
+    Weight orders the sites when they compete for search slots; weight 0
+    disables a site just like enabled: false.
+    """
+    config = load_site_config() if config is None else config
+    only = {site.strip() for site in os.getenv('SCRAPER_SITES', '').split(',') if site.strip()}
+
+    adapters = []
+    for name, adapter in SITE_ADAPTERS.items():
+        overrides = {
+            key: value for key, value in config.get(name, {}).items()
+            if key in ('enabled', 'weight', 'fetch_tier', 'settle_ms', 'goto_timeout_ms')
+        }
+        adapter = replace(adapter, **overrides)
+        if only and name not in only:
+            continue
+        if not adapter.enabled or adapter.weight <= 0:
+            continue
+        adapters.append(adapter)
+    return sorted(adapters, key=lambda adapter: adapter.weight, reverse=True)
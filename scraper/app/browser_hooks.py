@@ -0,0 +1,35 @@
+"""
+Hooks applied to every Playwright browser context the scraper creates.
+
+Site scrapers call prepare_context() right after new_context(); tooling such
+as the offline benchmark registers hooks here (e.g. route interception)
+instead of each scraper growing its own options.
+"""
+
+from typing import Any, Awaitable, Callable, List
+
+ContextHook = Callable[[Any, str], Awaitable[None]]
+
+_context_hooks: List[ContextHook] = []
+
+def register_context_hook(hook: ContextHook, first: bool = False) -> ContextHook:
+    """Run hook(context, site) on every new scraping context.
+
+    Playwright runs routes in reverse registration order, so a hook that
+    stands in for the network (fixture replay) registers with first=True and
+    the request blocking hook still sees every request before it.
+    """
+    if first:
+        _context_hooks.insert(0, hook)
+    else:
+        _context_hooks.append(hook)
+    return hook
+
+def unregister_context_hook(hook: ContextHook):
+    if hook in _context_hooks:
+        _context_hooks.remove(hook)
+
+async def prepare_context(context, site: str):
+    """Apply the registered hooks to a freshly created context"""
+    for hook in list(_context_hooks):
+        await hook(context, site)
@@ -0,0 +1,131 @@
+"""
+Checkpoint of the run in progress, so a run killed halfway (CI timeout,
+EPIPE, OOM) is resumed instead of started over.
+
+The checkpoint holds the run's products and plan, the (product, site) units
+already finished, and the deals and notification count so far. It is
+rewritten after every finished unit and, at most every
+SCRAPER_CHECKPOINT_INTERVAL_SECONDS, after analysed listings; the scraper
+saves its fingerprint store and notification ledger along with it, so on
+resume listings already analysed come back as unchanged and alerts already
+sent are not repeated. In queue mode the checkpoint also keeps the queue run
+id, and the restarted coordinator waits on that run's results instead of
+publishing a new one (not for the in-process memory queue, which dies with
+the run, nor when the queue no longer holds the run).
+
+A run that completes removes its checkpoint. One older than
+SCRAPER_CHECKPOINT_MAX_AGE_MINUTES is ignored (its products are stale by
+then), and SCRAPER_RESUME=0 always starts from scratch.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.state import read_json, state_path, write_json
+
+STATE_FILE = "run_checkpoint.json"
+VERSION = 1
+RESUME = os.getenv("SCRAPER_RESUME", "1").lower() not in ("0", "false", "no")
+CHECKPOINT_MAX_AGE_MINUTES = float(os.getenv("SCRAPER_CHECKPOINT_MAX_AGE_MINUTES", "180"))
+CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("SCRAPER_CHECKPOINT_INTERVAL_SECONDS", "15"))
+
+class RunCheckpoint:
+    """Products, plan and finished units of the current run, persisted in the state dir"""
+
+    def __init__(self, data: Dict[str, Any], state_file: str = STATE_FILE):
+        self.data = data
+        self.state_file = state_file
+        self.done = set(data.get("done", []))
+        self._last_saved = 0.0
+
+    @classmethod
+    def start(cls, products: List[Dict[str, Any]], plan: List[Tuple[str, List[str]]]) -> "RunCheckpoint":
+        checkpoint = cls({
+            "version": VERSION,
+            "started": time.time(),
+            "products": products,
+            "plan": [[name, list(sites)] for name, sites in plan],
+            "done": [],
+        })
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def resume(cls, state_file: str = STATE_FILE) -> Optional["RunCheckpoint"]:
+        """The interrupted run's checkpoint, or None if there is none worth resuming"""
+        if not RESUME:
+            return None
+        data = read_json(state_file)
+        if not data or data.get("version") != VERSION:
+            return None
+        if time.time() - data.get("started", 0) > CHECKPOINT_MAX_AGE_MINUTES * 60:
+            print("⏭️ Checkpoint de una corrida interrumpida demasiado viejo, se empieza de cero")
+            return None
+        return cls(data, state_file)
+
+    @staticmethod
+    def _unit(product: str, site: str) -> str:
+        return f"{product}|{site}"
+
+    @property
+    def products(self) -> List[Dict[str, Any]]:
+        return self.data["products"]
+
+    @property
+    def queue_run(self) -> Optional[Tuple[str, str]]:
+        """(queue kind, run id) of the queue run this checkpoint belongs to"""
+        queue_run = self.data.get("queue_run")
+        return tuple(queue_run) if queue_run else None
+
+    def set_queue_run(self, queue_kind: str, run_id: str):
+        # The in-process queue is gone after a restart: there is no run to wait on
+        self.data["queue_run"] = [queue_kind, run_id] if queue_kind != "memory" else None
+        self.save()
+
+    def pending_plan(self) -> List[Tuple[str, List[str]]]:
+        """The plan without the units already finished"""
+        pending = []
+        for name, sites in self.data["plan"]:
+            remaining = [site for site in sites if self._unit(name, site) not in self.done]
+            if remaining:
+                pending.append((name, remaining))
+        return pending
+
+    def mark_done(self, product: str, sites: List[str]):
+        self.done.update(self._unit(product, site) for site in sites)
+
+    def restore_results(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+        """Deals and notification count recorded before the interruption"""
+        return (self.data.get("high_discount_deals", []), self.data.get("medium_discount_deals", []),
+                self.data.get("notifications_sent", 0))
+
+    def due(self) -> bool:
+        """Whether CHECKPOINT_INTERVAL_SECONDS passed since the last write"""
+        return time.monotonic() - self._last_saved >= CHECKPOINT_INTERVAL_SECONDS
+
+    def save(self, high_deals: Optional[List[Dict[str, Any]]] = None, medium_deals: Optional[List[Dict[str, Any]]] = None,
+             notifications_sent: Optional[int] = None):
+        self.data["done"] = sorted(self.done)
+        if high_deals is not None:
+            # Round trip so deals with non-JSON values (resale timestamps, ...) can be written
+            self.data["high_discount_deals"] = json.loads(json.dumps(high_deals, default=str))
+            self.data["medium_discount_deals"] = json.loads(json.dumps(medium_deals or [], default=str))
+        if notifications_sent is not None:
+            self.data["notifications_sent"] = notifications_sent
+        try:
+            write_json(self.state_file, self.data)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el checkpoint de la corrida: {e}")
+            return
+        self._last_saved = time.monotonic()
+
+    def clear(self):
+        """The run completed: nothing to resume"""
+        try:
+            os.unlink(state_path(self.state_file))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ No se pudo borrar el checkpoint de la corrida: {e}")
@@ -0,0 +1,240 @@
+"""
+Run-level concurrency model: one configuration, one limiter service.
+
+ConcurrencyConfig holds every concurrency knob of a process:
+
+- workers: products processed at once (full run, daemon and queue node).
+- stages: concurrent operations of one pipeline stage across all workers.
+  site_search counts site searches and resale counts browser scrapes of
+  resale sources (marketplaces and Google Shopping).
+- sites: concurrent searches against one retailer. "default" applies to
+  sites without their own entry.
+- resources: Chromium processes (browsers, short-lived ones and the warm
+  shared browser alike), warm per-site contexts (contexts) and pages open
+  in them (pages). The resource governor lowers browsers and pages under
+  memory pressure.
+
+Values come from the defaults below, then config/concurrency.json
+(SCRAPER_CONCURRENCY_CONFIG), then the environment: SCRAPER_WORKERS,
+SCRAPER_SITE_SEARCHES, SCRAPER_RESALE_BROWSERS, SCRAPER_PAGES_PER_SITE,
+SCRAPER_SITE_LIMITS (Amazon=1,Walmart=3), SCRAPER_MAX_BROWSERS,
+SCRAPER_MAX_CONTEXTS and SCRAPER_MAX_PAGES. Limits apply per process; with --processes N each shard
+gets the full set.
+
+ConcurrencyLimiter enforces them with one AdaptiveLimiter per worker pool,
+stage, site and resource. Each records acquisitions, peak use and time
+spent waiting for a slot, and the run summary reports them, so a limit
+that is too tight shows up as wait time.
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional
+
+from app import metrics
+
+CONFIG_FILE = os.getenv(
+    "SCRAPER_CONCURRENCY_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "concurrency.json")
+)
+# Environment variable -> (section, key); the environment wins over the file
+ENV_OVERRIDES = {
+    "SCRAPER_WORKERS": ("workers", None),
+    "SCRAPER_SITE_SEARCHES": ("stages", "site_search"),
+    "SCRAPER_RESALE_BROWSERS": ("stages", "resale"),
+    "SCRAPER_PAGES_PER_SITE": ("sites", "default"),
+    "SCRAPER_MAX_BROWSERS": ("resources", "browsers"),
+    "SCRAPER_MAX_CONTEXTS": ("resources", "contexts"),
+    "SCRAPER_MAX_PAGES": ("resources", "pages"),
+}
+SITE_LIMITS_ENV = "SCRAPER_SITE_LIMITS"
+
+@dataclass
+class ConcurrencyConfig:
+    """Every concurrency limit of a process"""
+
+    workers: int = 3  # Reduced to prevent EPIPE errors
+    stages: Dict[str, int] = field(default_factory=lambda: {"site_search": 5, "resale": 2})
+    sites: Dict[str, int] = field(default_factory=lambda: {"default": 2})
+    resources: Dict[str, int] = field(default_factory=lambda: {"browsers": 3, "contexts": 8, "pages": 6})
+
+    @classmethod
+    def load(cls, path: str = CONFIG_FILE) -> "ConcurrencyConfig":
+        config = cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                config.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"⚠️ No se pudo leer {path}: {e}")
+
+        for env, (section, key) in ENV_OVERRIDES.items():
+            value = os.getenv(env)
+            if value:
+                config.update({section: int(value)} if key is None else {section: {key: int(value)}})
+        site_limits = os.getenv(SITE_LIMITS_ENV, "")
+        for item in filter(None, (part.strip() for part in site_limits.split(","))):
+            site, _, limit = item.partition("=")
+            config.sites[site.strip()] = int(limit)
+        return config
+
+    def update(self, values: Dict[str, Any]):
+        """Apply a (partial) config dict such as the contents of concurrency.json"""
+        if "workers" in values:
+            self.workers = max(1, int(values["workers"]))
+        for section in ("stages", "sites", "resources"):
+            getattr(self, section).update({key: max(1, int(limit)) for key, limit in values.get(section, {}).items()})
+
+    def site_limit(self, site: str) -> int:
+        return self.sites.get(site, self.sites["default"])
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class AdaptiveLimiter:
+    """Semaphore whose limit can shrink and grow while slots are held: async with limiter: ..."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.max_limit = max(1, limit)
+        self.limit = self.max_limit
+        self.in_use = 0
+        # Tasks blocked in acquire() right now
+        self.waiting = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop = None
+        self.reset_stats()
+        metrics.CONCURRENCY_LIMIT.labels(name).set(self.limit)
+
+    def reset_stats(self):
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.peak = 0
+
+    def _cond(self) -> asyncio.Condition:
+        # asyncio primitives belong to one loop; a new asyncio.run() gets a fresh one
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self.in_use = 0
+            self.waiting = 0
+        return self._condition
+
+    async def acquire(self):
+        condition = self._cond()
+        async with condition:
+            if self.in_use >= self.limit:
+                started = time.perf_counter()
+                self.waiting += 1
+                try:
+                    await condition.wait_for(lambda: self.in_use < self.limit)
+                finally:
+                    self.waiting -= 1
+                waited = time.perf_counter() - started
+                self.waited += 1
+                self.wait_seconds += waited
+                metrics.CONCURRENCY_WAIT_SECONDS.labels(self.name).inc(waited)
+            self.in_use += 1
+            self.acquired += 1
+            self.peak = max(self.peak, self.in_use)
+
+    async def release(self):
+        condition = self._cond()
+        async with condition:
+            self.in_use -= 1
+            condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+        return False
+
+    def slot(self) -> "AdaptiveLimiter":
+        return self
+
+    async def set_limit(self, limit: int):
+        limit = max(1, min(limit, self.max_limit))
+        if limit == self.limit:
+            return
+        self.limit = limit
+        metrics.CONCURRENCY_LIMIT.labels(self.name).set(limit)
+        condition = self._cond()
+        async with condition:
+            condition.notify_all()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "limit": self.max_limit,
+            "peak": self.peak,
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "wait_s": round(self.wait_seconds, 3),
+        }
+
+class ConcurrencyLimiter:
+    """The process's limiters, built from one ConcurrencyConfig"""
+
+    def __init__(self, config: ConcurrencyConfig):
+        self.config = config
+        self.workers = AdaptiveLimiter("workers", config.workers)
+        self._limiters: Dict[str, AdaptiveLimiter] = {"workers": self.workers}
+
+    def _get(self, key: str, limit: int) -> AdaptiveLimiter:
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = AdaptiveLimiter(key, limit)
+        return limiter
+
+    def stage(self, name: str) -> AdaptiveLimiter:
+        return self._get(name, self.config.stages[name])
+
+    def site(self, name: str) -> AdaptiveLimiter:
+        return self._get(f"site:{name}", self.config.site_limit(name))
+
+    def resource(self, name: str) -> AdaptiveLimiter:
+        return self._get(name, self.config.resources[name])
+
+    def reset(self):
+        """Start the stats of a new run (limits and held slots are kept)"""
+        for limiter in self._limiters.values():
+            limiter.reset_stats()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {key: limiter.summary() for key, limiter in self._limiters.items() if limiter.acquired}
+
+    def merge(self, summary: Dict[str, Dict[str, Any]]):
+        """Add a shard's stats (ConcurrencyLimiter.summary()) to this process's"""
+        for key, stats in summary.items():
+            limiter = self._get(key, stats["limit"])
+            limiter.acquired += stats["acquired"]
+            limiter.waited += stats["waited"]
+            limiter.wait_seconds += stats["wait_s"]
+            limiter.peak = max(limiter.peak, stats["peak"])
+
+    def print_report(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print("🚦 Concurrencia (límite, pico en uso, adquisiciones, esperas, tiempo esperando):")
+        for key, stats in sorted(summary.items(), key=lambda item: -item[1]["wait_s"]):
+            print(f"   {key:<24} {stats['limit']:>3} {stats['peak']:>4} {stats['acquired']:>7} "
+                  f"{stats['waited']:>6} {stats['wait_s']:>9.1f} s")
+
+CONCURRENCY = ConcurrencyConfig.load()
+
+_limiter: Optional[ConcurrencyLimiter] = None
+
+def get_limiter() -> ConcurrencyLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = ConcurrencyLimiter(CONCURRENCY)
+    return _limiter
@@ -0,0 +1,144 @@
+"""
+Listing fingerprints from previous runs, for incremental scraping.
+
+A listing is identified by its canonical URL (or site + title when it has
+none) and fingerprinted by URL, title and price. A listing whose fingerprint
+matches the previous run is unchanged: the worker records its price and
+stops there, so resale lookups, AI scoring and notifications only run for
+new listings and price changes.
+
+A listing is committed only after its downstream processing finished, so one
+that failed halfway is retried on the next run. Entries not seen for
+FINGERPRINT_TTL_DAYS are dropped on save. SCRAPER_FULL_RUN=1 ignores the
+store for one run (everything is treated as changed, and stored again).
+Nodes of a work queue also share the store through the queue backend
+(refresh() before each unit), so a unit that moves between nodes sees what
+the others committed.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from app.state import read_json, write_json
+from app import metrics
+
+STATE_FILE = "listing_fingerprints.json"
+FINGERPRINT_TTL_DAYS = float(os.getenv("FINGERPRINT_TTL_DAYS", "7"))
+FULL_RUN = os.getenv("SCRAPER_FULL_RUN", "").lower() in ("1", "true", "yes")
+
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+def canonical_url(url: str) -> str:
+    """URL without query, fragment or Amazon-style /ref=... tracking segment"""
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    path = re.sub(r"/ref=[^/]*$", "", parts.path).rstrip("/")
+    return f"{parts.netloc.lower()}{path}"
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+def listing_key(listing: Dict[str, Any]) -> str:
+    url = canonical_url(listing.get("url", ""))
+    return _digest(url or f"{listing.get('site', '')}|{_normalize(listing.get('name', ''))}")
+
+def listing_fingerprint(listing: Dict[str, Any], price_value: float) -> str:
+    return _digest(f"{canonical_url(listing.get('url', ''))}|{_normalize(listing.get('name', ''))}|{price_value:.2f}")
+
+class FingerprintStore:
+    """listing key -> [fingerprint, price, last seen], persisted in the state dir"""
+
+    # Name of the store's copy in the work queue backend
+    shared_name = "fingerprints"
+
+    def __init__(self, state_file: str = STATE_FILE, full_run: bool = FULL_RUN):
+        self.state_file = state_file
+        self.full_run = full_run
+        self._lock = threading.Lock()
+        self.entries: Dict[str, List[Any]] = read_json(state_file, {}) or {}
+        self.counts = {NEW: 0, CHANGED: 0, UNCHANGED: 0}
+        # Entries committed (or seen unchanged) by this process, for merging shard results
+        self.committed: Dict[str, List[Any]] = {}
+
+    def check(self, listing: Dict[str, Any], price_value: float) -> str:
+        """NEW, CHANGED or UNCHANGED compared with the last committed run"""
+        key = listing_key(listing)
+        entry = self.entries.get(key)
+        if entry is None:
+            status = NEW
+        elif self.full_run or entry[0] != listing_fingerprint(listing, price_value):
+            status = CHANGED
+        else:
+            status = UNCHANGED
+            entry[2] = time.time()
+            self.committed[key] = entry
+        self.counts[status] += 1
+        metrics.LISTINGS.labels(status).inc()
+        return status
+
+    def previous_price(self, listing: Dict[str, Any]) -> Optional[float]:
+        entry = self.entries.get(listing_key(listing))
+        return entry[1] if entry else None
+
+    def commit(self, listing: Dict[str, Any], price_value: float):
+        """Remember listing as processed at this price"""
+        with self._lock:
+            key = listing_key(listing)
+            self.entries[key] = self.committed[key] = [listing_fingerprint(listing, price_value), price_value, time.time()]
+
+    def export(self, reset: bool = False) -> Dict[str, Any]:
+        """What this process committed and counted; reset starts the next export from empty"""
+        with self._lock:
+            exported = {"entries": dict(self.committed), "counts": dict(self.counts)}
+            if reset:
+                self.committed = {}
+                self.counts = {NEW: 0, CHANGED: 0, UNCHANGED: 0}
+        return exported
+
+    def merge(self, exported: Dict[str, Any]):
+        """Fold in what another process committed and counted"""
+        with self._lock:
+            self.entries.update(exported["entries"])
+            self.committed.update(exported["entries"])
+        for status, count in exported["counts"].items():
+            self.counts[status] += count
+
+    def refresh(self, entries: Dict[str, List[Any]]):
+        """Adopt entries committed elsewhere (other queue nodes) that are newer than ours"""
+        with self._lock:
+            for key, entry in entries.items():
+                current = self.entries.get(key)
+                if current is None or entry[2] > current[2]:
+                    self.entries[key] = entry
+
+    @staticmethod
+    def expired(entries: Dict[str, List[Any]]) -> List[str]:
+        """Keys not seen for FINGERPRINT_TTL_DAYS"""
+        cutoff = time.time() - FINGERPRINT_TTL_DAYS * 86400
+        return [key for key, entry in entries.items() if entry[2] < cutoff]
+
+    def save(self):
+        with self._lock:
+            for key in self.expired(self.entries):
+                del self.entries[key]
+            try:
+                write_json(self.state_file, self.entries)
+            except OSError as e:
+                print(f"⚠️ No se pudieron guardar las huellas de listados: {e}")
+
+    def print_report(self):
+        total = sum(self.counts.values())
+        if total:
+            print(f"🧬 Listados: {self.counts[NEW]} nuevos, {self.counts[CHANGED]} con cambio de precio, "
+                  f"{self.counts[UNCHANGED]} sin cambios ({self.counts[UNCHANGED] / total:.0%} omitidos)")
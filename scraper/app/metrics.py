@@ -0,0 +1,160 @@
+"""
+Prometheus metrics for the scraper hot paths.
+
+Exposition, chosen by environment:
+- SCRAPER_METRICS_PORT: embedded HTTP server for long-running processes.
+- PROMETHEUS_PUSHGATEWAY_URL: push once at the end of a run, which suits the
+  hourly one-shot cron runs that live shorter than a scrape interval.
+
+Sharded runs (app/sharding.py) start their worker processes with
+PROMETHEUS_MULTIPROC_DIR set, and the coordinator pushes the aggregate from
+shard_registry() next to its own registry.
+
+Browser launches and contexts in use are tracked from a context hook (see
+app/browser_hooks.py), so the site scrapers don't need their own calls.
+"""
+
+import os
+import weakref
+from typing import Any, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, push_to_gateway, start_http_server
+
+from app.browser_hooks import register_context_hook
+
+METRICS_PORT_ENV = "SCRAPER_METRICS_PORT"
+PUSHGATEWAY_ENV = "PROMETHEUS_PUSHGATEWAY_URL"
+PUSH_JOB = os.getenv("PROMETHEUS_PUSH_JOB", "pricewatch_scraper")
+
+REGISTRY = CollectorRegistry()
+
+# Site scrapers run for tens of seconds (fixed waits included)
+SITE_BUCKETS = (0.5, 1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120)
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+SITE_SEARCH_SECONDS = Histogram(
+    "scraper_site_search_seconds", "Duration of one site search", ["site"],
+    buckets=SITE_BUCKETS, registry=REGISTRY
+)
+SITE_SEARCHES = Counter(
+    "scraper_site_searches_total", "Site searches by outcome (ok, empty, error, skipped)", ["site", "outcome"],
+    registry=REGISTRY
+)
+BROWSER_LAUNCHES = Counter(
+    "scraper_browser_launches_total", "Chromium instances launched", ["site"], registry=REGISTRY
+)
+CONTEXTS_IN_USE = Gauge(
+    "scraper_browser_contexts_in_use", "Browser contexts currently open", registry=REGISTRY
+)
+# Index in CIRCUIT_STATES: 0 closed, 1 half-open, 2 open
+CIRCUIT_STATES = ("closed", "half_open", "open")
+SITE_CIRCUIT_STATE = Gauge(
+    "scraper_site_circuit_state", "Site circuit breaker state (0 closed, 1 half-open, 2 open)", ["site"],
+    registry=REGISTRY
+)
+REQUESTS_BLOCKED = Counter(
+    "scraper_requests_blocked_total", "Page requests aborted by the interception profile (type or domain)",
+    ["site", "reason"], registry=REGISTRY
+)
+PROCESS_RSS = Gauge(
+    "scraper_process_rss_bytes", "RSS of the scraper and its child processes (driver, Chromium)", registry=REGISTRY
+)
+CONCURRENCY_LIMIT = Gauge(
+    "scraper_concurrency_limit", "Current concurrency limit (workers, stage, site or resource)", ["resource"],
+    registry=REGISTRY
+)
+CONCURRENCY_WAIT_SECONDS = Counter(
+    "scraper_concurrency_wait_seconds_total", "Time spent waiting for a concurrency slot", ["resource"],
+    registry=REGISTRY
+)
+CONCURRENCY_SHEDS = Counter(
+    "scraper_concurrency_sheds_total", "Times the RSS watchdog lowered the concurrency limits", registry=REGISTRY
+)
+BROWSER_RECYCLES = Counter(
+    "scraper_browser_recycles_total", "Warm browsers replaced (page cap, memory pressure or disconnect)", ["reason"],
+    registry=REGISTRY
+)
+LISTINGS = Counter(
+    "scraper_listings_total", "Listings by fingerprint status (new, changed, unchanged)", ["status"],
+    registry=REGISTRY
+)
+RESALE_ERRORS = Counter(
+    "scraper_resale_errors_total", "Resale source lookups that failed and returned no prices", ["source"],
+    registry=REGISTRY
+)
+OPENAI_SECONDS = Histogram(
+    "scraper_openai_request_seconds", "OpenAI completion latency", ["purpose"],
+    buckets=REQUEST_BUCKETS, registry=REGISTRY
+)
+OPENAI_TOKENS = Counter(
+    "scraper_openai_tokens_total", "OpenAI tokens used", ["purpose", "kind"], registry=REGISTRY
+)
+TELEGRAM_SECONDS = Histogram(
+    "scraper_telegram_send_seconds", "Telegram sendMessage latency", ["kind"],
+    buckets=REQUEST_BUCKETS, registry=REGISTRY
+)
+TELEGRAM_RESPONSES = Counter(
+    "scraper_telegram_responses_total", "Telegram sendMessage responses by HTTP status", ["kind", "status"],
+    registry=REGISTRY
+)
+TELEGRAM_RATE_LIMITED = Counter(
+    "scraper_telegram_rate_limited_total", "Telegram sendMessage calls rejected with 429", ["kind"],
+    registry=REGISTRY
+)
+
+def record_site_search(site: str, seconds: float, outcome: str):
+    SITE_SEARCH_SECONDS.labels(site).observe(seconds)
+    SITE_SEARCHES.labels(site, outcome).inc()
+
+def record_openai(purpose: str, seconds: float, usage: Optional[Any] = None):
+    OPENAI_SECONDS.labels(purpose).observe(seconds)
+    if usage is not None:
+        OPENAI_TOKENS.labels(purpose, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+        OPENAI_TOKENS.labels(purpose, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+def record_telegram(kind: str, seconds: float, status_code: Optional[int]):
+    TELEGRAM_SECONDS.labels(kind).observe(seconds)
+    TELEGRAM_RESPONSES.labels(kind, str(status_code) if status_code else "error").inc()
+    if status_code == 429:
+        TELEGRAM_RATE_LIMITED.labels(kind).inc()
+
+# Browsers already counted; each scraper launches its own and opens one context on it
+_seen_browsers: "weakref.WeakSet" = weakref.WeakSet()
+
+async def _track_context(context, site: str):
+    browser = context.browser
+    if browser is not None and browser not in _seen_browsers:
+        _seen_browsers.add(browser)
+        BROWSER_LAUNCHES.labels(site).inc()
+    CONTEXTS_IN_USE.inc()
+    context.on("close", lambda _: CONTEXTS_IN_USE.dec())
+
+register_context_hook(_track_context)
+
+def start_metrics_server() -> Optional[int]:
+    """Serve /metrics when SCRAPER_METRICS_PORT is set; returns the port"""
+    port = os.getenv(METRICS_PORT_ENV)
+    if not port:
+        return None
+    start_http_server(int(port), registry=REGISTRY)
+    print(f"📈 Métricas Prometheus en http://0.0.0.0:{port}/metrics")
+    return int(port)
+
+def shard_registry(path: str) -> CollectorRegistry:
+    """Registry aggregating what shard processes wrote to PROMETHEUS_MULTIPROC_DIR=path"""
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    return registry
+
+def push_metrics(registry: CollectorRegistry = REGISTRY, grouping_key: Optional[dict] = None):
+    """Push the registry to the Pushgateway when PROMETHEUS_PUSHGATEWAY_URL is set"""
+    gateway = os.getenv(PUSHGATEWAY_ENV)
+    if not gateway:
+        return
+    try:
+        push_to_gateway(gateway, job=PUSH_JOB, registry=registry, grouping_key=grouping_key)
+        print(f"📈 Métricas enviadas a {gateway}")
+    except Exception as e:
+        print(f"⚠️ Error enviando métricas al Pushgateway: {e}")
@@ -0,0 +1,363 @@
+"""
+Capture and replay of every network response a run sees.
+
+With SCRAPER_NETWORK_MODE=record (or --capture DIR) the responses of all
+four transports are written to the archive in SCRAPER_NETWORK_ARCHIVE:
+
+- Playwright pages: a context hook routes every request that survives the
+  interception profile through route.fetch().
+- requests: ImprovedPriceChecker's API calls and the Telegram sends. This
+  is done by wrapping HTTPAdapter.send, since Telegram uses requests.post.
+- aiohttp: the http fetch tier. Sessions come from client_session().
+- OpenAI: product generation and deal analysis, through the httpx
+  transport from openai_http_client().
+
+With SCRAPER_NETWORK_MODE=replay (or --replay-network DIR) the same hooks
+answer from the archive and never touch the network. A request with no
+archived response fails the way a dropped connection would, and is
+counted as a miss.
+
+Archive layout (content-addressed, so repeated pages are stored once):
+
+    index.jsonl        one line per response: kind, method, url, request
+                       body hash, status, content type, blob
+    blobs/ab/abcd...   zlib-compressed bodies named by their sha256
+
+Replay matches on method + URL + request body hash, and falls back to
+method + URL. Repeated requests get the recorded responses in order, and
+the last one is repeated. Request bodies and headers are never stored.
+Telegram bot tokens are redacted from URLs.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.browser_hooks import register_context_hook, unregister_context_hook
+from app.state import write_json
+
+ARCHIVE_ENV = "SCRAPER_NETWORK_ARCHIVE"
+MODE_ENV = "SCRAPER_NETWORK_MODE"
+RECORD = "record"
+REPLAY = "replay"
+SUMMARY_FILE = "network_archive_summary.json"
+
+_REDACTIONS = [(re.compile(r"/bot[^/]+/"), "/bot<token>/")]
+
+def redact(url: str) -> str:
+    for pattern, replacement in _REDACTIONS:
+        url = pattern.sub(replacement, url)
+    return url
+
+def _body_hash(body: Optional[bytes]) -> str:
+    return hashlib.sha1(body).hexdigest()[:16] if body else ""
+
+@dataclass
+class ArchivedResponse:
+    status: int
+    content_type: str
+    body: bytes
+
+    def text(self) -> str:
+        match = re.search(r"charset=([\w-]+)", self.content_type or "")
+        return self.body.decode(match.group(1) if match else "utf-8", errors="replace")
+
+class NetworkArchive:
+    """Index + content-addressed blobs on disk; record appends, replay serves"""
+
+    INDEX = "index.jsonl"
+
+    def __init__(self, path: str, mode: str):
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self._exact: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        self._loose: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._served: Dict[Tuple, int] = {}
+        if mode == RECORD:
+            os.makedirs(os.path.join(path, "blobs"), exist_ok=True)
+        else:
+            self._load()
+
+    def _load(self):
+        with open(os.path.join(self.path, self.INDEX), encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._exact.setdefault((entry["method"], entry["url"], entry["body"]), []).append(entry)
+                self._loose.setdefault((entry["method"], entry["url"]), []).append(entry)
+
+    def _count(self, kind: str, outcome: str):
+        kind_counts = self.counts.setdefault(kind, {})
+        kind_counts[outcome] = kind_counts.get(outcome, 0) + 1
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, "blobs", digest[:2], digest)
+
+    def record(self, kind: str, method: str, url: str, request_body: Optional[bytes],
+               status: int, content_type: str, body: bytes):
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        entry = {"kind": kind, "method": method.upper(), "url": redact(url), "body": _body_hash(request_body),
+                 "status": status, "content_type": content_type or "", "blob": digest}
+        with self._lock:
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f"{blob_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(zlib.compress(body, 6))
+                os.replace(tmp_path, blob_path)
+            # One short append per response: shard processes can share the index
+            with open(os.path.join(self.path, self.INDEX), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._count(kind, "recorded")
+
+    def lookup(self, kind: str, method: str, url: str, request_body: Optional[bytes]) -> Optional[ArchivedResponse]:
+        method, url = method.upper(), redact(url)
+        exact_key = (method, url, _body_hash(request_body))
+        loose_key = (method, url)
+        with self._lock:
+            key, entries = exact_key, self._exact.get(exact_key)
+            if not entries:
+                key, entries = loose_key, self._loose.get(loose_key)
+            if not entries:
+                self._count(kind, "missed")
+                return None
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            entry = entries[min(index, len(entries) - 1)]
+            self._count(kind, "served")
+        with open(self._blob_path(entry["blob"]), "rb") as f:
+            body = zlib.decompress(f.read())
+        return ArchivedResponse(entry["status"], entry["content_type"], body)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"path": self.path, "mode": self.mode, "counts": self.counts}
+
+    def print_report(self):
+        label = "grabadas" if self.mode == RECORD else "servidas"
+        for kind, counts in sorted(self.counts.items()):
+            missed = f", {counts['missed']} sin archivar" if counts.get("missed") else ""
+            print(f"📼 {kind}: {counts.get('recorded', counts.get('served', 0))} respuestas {label}{missed}")
+
+_archive: Optional[NetworkArchive] = None
+
+def get_archive() -> Optional[NetworkArchive]:
+    return _archive
+
+def replaying() -> bool:
+    return _archive is not None and _archive.mode == REPLAY
+
+def configure(path: Optional[str] = None, mode: Optional[str] = None) -> Optional[NetworkArchive]:
+    """Enable capture or replay (defaults from the environment); a no-op when neither is set.
+
+    The choice is exported to the environment so shard processes started
+    afterwards use the same archive.
+    """
+    global _archive
+    path = path or os.getenv(ARCHIVE_ENV, "")
+    mode = (mode or os.getenv(MODE_ENV, "")).lower()
+    if not path or mode not in (RECORD, REPLAY):
+        return None
+    if _archive is not None:
+        return _archive
+    os.environ[ARCHIVE_ENV] = path
+    os.environ[MODE_ENV] = mode
+    _archive = NetworkArchive(path, mode)
+    _install_requests()
+    register_context_hook(_archive_context, first=True)
+    print(f"📼 Archivo de red ({mode}): {path}")
+    return _archive
+
+def close():
+    """Print what was recorded/served and leave the counts in the state dir (used by benchmarks.replay_run)"""
+    global _archive
+    if _archive is None:
+        return
+    _archive.print_report()
+    try:
+        write_json(SUMMARY_FILE, _archive.summary())
+    except OSError:
+        pass
+    unregister_context_hook(_archive_context)
+    _archive = None
+
+# --- Playwright ---
+
+async def _archive_context(context, site: str):
+    # Registered first, so it runs after the interception profile has blocked what it blocks
+    await context.route("**/*", _archive_route)
+
+async def _archive_route(route):
+    archive = _archive
+    if archive is None:
+        await route.fallback()
+        return
+    request = route.request
+    post_data = request.post_data_buffer
+    if archive.mode == REPLAY:
+        archived = archive.lookup("browser", request.method, request.url, post_data)
+        if archived is None:
+            await route.abort("internetdisconnected")
+            return
+        await route.fulfill(status=archived.status, content_type=archived.content_type or None, body=archived.body)
+        return
+    response = await route.fetch()
+    body = await response.body()
+    archive.record("browser", request.method, request.url, post_data, response.status,
+                   response.headers.get("content-type", ""), body)
+    await route.fulfill(response=response, body=body)
+
+# --- requests (price checker APIs, Telegram) ---
+
+def _install_requests():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    if getattr(HTTPAdapter.send, "_network_archive", False):
+        return
+    original_send = HTTPAdapter.send
+
+    def send(adapter, request, **kwargs):
+        archive = _archive
+        if archive is None:
+            return original_send(adapter, request, **kwargs)
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        if archive.mode == REPLAY:
+            archived = archive.lookup("requests", request.method, request.url, body)
+            if archived is None:
+                raise requests.ConnectionError(f"Sin respuesta archivada para {request.method} {redact(request.url)}",
+                                               request=request)
+            response = requests.Response()
+            response.status_code = archived.status
+            response.headers["Content-Type"] = archived.content_type
+            response._content = archived.body
+            response.url = request.url
+            response.request = request
+            response.reason = "Archived"
+            return response
+        response = original_send(adapter, request, **kwargs)
+        archive.record("requests", request.method, request.url, body, response.status_code,
+                       response.headers.get("Content-Type", ""), response.content)
+        return response
+
+    send._network_archive = True
+    HTTPAdapter.send = send
+
+# --- aiohttp (http fetch tier) ---
+
+def client_session(**kwargs):
+    """aiohttp.ClientSession, or a stand-in that records/replays its GETs when the archive is on"""
+    import aiohttp
+    if _archive is None:
+        return aiohttp.ClientSession(**kwargs)
+    return ArchivingSession(_archive, **kwargs)
+
+class ArchivingSession:
+    """The slice of aiohttp.ClientSession the site clients use: get() as a context manager, close()"""
+
+    def __init__(self, archive: NetworkArchive, **kwargs):
+        import aiohttp
+        self.archive = archive
+        self._session = aiohttp.ClientSession(**kwargs) if archive.mode == RECORD else None
+
+    def get(self, url: str, **kwargs) -> "_ArchivedRequest":
+        return _ArchivedRequest(self, "GET", str(url), kwargs)
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+
+class _ArchivedRequest:
+    def __init__(self, session: ArchivingSession, method: str, url: str, kwargs: Dict[str, Any]):
+        self.session = session
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self._request = None
+
+    async def __aenter__(self):
+        archive = self.session.archive
+        if archive.mode == REPLAY:
+            archived = archive.lookup("aiohttp", self.method, self.url, None)
+            if archived is None:
+                import aiohttp
+                raise aiohttp.ClientConnectionError(f"Sin respuesta archivada para {self.method} {self.url}")
+            return _ArchivedAiohttpResponse(self.url, archived)
+        self._request = self.session._session.request(self.method, self.url, **self.kwargs)
+        response = await self._request.__aenter__()
+        body = await response.read()
+        archive.record("aiohttp", self.method, self.url, None, response.status,
+                       response.headers.get("Content-Type", ""), body)
+        return response
+
+    async def __aexit__(self, *exc):
+        if self._request is not None:
+            return await self._request.__aexit__(*exc)
+        return False
+
+class _ArchivedAiohttpResponse:
+    def __init__(self, url: str, archived: ArchivedResponse):
+        self.url = url
+        self.status = archived.status
+        self.headers = {"Content-Type": archived.content_type}
+        self._archived = archived
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            import aiohttp
+            raise aiohttp.ClientResponseError(None, (), status=self.status, message=f"HTTP {self.status} (archivado)")
+
+    async def read(self) -> bytes:
+        return self._archived.body
+
+    async def text(self, encoding: Optional[str] = None) -> str:
+        if encoding:
+            return self._archived.body.decode(encoding, errors="replace")
+        return self._archived.text()
+
+    async def json(self, **kwargs) -> Any:
+        return json.loads(self._archived.body)
+
+# --- httpx (OpenAI) ---
+
+def openai_http_client():
+    """httpx.Client for openai.OpenAI(http_client=...) when the archive is on, else None (the SDK default)"""
+    if _archive is None:
+        return None
+    import httpx
+
+    archive = _archive
+
+    class ArchiveTransport(httpx.BaseTransport):
+        def __init__(self):
+            self._network = httpx.HTTPTransport() if archive.mode == RECORD else None
+
+        def handle_request(self, request):
+            body = request.read()
+            if archive.mode == REPLAY:
+                archived = archive.lookup("openai", request.method, str(request.url), body)
+                if archived is None:
+                    raise httpx.ConnectError(f"Sin respuesta archivada para {request.method} {request.url}", request=request)
+                return httpx.Response(archived.status, headers={"content-type": archived.content_type},
+                                      content=archived.body, request=request)
+            response = self._network.handle_request(request)
+            # read() decodes content-encoding, so the replayed response carries no encoding headers
+            content = response.read()
+            content_type = response.headers.get("content-type", "")
+            archive.record("openai", request.method, str(request.url), body, response.status_code, content_type, content)
+            return httpx.Response(response.status_code, headers={"content-type": content_type},
+                                  content=content, request=request)
+
+        def close(self):
+            if self._network:
+                self._network.close()
+
+    return httpx.Client(transport=ArchiveTransport())
@@ -0,0 +1,163 @@
+"""
+Per-stage timing spans for a scraping run.
+
+Code wraps each unit of work in `profiler.span(stage, name)`; at the end of
+the run the spans are aggregated per stage (count, p50, p95, max, total) and
+can be dumped as Chrome trace JSON (chrome://tracing / Perfetto).
+
+Spans are attributed to a track (usually the worker id) through a context
+variable, so tasks spawned by a worker inherit its track and show up on the
+same row of the trace.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Write a Chrome trace here at the end of the run (optional)
+TRACE_FILE_ENV = "SCRAPER_TRACE_FILE"
+
+_current_track: contextvars.ContextVar = contextvars.ContextVar("profiler_track", default="main")
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = (len(ordered) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+class Span:
+    __slots__ = ("stage", "name", "track", "start", "duration", "error", "attrs")
+
+    def __init__(self, stage: str, name: Optional[str], track: str, start: float, attrs: Dict[str, Any]):
+        self.stage = stage
+        self.name = name
+        self.track = track
+        self.start = start
+        self.duration = 0.0
+        self.error: Optional[str] = None
+        self.attrs = attrs
+
+class RunProfiler:
+    """Collects spans for one run; thread-safe so to_thread work can be timed too"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._origin_wall = time.time()
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self._origin = time.perf_counter()
+            self._origin_wall = time.time()
+
+    def set_track(self, track: Any):
+        """Attribute spans opened from the current task (and tasks it spawns) to this track"""
+        return _current_track.set(str(track))
+
+    @contextmanager
+    def span(self, stage: str, name: Optional[str] = None, **attrs):
+        """Time the enclosed block; usable in both sync and async code"""
+        span = Span(stage, name, _current_track.get(), time.perf_counter(), attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            with self._lock:
+                self.spans.append(span)
+
+    def export(self) -> Dict[str, Any]:
+        """Picklable spans (start relative to the run origin), for merging into another process' profiler"""
+        with self._lock:
+            spans = [
+                (span.stage, span.name, span.track, span.start - self._origin, span.duration, span.error, span.attrs)
+                for span in self.spans
+            ]
+        return {"origin_wall": self._origin_wall, "spans": spans}
+
+    def merge(self, exported: Dict[str, Any], track_prefix: str = ""):
+        """Add spans exported by another process, aligned on wall-clock time"""
+        shift = self._origin + (exported["origin_wall"] - self._origin_wall)
+        with self._lock:
+            for stage, name, track, start, duration, error, attrs in exported["spans"]:
+                span = Span(stage, name, f"{track_prefix}{track}", shift + start, attrs)
+                span.duration = duration
+                span.error = error
+                self.spans.append(span)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """count/p50/p95/max/total (seconds) per stage, slowest total first"""
+        by_stage: Dict[str, List[Span]] = {}
+        with self._lock:
+            for span in self.spans:
+                by_stage.setdefault(span.stage, []).append(span)
+
+        stats = {}
+        for stage, spans in by_stage.items():
+            durations = sorted(span.duration for span in spans)
+            stats[stage] = {
+                "count": len(durations),
+                "errors": sum(1 for span in spans if span.error),
+                "p50": _percentile(durations, 50),
+                "p95": _percentile(durations, 95),
+                "max": durations[-1],
+                "total": sum(durations),
+            }
+        return dict(sorted(stats.items(), key=lambda item: item[1]["total"], reverse=True))
+
+    def print_report(self, wall_time: Optional[float] = None):
+        stats = self.summary()
+        if not stats:
+            return
+        print("\n⏱️ === TIEMPOS POR ETAPA ===")
+        print(f"{'etapa':<28} {'n':>5} {'err':>4} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'total s':>9}")
+        for stage, s in stats.items():
+            print(f"{stage:<28} {s['count']:>5} {s['errors']:>4} {s['p50']:>8.2f} {s['p95']:>8.2f} "
+                  f"{s['max']:>8.2f} {s['total']:>9.2f}")
+        if wall_time is not None:
+            print(f"{'(tiempo total de la corrida)':<28} {'':>5} {'':>4} {'':>8} {'':>8} {'':>8} {wall_time:>9.2f}")
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Complete ("X") events in Chrome trace format, one tid per track"""
+        tids: Dict[str, int] = {}
+        events = []
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+
+        for span in spans:
+            tid = tids.setdefault(span.track, len(tids) + 1)
+            args = dict(span.attrs)
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": f"{span.stage}:{span.name}" if span.name else span.stage,
+                "cat": span.stage,
+                "ph": "X",
+                "ts": round((span.start - self._origin) * 1_000_000),
+                "dur": round(span.duration * 1_000_000),
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+        for track, tid in tids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": track}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        print(f"💾 Traza de Chrome guardada en {path}")
+
+# Shared by the scraper, the site clients and the price checker
+profiler = RunProfiler()
@@ -0,0 +1,182 @@
+"""
+Process-wide resource governor for the scraper's browsers.
+
+- Global caps: the browsers, contexts and pages resources of the
+  concurrency config (app/concurrency.py). SCRAPER_MAX_BROWSERS caps every
+  Chromium process: per-search launches for resale checks and non-warm site
+  searches, and the warm shared browser, which holds its slot for as long
+  as it lives. SCRAPER_MAX_CONTEXTS caps the warm per-site contexts and
+  SCRAPER_MAX_PAGES the pages open in them, whatever the number of workers.
+- Recycling: warm browsers are replaced after SCRAPER_BROWSER_RECYCLE_PAGES
+  pages, since Chromium's memory only grows over a long run, and as soon as
+  a search is waiting for a browser slot, so a long-lived warm browser can't
+  starve resale checks once the cap has been lowered.
+- RSS watchdog: samples the RSS of this process and its children (driver and
+  Chromium). Above SCRAPER_RSS_SOFT_LIMIT_MB both caps shrink by one step
+  and warm browsers are recycled; above SCRAPER_RSS_HARD_LIMIT_MB they drop
+  to one. Once memory is back under 75% of the soft limit the caps grow back
+  one step at a time.
+
+Searches wait for a slot instead of failing, so memory pressure costs
+throughput, not crashes.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+from app import metrics
+from app.concurrency import get_limiter
+
+BROWSER_RECYCLE_PAGES = int(os.getenv("SCRAPER_BROWSER_RECYCLE_PAGES", "150"))
+RSS_SOFT_LIMIT_MB = float(os.getenv("SCRAPER_RSS_SOFT_LIMIT_MB", "2048"))
+RSS_HARD_LIMIT_MB = float(os.getenv("SCRAPER_RSS_HARD_LIMIT_MB", "3072"))
+RSS_CHECK_SECONDS = float(os.getenv("SCRAPER_RSS_CHECK_SECONDS", "2"))
+# Give a change time to show up in RSS before the next one
+SHED_INTERVAL_SECONDS = 10.0
+RESTORE_INTERVAL_SECONDS = 30.0
+
+def process_tree_rss() -> int:
+    """RSS in bytes of this process and all its children"""
+    try:
+        import psutil
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+    except ImportError:
+        return _proc_tree_rss(os.getpid())
+
+def _proc_tree_rss(pid: int) -> int:
+    """Without psutil: /proc/<pid>/status and /proc/<pid>/task/*/children (Linux)"""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+                    break
+        children = set()
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.update(int(child) for child in f.read().split())
+        for child in children:
+            total += _proc_tree_rss(child)
+    except (OSError, ValueError):
+        pass
+    return total
+
+class ResourceGovernor:
+    """Global browser/page caps plus the RSS watchdog that adjusts them"""
+
+    def __init__(self):
+        limiter = get_limiter()
+        self.browsers = limiter.resource("browsers")
+        self.contexts = limiter.resource("contexts")
+        self.pages = limiter.resource("pages")
+        self.recycle_after_pages = BROWSER_RECYCLE_PAGES
+        self.peak_rss = 0
+        self.sheds = 0
+        self.recycles = 0
+        self._recycle_requested = False
+        self._last_shed = 0.0
+        self._last_restore = 0.0
+        self._watchdog: Optional[asyncio.Task] = None
+
+    def browser(self):
+        """Slot for launching a short-lived browser: async with governor.browser(): ..."""
+        return self.browsers.slot()
+
+    def page(self):
+        """Slot for one page in a warm context"""
+        return self.pages.slot()
+
+    def should_recycle(self, pages_served: int) -> bool:
+        """Whether a warm browser that served pages_served pages should be replaced now"""
+        if self._recycle_requested:
+            self._recycle_requested = False
+            return True
+        if self.browsers.waiting:
+            return True
+        return self.recycle_after_pages > 0 and pages_served >= self.recycle_after_pages
+
+    def note_recycle(self, reason: str):
+        self.recycles += 1
+        metrics.BROWSER_RECYCLES.labels(reason).inc()
+
+    async def check_memory(self):
+        rss = process_tree_rss()
+        self.peak_rss = max(self.peak_rss, rss)
+        metrics.PROCESS_RSS.set(rss)
+        rss_mb = rss / (1024 * 1024)
+        now = time.monotonic()
+
+        if rss_mb >= RSS_HARD_LIMIT_MB and (self.browsers.limit > 1 or self.pages.limit > 1):
+            print(f"🧯 RSS {rss_mb:.0f} MB sobre el límite duro: concurrencia al mínimo")
+            await self._shed(to_minimum=True)
+        elif rss_mb >= RSS_SOFT_LIMIT_MB and now - self._last_shed >= SHED_INTERVAL_SECONDS:
+            print(f"⚠️ RSS {rss_mb:.0f} MB: reduciendo concurrencia")
+            await self._shed()
+        elif rss_mb < RSS_SOFT_LIMIT_MB * 0.75 and now - max(self._last_shed, self._last_restore) >= RESTORE_INTERVAL_SECONDS:
+            if self.browsers.limit < self.browsers.max_limit or self.pages.limit < self.pages.max_limit:
+                self._last_restore = now
+                await self.browsers.set_limit(self.browsers.limit + 1)
+                await self.pages.set_limit(self.pages.limit + 1)
+
+    async def _shed(self, to_minimum: bool = False):
+        self._last_shed = time.monotonic()
+        self.sheds += 1
+        self._recycle_requested = True
+        metrics.CONCURRENCY_SHEDS.inc()
+        await self.browsers.set_limit(1 if to_minimum else self.browsers.limit - 1)
+        await self.pages.set_limit(1 if to_minimum else self.pages.limit - 1)
+
+    async def _watch(self):
+        while True:
+            try:
+                await self.check_memory()
+            except Exception as e:
+                print(f"⚠️ Watchdog de memoria: {e}")
+            await asyncio.sleep(RSS_CHECK_SECONDS)
+
+    def start_watchdog(self):
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop_watchdog(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            try:
+                await self._watchdog
+            except asyncio.CancelledError:
+                pass
+            self._watchdog = None
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "peak_rss_mb": round(self.peak_rss / (1024 * 1024), 1),
+            "sheds": self.sheds,
+            "browser_recycles": self.recycles,
+            "browsers_limit": self.browsers.limit,
+            "contexts_peak": self.contexts.peak,
+            "pages_limit": self.pages.limit,
+        }
+
+    def print_report(self):
+        s = self.summary()
+        print(f"🧠 Memoria: pico RSS {s['peak_rss_mb']} MB, {s['sheds']} reducciones de concurrencia, "
+              f"{s['browser_recycles']} navegadores reciclados, pico de {s['contexts_peak']} contextos "
+              f"(límites finales: {s['browsers_limit']} navegadores, {s['pages_limit']} páginas)")
+
+_governor: Optional[ResourceGovernor] = None
+
+def get_governor() -> ResourceGovernor:
+    global _governor
+    if _governor is None:
+        _governor = ResourceGovernor()
+    return _governor
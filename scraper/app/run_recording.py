@@ -0,0 +1,66 @@
+"""
+Recording of a run's inputs, for offline replay.
+
+A recording holds the run's products, every site search (query -> site ->
+listings) and every resale lookup (listing name -> resale data). The full
+run writes one when SCRAPER_RECORD_RUN (or --record) names a file; the
+`replay` subcommand feeds it back through the same worker pipeline with
+ReplaySiteClient in place of the browser-backed site client, so scoring,
+classification and profiling can be repeated without network, database
+writes or notifications.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+RECORD_RUN = os.getenv("SCRAPER_RECORD_RUN", "")
+
+class RunRecording:
+    """Products, site searches and resale lookups of one run"""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {}
+        self.products: List[Dict[str, Any]] = data.get("products", [])
+        self.searches: Dict[str, Dict[str, List[Dict[str, Any]]]] = data.get("searches", {})
+        self.resale: Dict[str, Dict[str, Any]] = data.get("resale", {})
+
+    def record_search(self, query: str, results: Dict[str, List[Dict[str, Any]]]):
+        self.searches.setdefault(query, {}).update(results)
+
+    def record_resale(self, name: str, data: Dict[str, Any]):
+        self.resale[name] = data
+
+    def search(self, query: str, sites: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        recorded = self.searches.get(query, {})
+        return {site: [dict(listing) for listing in listings]
+                for site, listings in recorded.items() if sites is None or site in sites}
+
+    def resale_prices(self, name: str) -> Dict[str, Any]:
+        return self.resale.get(name, {})
+
+    def save(self, path: str):
+        data = {"products": self.products, "searches": self.searches, "resale": self.resale}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+
+    @classmethod
+    def load(cls, path: str) -> "RunRecording":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+class ReplaySiteClient:
+    """Stands in for UnifiedFreeAPIClient, answering searches from a recording"""
+
+    def __init__(self, recording: RunRecording):
+        self.recording = recording
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def search_all_sites_free(self, query: str, limit_per_site: int = 3,
+                                    sites: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        return {site: listings[:limit_per_site] for site, listings in self.recording.search(query, sites).items()}
@@ -0,0 +1,239 @@
+"""
+Scheduling of (product, site) checks.
+
+IntervalScheduler drives the long-running daemon mode. Every pair has its own
+interval: a check that finds a deal makes the pair hot (interval halved), a
+price change or new listing nudges it down, and checks that find nothing new,
+or nothing at all, stretch it, always within [SCRAPER_MIN_INTERVAL_MINUTES,
+SCRAPER_MAX_INTERVAL_MINUTES]. Pairs sit in a heap ordered by due time.
+
+PriorityScheduler decides what a one-shot run searches: it ranks pairs by
+expected deal yield from PairStatsStore (hit rate, price changes, deals) and
+spends a fixed search budget on the best ones.
+
+Both keep their state in the scraper state dir, so restarts and the next
+hourly run keep what was learned.
+"""
+
+import heapq
+import itertools
+import math
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.state import read_json, write_json
+
+STATE_FILE = "daemon_schedule.json"
+
+BASE_INTERVAL = float(os.getenv("SCRAPER_DAEMON_INTERVAL_MINUTES", "60")) * 60
+MIN_INTERVAL = float(os.getenv("SCRAPER_MIN_INTERVAL_MINUTES", "15")) * 60
+MAX_INTERVAL = float(os.getenv("SCRAPER_MAX_INTERVAL_MINUTES", "360")) * 60
+
+@dataclass
+class PairState:
+    product: str
+    site: str
+    interval: float
+    due: float
+    checks: int = 0
+    # Consecutive checks without new listings, price changes or deals
+    quiet_checks: int = 0
+
+class IntervalScheduler:
+    """Per-(product, site) adaptive intervals behind a due-time heap"""
+
+    def __init__(self, base: float = BASE_INTERVAL, minimum: float = MIN_INTERVAL, maximum: float = MAX_INTERVAL,
+                 state_file: Optional[str] = STATE_FILE):
+        self.base = base
+        self.minimum = minimum
+        self.maximum = maximum
+        self.state_file = state_file
+        self.pairs: Dict[Tuple[str, str], PairState] = {}
+        self._heap: List[Tuple[float, int, str, str]] = []
+        self._seq = itertools.count()
+        self._active: set = set()
+        if state_file:
+            for data in read_json(state_file, []) or []:
+                pair = PairState(**data)
+                self.pairs[(pair.product, pair.site)] = pair
+
+    def _push(self, pair: PairState):
+        heapq.heappush(self._heap, (pair.due, next(self._seq), pair.product, pair.site))
+
+    def sync(self, products: Iterable[str], sites: Iterable[str]):
+        """Make the current product x site grid schedulable; pairs outside it stop being scheduled"""
+        now = time.time()
+        wanted = {(product, site) for product in products for site in sites}
+        for key in wanted:
+            pair = self.pairs.get(key)
+            if pair is None:
+                pair = self.pairs[key] = PairState(key[0], key[1], interval=self.base, due=now)
+            if key not in self._active:
+                self._push(pair)
+        self._active = wanted
+
+    def pop_due(self, now: Optional[float] = None) -> Dict[str, List[str]]:
+        """Remove and return the pairs due by now, grouped as {product: [sites]}"""
+        now = time.time() if now is None else now
+        due: Dict[str, List[str]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, product, site = heapq.heappop(self._heap)
+            pair = self.pairs.get((product, site))
+            # Stale heap entry: pair rescheduled since, or no longer in the grid
+            if pair is None or pair.due != due_at or (product, site) not in self._active:
+                continue
+            due.setdefault(product, []).append(site)
+        return due
+
+    def next_due(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def report(self, product: str, site: str, results: int = 0, changed: int = 0, deals: int = 0):
+        """Outcome of one check; adjusts the pair's interval and schedules the next one"""
+        pair = self.pairs.get((product, site))
+        if pair is None:
+            return
+        pair.checks += 1
+        if deals:
+            pair.interval /= 2
+            pair.quiet_checks = 0
+        elif changed:
+            pair.interval *= 0.75
+            pair.quiet_checks = 0
+        elif results:
+            pair.quiet_checks += 1
+            pair.interval *= 1.5
+        else:
+            pair.quiet_checks += 1
+            pair.interval *= 2
+        pair.interval = min(max(pair.interval, self.minimum), self.maximum)
+        pair.due = time.time() + pair.interval
+        if (product, site) in self._active:
+            self._push(pair)
+
+    def save(self):
+        if not self.state_file:
+            return
+        try:
+            write_json(self.state_file, [asdict(pair) for key, pair in self.pairs.items() if key in self._active])
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la agenda del daemon: {e}")
+
+    def hot_pairs(self, limit: int = 5) -> List[PairState]:
+        active = [pair for key, pair in self.pairs.items() if key in self._active]
+        return sorted(active, key=lambda pair: pair.interval)[:limit]
+
+# --- Budgeted runs: which (product, site) pairs are worth a search ---
+
+STATS_FILE = "pair_stats.json"
+RUN_BUDGET_SEARCHES = int(os.getenv("SCRAPER_RUN_BUDGET_SEARCHES", "0"))
+RUN_BUDGET_SECONDS = float(os.getenv("SCRAPER_RUN_BUDGET_SECONDS", "0"))
+# UCB exploration weight: higher spends more of the budget on rarely checked pairs
+EXPLORATION = float(os.getenv("SCRAPER_EXPLORATION", "0.3"))
+# Value of a price change relative to a deal
+CHANGE_VALUE = 0.25
+STALENESS_BONUS_PER_DAY = 0.05
+
+@dataclass
+class PairStats:
+    checks: int = 0
+    # Checks that returned listings at all
+    hits: int = 0
+    # Checks with new listings or price changes (how volatile the pair's prices are)
+    changes: int = 0
+    deals: int = 0
+    last_checked: float = 0.0
+
+class PairStatsStore:
+    """Per-(product, site) outcome counts across runs, persisted in the state dir"""
+
+    def __init__(self, state_file: Optional[str] = STATS_FILE):
+        self.state_file = state_file
+        self.stats: Dict[str, PairStats] = {}
+        # Outcomes recorded by this process, replayed by a coordinator (see export/merge)
+        self.outcomes: List[Tuple[str, str, Dict[str, int]]] = []
+        if state_file:
+            for key, data in (read_json(state_file, {}) or {}).items():
+                self.stats[key] = PairStats(**data)
+
+    @staticmethod
+    def _key(product: str, site: str) -> str:
+        return f"{product}|{site}"
+
+    def get(self, product: str, site: str) -> PairStats:
+        return self.stats.get(self._key(product, site)) or PairStats()
+
+    def record(self, product: str, site: str, results: int = 0, changed: int = 0, deals: int = 0):
+        self.outcomes.append((product, site, {"results": results, "changed": changed, "deals": deals}))
+        stats = self.stats.setdefault(self._key(product, site), PairStats())
+        stats.checks += 1
+        stats.hits += 1 if results else 0
+        stats.changes += 1 if changed else 0
+        stats.deals += 1 if deals else 0
+        stats.last_checked = time.time()
+
+    def export(self, reset: bool = False) -> List[Tuple[str, str, Dict[str, int]]]:
+        exported = list(self.outcomes)
+        if reset:
+            self.outcomes = []
+        return exported
+
+    def merge(self, outcomes: List[Tuple[str, str, Dict[str, int]]]):
+        for product, site, outcome in outcomes:
+            self.record(product, site, **outcome)
+
+    @property
+    def total_checks(self) -> int:
+        return sum(stats.checks for stats in self.stats.values())
+
+    def save(self):
+        if not self.state_file:
+            return
+        try:
+            write_json(self.state_file, {key: asdict(stats) for key, stats in self.stats.items()})
+        except OSError as e:
+            print(f"⚠️ No se pudieron guardar las estadísticas por producto/sitio: {e}")
+
+class PriorityScheduler:
+    """Spend a fixed number of site searches on the pairs with the highest expected value.
+
+    Expected value = hit rate x (deal rate + CHANGE_VALUE x change rate) x site
+    weight, with Beta(1, 1)-smoothed rates, plus a UCB exploration bonus that
+    shrinks as a pair accumulates checks and a small bonus for days since the
+    last check, so cold pairs are still revisited now and then.
+    """
+
+    def __init__(self, stats: PairStatsStore, exploration: float = EXPLORATION):
+        self.stats = stats
+        self.exploration = exploration
+
+    def score(self, product: str, site: str, weight: float = 1.0, total_checks: Optional[int] = None) -> float:
+        stats = self.stats.get(product, site)
+        total = self.stats.total_checks if total_checks is None else total_checks
+        hit_rate = (stats.hits + 1) / (stats.checks + 2)
+        deal_rate = (stats.deals + 1) / (stats.checks + 2)
+        change_rate = (stats.changes + 1) / (stats.checks + 2)
+        value = hit_rate * (deal_rate + CHANGE_VALUE * change_rate) * weight
+        bonus = self.exploration * math.sqrt(2 * math.log(total + 2) / (stats.checks + 1))
+        if stats.last_checked:
+            bonus += STALENESS_BONUS_PER_DAY * (time.time() - stats.last_checked) / 86400
+        return value + bonus
+
+    def plan(self, products: List[str], site_weights: Dict[str, float],
+             budget: int = RUN_BUDGET_SEARCHES) -> List[Tuple[str, List[str]]]:
+        """[(product, sites)] for the best `budget` pairs (all pairs if budget <= 0), best products first"""
+        total = self.stats.total_checks
+        scored = [
+            (self.score(product, site, weight, total), product, site)
+            for product in products for site, weight in site_weights.items()
+        ]
+        chosen = heapq.nlargest(budget, scored) if budget > 0 else sorted(scored, reverse=True)
+
+        by_product: Dict[str, List[str]] = {}
+        best: Dict[str, float] = {}
+        for value, product, site in chosen:
+            by_product.setdefault(product, []).append(site)
+            best[product] = max(best.get(product, 0.0), value)
+        return sorted(by_product.items(), key=lambda item: best[item[0]], reverse=True)
@@ -0,0 +1,68 @@
+"""
+Multi-process sharding for a scraping run.
+
+The coordinator splits the run's work units across N worker processes, each
+with its own event loop, browsers and resource governor, so Chromium
+spawn/teardown, parsing and the blocking HTTP calls spread over several
+cores. Processes are started with the spawn method (Playwright and forked
+event loops don't mix) and with PROMETHEUS_MULTIPROC_DIR pointing at a
+temporary directory, so their metrics can be aggregated afterwards (see
+app/metrics.shard_registry). Each shard returns a picklable dict that the
+coordinator merges.
+
+SCRAPER_PROCESSES (or --processes) sets N; 1 keeps the single-process run.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, TypeVar
+
+PROCESSES = int(os.getenv("SCRAPER_PROCESSES", "1"))
+
+T = TypeVar("T")
+
+def split_round_robin(units: Sequence[T], shards: int) -> List[List[T]]:
+    """Deal units out in order, so every shard gets a similar mix of high- and low-priority work"""
+    buckets: List[List[T]] = [[] for _ in range(max(1, shards))]
+    for index, unit in enumerate(units):
+        buckets[index % len(buckets)].append(unit)
+    return [bucket for bucket in buckets if bucket]
+
+@contextmanager
+def multiprocess_metrics_dir() -> Iterator[str]:
+    """Temporary PROMETHEUS_MULTIPROC_DIR inherited by the shard processes started inside the block"""
+    path = tempfile.mkdtemp(prefix="scraper-metrics-")
+    previous = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    try:
+        yield path
+    finally:
+        if previous is None:
+            os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        else:
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = previous
+
+def remove_metrics_dir(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+
+async def run_shards(shard_fn: Callable[..., Dict[str, Any]], shards: List[List[Any]], *args) -> List[Dict[str, Any]]:
+    """Run shard_fn(shard_index, units, *args) in one process per shard; failed shards yield an error dict"""
+    loop = asyncio.get_running_loop()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as pool:
+        futures = [loop.run_in_executor(pool, shard_fn, index, units, *args) for index, units in enumerate(shards)]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+
+    merged = []
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            print(f"❌ Shard {index}: {type(result).__name__}: {result}")
+            merged.append({"shard": index, "error": repr(result)})
+        else:
+            merged.append(result)
+    return merged
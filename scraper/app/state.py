@@ -0,0 +1,43 @@
+"""
+Local state that survives between scraper runs (circuit breakers, sessions, ...).
+
+Everything lives under SCRAPER_STATE_DIR (default scraper/.state). The
+GitHub Actions workflow restores and saves that directory with actions/cache,
+so the hourly runs see the state left by the previous one.
+"""
+
+import json
+import os
+import tempfile
+from typing import Any
+
+STATE_DIR = os.getenv(
+    "SCRAPER_STATE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".state")
+)
+
+def state_path(name: str) -> str:
+    return os.path.join(STATE_DIR, name)
+
+def read_json(name: str, default: Any = None) -> Any:
+    try:
+        with open(state_path(name), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Estado {name} ilegible, se ignora: {e}")
+        return default
+
+def write_json(name: str, data: Any):
+    """Atomic write (temp file + rename), so a killed run never leaves half a file"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=STATE_DIR, prefix=f".{name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, state_path(name))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,397 @@
+"""
+Work queue shared by several scraper nodes.
+
+The coordinator (run_multithreaded_scraping with SCRAPER_WORK_QUEUE set)
+publishes one unit per planned (product, sites) pair; any number of nodes
+(`--worker`, possibly on other machines) claim units, run them and commit a
+result that the coordinator merges like a shard result.
+
+- Leases: a claimed unit is invisible to other nodes for
+  SCRAPER_QUEUE_LEASE_SECONDS; the node extends the lease while it works. A
+  node that dies stops extending it, and the unit is handed to another node
+  once the lease expires (visibility timeout).
+- Attempts: a unit claimed SCRAPER_QUEUE_MAX_ATTEMPTS times without a result
+  is committed as failed, so the coordinator never waits on a poison unit.
+- Idempotent commits: only the node holding the unit's current lease can
+  commit it, so once an expired lease was handed to another node the
+  earlier holder's commit is rejected; the first result committed wins.
+- Cancellation: the coordinator cancels its run when it stops waiting, and
+  nodes discard whatever is left of it.
+- Shared state: the listing fingerprints and the notification ledger live in
+  the backend as well (load_state/put_state). The coordinator seeds them, a
+  node refreshes its copy before each unit and pushes what the unit
+  committed before completing it, so a unit that ran on two nodes is not
+  scored or alerted twice.
+
+Backends: Redis streams (`redis`, using the REDIS_* connection variables)
+with a consumer group per queue, or SQLite (`sqlite` for a file in the state
+dir, shareable by nodes on one machine; `memory` for a single process).
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.state import STATE_DIR, state_path
+
+WORK_QUEUE = os.getenv("SCRAPER_WORK_QUEUE", "")
+QUEUE_NAME = os.getenv("SCRAPER_QUEUE_NAME", "scraper")
+LEASE_SECONDS = float(os.getenv("SCRAPER_QUEUE_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("SCRAPER_QUEUE_MAX_ATTEMPTS", "3"))
+IDLE_SECONDS = float(os.getenv("SCRAPER_QUEUE_IDLE_SECONDS", "5"))
+# How long finished runs' results and cancel markers are kept in Redis
+RUN_RETENTION_SECONDS = 86400
+
+SQLITE_FILE = "work_queue.sqlite3"
+
+@dataclass
+class Lease:
+    run_id: str
+    unit_id: str
+    payload: Dict[str, Any]
+    attempts: int
+    consumer: str
+    # Stream entry id of the claimed unit (Redis)
+    token: str = ""
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+def failed_result(lease: Lease, error: str) -> Dict[str, Any]:
+    return {"unit_id": lease.unit_id, "error": error}
+
+class SQLiteWorkQueue:
+    """Units and results in two SQLite tables; leases are an owner + expiry column"""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        # One connection shared through the lock; the file itself is shared between processes
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS units (
+                    unit_id TEXT PRIMARY KEY,
+                    run_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    owner TEXT,
+                    lease_expires REAL NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    done INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS units_claimable ON units (done, lease_expires);
+                CREATE TABLE IF NOT EXISTS results (
+                    unit_id TEXT PRIMARY KEY,
+                    run_id TEXT NOT NULL,
+                    result TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS shared_state (
+                    name TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (name, key)
+                );
+            """)
+
+    def _execute(self, fn):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self._db)
+                self._db.execute("COMMIT")
+                return value
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    async def publish(self, run_id: str, units: List[Dict[str, Any]]):
+        def insert(db):
+            db.executemany(
+                "INSERT OR IGNORE INTO units (unit_id, run_id, payload) VALUES (?, ?, ?)",
+                [(f"{run_id}:{index}", run_id, json.dumps(unit, ensure_ascii=False)) for index, unit in enumerate(units)],
+            )
+        await asyncio.to_thread(self._execute, insert)
+
+    async def claim(self, consumer: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Lease]:
+        def claim_one(db):
+            while True:
+                now = time.time()
+                row = db.execute(
+                    "SELECT unit_id, run_id, payload, attempts FROM units WHERE done = 0 AND lease_expires < ? "
+                    "ORDER BY rowid LIMIT 1", (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+                unit_id, run_id, payload, attempts = row
+                lease = Lease(run_id, unit_id, json.loads(payload), attempts + 1, consumer)
+                if attempts >= MAX_ATTEMPTS:
+                    self._store_result(db, lease, failed_result(lease, f"sin resultado tras {attempts} intentos"))
+                    continue
+                db.execute("UPDATE units SET owner = ?, lease_expires = ?, attempts = ? WHERE unit_id = ?",
+                           (consumer, now + lease_seconds, lease.attempts, unit_id))
+                return lease
+        return await asyncio.to_thread(self._execute, claim_one)
+
+    async def extend(self, lease: Lease, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Push the lease expiry forward; False if the unit is no longer ours"""
+        def extend_one(db):
+            cursor = db.execute("UPDATE units SET lease_expires = ? WHERE unit_id = ? AND owner = ? AND done = 0",
+                                (time.time() + lease_seconds, lease.unit_id, lease.consumer))
+            return cursor.rowcount > 0
+        return await asyncio.to_thread(self._execute, extend_one)
+
+    @staticmethod
+    def _store_result(db, lease: Lease, result: Dict[str, Any]) -> bool:
+        cursor = db.execute("INSERT OR IGNORE INTO results (unit_id, run_id, result) VALUES (?, ?, ?)",
+                            (lease.unit_id, lease.run_id, json.dumps(result, ensure_ascii=False, default=str)))
+        db.execute("UPDATE units SET done = 1 WHERE unit_id = ?", (lease.unit_id,))
+        return cursor.rowcount > 0
+
+    async def complete(self, lease: Lease, result: Dict[str, Any]) -> bool:
+        """Commit the unit's result; False if the lease is stale, a result was already committed or the run was cancelled"""
+        def complete_one(db):
+            row = db.execute("SELECT owner, attempts FROM units WHERE unit_id = ?", (lease.unit_id,)).fetchone()
+            # Cancelled run, or the unit was claimed again after this lease expired
+            if row is None or row != (lease.consumer, lease.attempts):
+                return False
+            return self._store_result(db, lease, result)
+        return await asyncio.to_thread(self._execute, complete_one)
+
+    async def results(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        def fetch(db):
+            rows = db.execute("SELECT unit_id, result FROM results WHERE run_id = ?", (run_id,)).fetchall()
+            return {unit_id: json.loads(result) for unit_id, result in rows}
+        return await asyncio.to_thread(self._execute, fetch)
+
+    async def outstanding(self, run_id: str) -> int:
+        """Units of the run still waiting for a result"""
+        def count(db):
+            return db.execute("SELECT COUNT(*) FROM units WHERE run_id = ? AND done = 0", (run_id,)).fetchone()[0]
+        return await asyncio.to_thread(self._execute, count)
+
+    async def cancel(self, run_id: str):
+        """Forget the run: unclaimed units are dropped and late commits ignored"""
+        def delete(db):
+            db.execute("DELETE FROM units WHERE run_id = ?", (run_id,))
+            db.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+        await asyncio.to_thread(self._execute, delete)
+
+    async def load_state(self, name: str) -> Dict[str, Any]:
+        """Every entry of the shared map name"""
+        def fetch(db):
+            rows = db.execute("SELECT key, value FROM shared_state WHERE name = ?", (name,)).fetchall()
+            return {key: json.loads(value) for key, value in rows}
+        return await asyncio.to_thread(self._execute, fetch)
+
+    async def get_state(self, name: str, key: str) -> Optional[Any]:
+        def fetch(db):
+            row = db.execute("SELECT value FROM shared_state WHERE name = ? AND key = ?", (name, key)).fetchone()
+            return json.loads(row[0]) if row else None
+        return await asyncio.to_thread(self._execute, fetch)
+
+    async def put_state(self, name: str, entries: Dict[str, Any]):
+        if not entries:
+            return
+        def upsert(db):
+            db.executemany("INSERT OR REPLACE INTO shared_state (name, key, value) VALUES (?, ?, ?)",
+                           [(name, key, json.dumps(value, ensure_ascii=False)) for key, value in entries.items()])
+        await asyncio.to_thread(self._execute, upsert)
+
+    async def delete_state(self, name: str, keys: List[str]):
+        if not keys:
+            return
+        def delete(db):
+            db.executemany("DELETE FROM shared_state WHERE name = ? AND key = ?", [(name, key) for key in keys])
+        await asyncio.to_thread(self._execute, delete)
+
+    async def close(self):
+        with self._lock:
+            self._db.close()
+
+# KEYS: stream, results hash, attempts hash, cancelled marker, outstanding set
+# ARGV: group, entry id, consumer, unit id, result, results retention
+COMPLETE_SCRIPT = """
+local pending = redis.call('XPENDING', KEYS[1], ARGV[1], ARGV[2], ARGV[2], 1)
+if #pending == 0 or pending[1][2] ~= ARGV[3] then
+    return -1
+end
+local stored = 0
+if redis.call('EXISTS', KEYS[4]) == 0 then
+    stored = redis.call('HSETNX', KEYS[2], ARGV[4], ARGV[5])
+    redis.call('EXPIRE', KEYS[2], ARGV[6])
+end
+redis.call('SREM', KEYS[5], ARGV[4])
+redis.call('HDEL', KEYS[3], ARGV[4])
+redis.call('XACK', KEYS[1], ARGV[1], ARGV[2])
+redis.call('XDEL', KEYS[1], ARGV[2])
+return stored
+"""
+
+class RedisWorkQueue:
+    """One stream of units read through a consumer group; results in a hash per run.
+
+    A claimed entry stays in the group's pending list until acknowledged, and
+    XAUTOCLAIM hands entries idle for longer than the lease to another
+    consumer. Extending a lease is an XCLAIM by the same consumer, which
+    resets the entry's idle time. Completing is one script that first checks
+    the entry is still pending for the committing consumer.
+    """
+
+    GROUP = "nodes"
+
+    def __init__(self, name: str = QUEUE_NAME):
+        import redis.asyncio as redis
+
+        self._redis = redis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=int(os.getenv("REDIS_PORT", 6379)),
+            password=os.getenv("REDIS_PASSWORD") or None,
+            db=int(os.getenv("REDIS_DB", 0)),
+            decode_responses=True
+        )
+        self.stream = f"{name}:units"
+        self.attempts_key = f"{name}:attempts"
+        self._prefix = name
+        self._group_ready = False
+        self._complete_script = self._redis.register_script(COMPLETE_SCRIPT)
+
+    def _results_key(self, run_id: str) -> str:
+        return f"{self._prefix}:results:{run_id}"
+
+    def _cancelled_key(self, run_id: str) -> str:
+        return f"{self._prefix}:cancelled:{run_id}"
+
+    def _outstanding_key(self, run_id: str) -> str:
+        return f"{self._prefix}:outstanding:{run_id}"
+
+    def _state_key(self, name: str) -> str:
+        return f"{self._prefix}:state:{name}"
+
+    async def _ensure_group(self):
+        if self._group_ready:
+            return
+        from redis.exceptions import ResponseError
+        try:
+            await self._redis.xgroup_create(self.stream, self.GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def publish(self, run_id: str, units: List[Dict[str, Any]]):
+        await self._ensure_group()
+        pipe = self._redis.pipeline()
+        outstanding_key = self._outstanding_key(run_id)
+        for index, unit in enumerate(units):
+            pipe.xadd(self.stream, {"run_id": run_id, "unit_id": f"{run_id}:{index}",
+                                    "payload": json.dumps(unit, ensure_ascii=False)})
+            pipe.sadd(outstanding_key, f"{run_id}:{index}")
+        pipe.expire(outstanding_key, RUN_RETENTION_SECONDS)
+        await pipe.execute()
+
+    async def _next_entry(self, consumer: str, lease_seconds: float):
+        # Entries whose lease expired come first, then never-delivered ones
+        claimed = await self._redis.xautoclaim(self.stream, self.GROUP, consumer,
+                                               min_idle_time=int(lease_seconds * 1000), start_id="0-0", count=1)
+        if claimed and claimed[1]:
+            return claimed[1][0]
+        response = await self._redis.xreadgroup(self.GROUP, consumer, {self.stream: ">"}, count=1)
+        if response and response[0][1]:
+            return response[0][1][0]
+        return None
+
+    async def _discard(self, entry_id: str):
+        await self._redis.xack(self.stream, self.GROUP, entry_id)
+        await self._redis.xdel(self.stream, entry_id)
+
+    async def claim(self, consumer: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Lease]:
+        await self._ensure_group()
+        while True:
+            entry = await self._next_entry(consumer, lease_seconds)
+            if entry is None:
+                return None
+            entry_id, fields = entry
+            run_id, unit_id = fields["run_id"], fields["unit_id"]
+            if await self._redis.exists(self._cancelled_key(run_id)) or \
+                    await self._redis.hexists(self._results_key(run_id), unit_id):
+                await self._discard(entry_id)
+                continue
+            attempts = await self._redis.hincrby(self.attempts_key, unit_id, 1)
+            lease = Lease(run_id, unit_id, json.loads(fields["payload"]), attempts, consumer, token=entry_id)
+            if attempts > MAX_ATTEMPTS:
+                await self.complete(lease, failed_result(lease, f"sin resultado tras {attempts - 1} intentos"))
+                continue
+            return lease
+
+    async def extend(self, lease: Lease, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Reset the entry's idle time; False if it was handed to another node meanwhile"""
+        pending = await self._redis.xpending_range(self.stream, self.GROUP, min=lease.token, max=lease.token, count=1)
+        if not pending or pending[0]["consumer"] != lease.consumer:
+            return False
+        claimed = await self._redis.xclaim(self.stream, self.GROUP, lease.consumer, min_idle_time=0,
+                                           message_ids=[lease.token], justid=True)
+        return bool(claimed)
+
+    async def complete(self, lease: Lease, result: Dict[str, Any]) -> bool:
+        """Commit the unit's result; False if the lease is stale, a result was already committed or the run was cancelled"""
+        stored = await self._complete_script(
+            keys=[self.stream, self._results_key(lease.run_id), self.attempts_key,
+                  self._cancelled_key(lease.run_id), self._outstanding_key(lease.run_id)],
+            args=[self.GROUP, lease.token, lease.consumer, lease.unit_id,
+                  json.dumps(result, ensure_ascii=False, default=str), RUN_RETENTION_SECONDS],
+        )
+        # -1: the entry was handed to another consumer, which now owns the commit
+        return stored == 1
+
+    async def results(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        raw = await self._redis.hgetall(self._results_key(run_id))
+        return {unit_id: json.loads(result) for unit_id, result in raw.items()}
+
+    async def outstanding(self, run_id: str) -> int:
+        """Units of the run still waiting for a result"""
+        return await self._redis.scard(self._outstanding_key(run_id))
+
+    async def cancel(self, run_id: str):
+        """Forget the run: nodes discard its remaining units and late commits are ignored"""
+        await self._redis.set(self._cancelled_key(run_id), 1, ex=RUN_RETENTION_SECONDS)
+        await self._redis.delete(self._results_key(run_id), self._outstanding_key(run_id))
+
+    async def load_state(self, name: str) -> Dict[str, Any]:
+        """Every entry of the shared map name"""
+        raw = await self._redis.hgetall(self._state_key(name))
+        return {key: json.loads(value) for key, value in raw.items()}
+
+    async def get_state(self, name: str, key: str) -> Optional[Any]:
+        value = await self._redis.hget(self._state_key(name), key)
+        return json.loads(value) if value is not None else None
+
+    async def put_state(self, name: str, entries: Dict[str, Any]):
+        if entries:
+            await self._redis.hset(self._state_key(name), mapping={
+                key: json.dumps(value, ensure_ascii=False) for key, value in entries.items()
+            })
+
+    async def delete_state(self, name: str, keys: List[str]):
+        if keys:
+            await self._redis.hdel(self._state_key(name), *keys)
+
+    async def close(self):
+        await self._redis.close()
+
+def open_queue(kind: str = WORK_QUEUE):
+    """Backend for SCRAPER_WORK_QUEUE: redis, sqlite or memory"""
+    kind = kind.lower()
+    if kind == "redis":
+        return RedisWorkQueue()
+    if kind == "sqlite":
+        os.makedirs(STATE_DIR, exist_ok=True)
+        return SQLiteWorkQueue(state_path(SQLITE_FILE))
+    if kind == "memory":
+        return SQLiteWorkQueue(":memory:")
+    raise ValueError(f"SCRAPER_WORK_QUEUE desconocido: {kind!r} (redis, sqlite o memory)")
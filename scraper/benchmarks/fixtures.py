@@ -0,0 +1,96 @@
+"""
+Recorded HTML/JSON fixtures for offline scraping, keyed by URL pattern.
+
+fixtures/manifest.json maps a URL regex to a file; the first matching entry
+wins. The same set serves Playwright pages (route interception) and the
+`requests` session of ImprovedPriceChecker (FixtureAdapter), so a benchmark
+run never touches the network.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import BaseAdapter
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+class FixtureSet:
+    """Fixtures listed in a manifest, plus counters of what was served"""
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR):
+        self.fixtures_dir = fixtures_dir
+        with open(os.path.join(fixtures_dir, 'manifest.json'), encoding='utf-8') as f:
+            self.entries: List[Dict[str, Any]] = json.load(f)['fixtures']
+        self._patterns = [re.compile(entry['url_pattern']) for entry in self.entries]
+        self._bodies: Dict[str, bytes] = {}
+        self.served = 0
+        self.blocked = 0
+
+    def match(self, url: str) -> Optional[Dict[str, Any]]:
+        for pattern, entry in zip(self._patterns, self.entries):
+            if pattern.search(url):
+                return entry
+        return None
+
+    def body(self, entry: Dict[str, Any]) -> bytes:
+        if entry['file'] not in self._bodies:
+            with open(os.path.join(self.fixtures_dir, entry['file']), 'rb') as f:
+                self._bodies[entry['file']] = f.read()
+        return self._bodies[entry['file']]
+
+    def content_type(self, entry: Dict[str, Any]) -> str:
+        return entry.get('content_type', 'text/html; charset=utf-8')
+
+    def save(self, entry: Dict[str, Any], body: bytes):
+        """Overwrite a fixture with a freshly recorded response"""
+        with open(os.path.join(self.fixtures_dir, entry['file']), 'wb') as f:
+            f.write(body)
+        self._bodies[entry['file']] = body
+
+    async def replay_route(self, route):
+        """Playwright route handler: serve fixtures, abort everything else"""
+        entry = self.match(route.request.url)
+        if entry is None:
+            self.blocked += 1
+            await route.abort()
+            return
+        self.served += 1
+        await route.fulfill(status=200, content_type=self.content_type(entry), body=self.body(entry))
+
+    async def record_route(self, route):
+        """Playwright route handler: go to the network and save responses that match a fixture"""
+        response = await route.fetch()
+        entry = self.match(route.request.url)
+        if entry is not None and route.request.resource_type in ('document', 'xhr', 'fetch'):
+            self.save(entry, await response.body())
+            self.served += 1
+        await route.fulfill(response=response)
+
+class FixtureAdapter(BaseAdapter):
+    """requests transport adapter backed by a FixtureSet (404 for unknown URLs)"""
+
+    def __init__(self, fixtures: FixtureSet):
+        super().__init__()
+        self.fixtures = fixtures
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        entry = self.fixtures.match(request.url)
+        if entry is None:
+            self.fixtures.blocked += 1
+            response.status_code = 404
+            response._content = b''
+        else:
+            self.fixtures.served += 1
+            response.status_code = 200
+            response.headers['Content-Type'] = self.fixtures.content_type(entry)
+            response._content = self.fixtures.body(entry)
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la corrida completa reproducida desde un archivo de red.
+
+Cada iteración lanza `multithreaded_ai_scraper.py --replay-network DIR` en un
+proceso nuevo con un directorio de estado vacío, así que todas las páginas,
+APIs de reventa, llamadas a OpenAI y envíos a Telegram salen del archivo
+grabado con --capture y los tiempos se pueden comparar entre commits. Se
+reporta el tiempo total y el tiempo por etapa (de la traza del profiler) y
+las peticiones que no estaban en el archivo.
+
+Uso (desde scraper/):
+    python multithreaded_ai_scraper.py --capture capturas/base     # una vez, con red real
+    python -m benchmarks.replay_run capturas/base --iterations 3 --output replay.json
+    python -m benchmarks.replay_run --compare base.json replay.json --max-regression 15
+
+Con --compare sale con código 1 si el tiempo total o alguna etapa empeora más
+de --max-regression por ciento, así que sirve como chequeo en CI.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app.network_archive import ARCHIVE_ENV, MODE_ENV, SUMMARY_FILE
+from benchmarks.run_benchmark import environment, git_revision
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_once(archive: str, extra_args: List[str]) -> Dict[str, Any]:
+    """Una corrida reproducida en un proceso nuevo: tiempo total, etapas y fallos del archivo"""
+    with tempfile.TemporaryDirectory(prefix="replay_run_") as state_dir:
+        trace_file = os.path.join(state_dir, "trace.json")
+        env = dict(os.environ)
+        env.update({
+            "SCRAPER_STATE_DIR": state_dir,
+            "SCRAPER_TRACE_FILE": trace_file,
+            "SCRAPER_FULL_RUN": "1",
+            "SCRAPER_RESUME": "0",
+            "POSTGRES_HOST": "",
+            "PROMETHEUS_PUSHGATEWAY_URL": "",
+        })
+        env.pop(ARCHIVE_ENV, None)
+        env.pop(MODE_ENV, None)
+        # Las llamadas se responden desde el archivo, pero el scraper solo las hace si hay credenciales
+        env.setdefault("OPENAI_API_KEY", "sk-replay")
+        env.setdefault("TELEGRAM_BOT_TOKEN", "replay")
+
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "multithreaded_ai_scraper.py", "--replay-network", archive, *extra_args],
+            cwd=SCRAPER_DIR, env=env, capture_output=True, text=True
+        )
+        wall_time = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise RuntimeError(f"La corrida reproducida falló ({proc.returncode}):\n{proc.stdout[-2000:]}{proc.stderr[-2000:]}")
+
+        stages: Dict[str, float] = {}
+        if os.path.exists(trace_file):
+            with open(trace_file) as f:
+                for event in json.load(f)["traceEvents"]:
+                    if event.get("ph") == "X":
+                        stages[event["cat"]] = stages.get(event["cat"], 0.0) + event["dur"] / 1000
+        missed = 0
+        summary_file = os.path.join(state_dir, SUMMARY_FILE)
+        if os.path.exists(summary_file):
+            with open(summary_file) as f:
+                missed = sum(counts.get("missed", 0) for counts in json.load(f)["counts"].values())
+        return {"wall_time_s": wall_time, "stages_ms": stages, "missed": missed}
+
+def run(archive: str, iterations: int, extra_args: List[str]) -> Dict[str, Any]:
+    runs = []
+    for iteration in range(iterations):
+        result = run_once(archive, extra_args)
+        missed = f", {result['missed']} peticiones sin archivar" if result["missed"] else ""
+        print(f"▶️ Iteración {iteration + 1}/{iterations}: {result['wall_time_s']:.2f} s{missed}")
+        runs.append(result)
+
+    stage_names = sorted({stage for result in runs for stage in result["stages_ms"]})
+    return {
+        "revision": git_revision(),
+        "environment": environment(),
+        "archive": archive,
+        "iterations": iterations,
+        "wall_time_s": round(statistics.median(r["wall_time_s"] for r in runs), 3),
+        "stages_ms": {
+            stage: round(statistics.median(r["stages_ms"].get(stage, 0.0) for r in runs), 1)
+            for stage in stage_names
+        },
+        "missed": max(r["missed"] for r in runs),
+    }
+
+def compare(base_path: str, new_path: str, max_regression: float) -> bool:
+    """Imprimir la diferencia entre dos reportes; False si algo empeoró más de max_regression %"""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    regressions = []
+
+    def row(label: str, old: float, current: float, unit: str):
+        change = (current - old) / old * 100 if old else 0.0
+        flag = ""
+        if old and change > max_regression:
+            regressions.append(label)
+            flag = " ❌"
+        print(f"{label:<24} {old:>10.1f} → {current:>10.1f} {unit} {change:+6.1f}%{flag}")
+
+    print(f"📊 {base.get('revision')} → {new.get('revision')}")
+    row("total", base["wall_time_s"], new["wall_time_s"], "s ")
+    for stage, current in new["stages_ms"].items():
+        if stage in base["stages_ms"]:
+            row(stage, base["stages_ms"][stage], current, "ms")
+    if new.get("missed"):
+        print(f"⚠️ {new['missed']} peticiones no estaban en el archivo: regrabar con --capture")
+    if regressions:
+        print(f"❌ Regresión de más de {max_regression}% en: {', '.join(regressions)}")
+    return not regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la corrida completa reproducida desde un archivo de red")
+    parser.add_argument('archive', nargs='?', help="Directorio grabado con --capture")
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--processes', type=int, help="Pasar --processes al scraper")
+    parser.add_argument('--output', help="Guardar el reporte JSON en este archivo")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Comparar dos reportes y salir")
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help="Con --compare: porcentaje de empeoramiento que hace fallar (por defecto 10)")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.compare:
+        return 0 if compare(*args.compare, args.max_regression) else 1
+    if not args.archive:
+        sys.exit("Indica el directorio del archivo de red (grabado con --capture)")
+
+    extra_args = ['--processes', str(args.processes)] if args.processes else []
+    report = run(args.archive, args.iterations, extra_args)
+    print(f"⏱️ Total (mediana): {report['wall_time_s']} s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Reporte guardado en {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
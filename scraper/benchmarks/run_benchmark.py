@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline de los scrapers por sitio y de las fuentes de reventa.
+
+Todas las páginas se sirven desde benchmarks/fixtures (interceptando las rutas
+de Playwright y la sesión de requests de ImprovedPriceChecker); cualquier otra
+petición se aborta, así que los números no dependen de la red y se pueden
+comparar entre commits.
+
+Uso (desde scraper/):
+    python -m benchmarks.run_benchmark --iterations 3 --output bench.json
+    python -m benchmarks.run_benchmark --skip-waits --sites Amazon Walmart
+    python -m benchmarks.run_benchmark --compare base.json bench.json
+    python -m benchmarks.run_benchmark --record --iterations 1   # regrabar fixtures con la red real
+    python -m benchmarks.run_benchmark --no-block --output sin_bloqueo.json   # sin el perfil de intercepción
+
+Sale con código 1 si alguna búsqueda falla, también las que el cliente atrapa
+y devuelve como "sin resultados" (--allow-errors para no fallar).
+
+Por sitio se reporta páginas/segundo, latencia p50/p95/p99, llamadas al
+protocolo del driver (cada una es un mensaje CDP hacia Chromium) y resultados
+extraídos; para la corrida completa, el pico de RSS del árbol de procesos
+(Python + driver + Chromium).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.browser_hooks import register_context_hook, unregister_context_hook
+from app.resource_governor import process_tree_rss
+from api_clients import interception
+from api_clients.free_apis import FreeAPIClient
+from api_clients.site_adapters import SITE_ADAPTERS
+from price_research.improved_price_checker import ImprovedPriceChecker
+from benchmarks.fixtures import FixtureSet, FixtureAdapter
+
+# Fuente de reventa -> método de ImprovedPriceChecker
+RESALE_METHODS = {
+    'Resale:MercadoLibreAPI': '_search_with_apis',
+    'Resale:Scraping': '_search_with_improved_scraping',
+    'Resale:GoogleShopping': '_search_google_shopping',
+}
+
+DEFAULT_QUERY = "audifonos bluetooth"
+
+class DriverCallCounter:
+    """Cuenta los mensajes que el cliente de Playwright envía al driver.
+
+    Cada mensaje del protocolo se traduce en una o más llamadas CDP a Chromium,
+    así que es la medida más cercana a "llamadas CDP" sin abrir una sesión CDP
+    aparte. El contador es global; se lee antes y después de cada sitio.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def install(self):
+        from playwright._impl._connection import Connection
+
+        self._original = Connection._send_message_to_server
+        counter = self
+
+        def counting_send(connection, *args, **kwargs):
+            counter.count += 1
+            return counter._original(connection, *args, **kwargs)
+
+        Connection._send_message_to_server = counting_send
+
+    def uninstall(self):
+        if self._original is not None:
+            from playwright._impl._connection import Connection
+            Connection._send_message_to_server = self._original
+            self._original = None
+
+class RSSSampler:
+    """Muestrea el RSS del proceso y sus hijos (driver y Chromium) en un hilo aparte"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, process_tree_rss())
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, process_tree_rss())
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = (len(ordered) - 1) * pct / 100
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+def count_results(result: Any) -> int:
+    if isinstance(result, dict):
+        return sum(len(prices) for prices in result.values() if isinstance(prices, list))
+    if isinstance(result, list):
+        return len(result)
+    return 0
+
+def skip_page_waits():
+    """Convertir page.wait_for_timeout en no-op (mide el trabajo real, no las pausas fijas)"""
+    from playwright.async_api import Page
+
+    async def no_wait(self, timeout):
+        return None
+
+    Page.wait_for_timeout = no_wait
+
+async def time_call(name: str, call: Callable, iterations: int, counter: DriverCallCounter,
+                    fixtures: FixtureSet, swallowed_errors: Callable[[], int] = lambda: 0) -> Dict[str, Any]:
+    """Medir `iterations` llamadas; cuenta como error la que lanza una excepción o la que
+    sube swallowed_errors() (fallos que el cliente atrapa y devuelve como "sin resultados")"""
+    latencies = []
+    results = []
+    errors = 0
+    calls_before = counter.count
+    served_before = fixtures.served
+    blocked_before = fixtures.blocked
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        swallowed_before = swallowed_errors()
+        try:
+            results.append(count_results(await call()))
+            if swallowed_errors() > swallowed_before:
+                errors += 1
+        except Exception as e:
+            errors += 1
+            print(f"⚠️ {name}: {e}")
+        latencies.append(time.perf_counter() - start)
+
+    total = sum(latencies)
+    stats = {
+        'iterations': iterations,
+        'errors': errors,
+        'pages_per_sec': round(iterations / total, 3) if total else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1),
+        },
+        'driver_calls': (counter.count - calls_before) // iterations,
+        'fixtures_served': fixtures.served - served_before,
+        'requests_blocked': fixtures.blocked - blocked_before,
+        'results': min(results) if results else 0,
+    }
+    print(f"⏱️ {name:<24} {stats['pages_per_sec']:>7.2f} pág/s  p50 {stats['latency_ms']['p50']:>8.1f} ms  "
+          f"p95 {stats['latency_ms']['p95']:>8.1f} ms  driver {stats['driver_calls']:>5}  resultados {stats['results']}"
+          + (f"  ❌ {errors} errores" if errors else ""))
+    return stats
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment() -> Dict[str, Any]:
+    try:
+        from importlib.metadata import version
+        playwright_version = version('playwright')
+    except Exception:
+        playwright_version = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'playwright': playwright_version,
+        'cpu_count': os.cpu_count(),
+    }
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    fixtures = FixtureSet()
+    route_handler = fixtures.record_route if args.record else fixtures.replay_route
+
+    async def serve_fixtures(context, site):
+        await context.route("**/*", route_handler)
+
+    register_context_hook(serve_fixtures, first=True)
+    interception.ENABLED = not args.no_block
+    counter = DriverCallCounter()
+    counter.install()
+    if args.skip_waits:
+        skip_page_waits()
+
+    sampler = RSSSampler()
+    sampler.start()
+    started = time.perf_counter()
+    sites: Dict[str, Any] = {}
+
+    try:
+        async with FreeAPIClient() as client:
+            for site in SITE_ADAPTERS:
+                if args.sites and site not in args.sites:
+                    continue
+                sites[site] = await time_call(
+                    site, lambda: client.search_site(site, args.query, args.limit), args.iterations, counter, fixtures
+                )
+
+        if not args.skip_resale:
+            checker = ImprovedPriceChecker()
+            if not args.record:
+                adapter = FixtureAdapter(fixtures)
+                checker.session.mount('https://', adapter)
+                checker.session.mount('http://', adapter)
+            for source, method in RESALE_METHODS.items():
+                if args.sites and source not in args.sites:
+                    continue
+                lookup = getattr(checker, method)
+                sites[source] = await time_call(source, lambda: lookup(args.query), args.iterations, counter, fixtures,
+                                                swallowed_errors=lambda: checker.errors)
+    finally:
+        sampler.stop()
+        counter.uninstall()
+        unregister_context_hook(serve_fixtures)
+
+    return {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'environment': environment(),
+        'config': {
+            'query': args.query,
+            'limit': args.limit,
+            'iterations': args.iterations,
+            'skip_waits': args.skip_waits,
+            'record': args.record,
+            'block_resources': not args.no_block,
+        },
+        'wall_time_s': round(time.perf_counter() - started, 3),
+        'peak_rss_mb': round(sampler.peak_bytes / (1024 * 1024), 1),
+        'sites': sites,
+    }
+
+def compare(base_path: str, new_path: str):
+    """Imprimir la diferencia por sitio entre dos reportes"""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def delta(old: float, current: float) -> str:
+        if not old:
+            return "   n/a"
+        return f"{(current - old) / old * 100:+6.1f}%"
+
+    print(f"📊 {base.get('revision')} → {new.get('revision')}")
+    print(f"{'sitio':<24} {'pág/s':>16} {'p50 ms':>18} {'p95 ms':>18} {'driver':>14}")
+    for site, current in new['sites'].items():
+        old = base['sites'].get(site)
+        if not old:
+            print(f"{site:<24} (nuevo)")
+            continue
+        print(
+            f"{site:<24} {current['pages_per_sec']:>8.2f} {delta(old['pages_per_sec'], current['pages_per_sec'])} "
+            f"{current['latency_ms']['p50']:>10.1f} {delta(old['latency_ms']['p50'], current['latency_ms']['p50'])} "
+            f"{current['latency_ms']['p95']:>10.1f} {delta(old['latency_ms']['p95'], current['latency_ms']['p95'])} "
+            f"{current['driver_calls']:>6} {delta(old['driver_calls'], current['driver_calls'])}"
+        )
+    print(f"{'peak RSS (MB)':<24} {base['peak_rss_mb']:>8.1f} → {new['peak_rss_mb']:.1f} {delta(base['peak_rss_mb'], new['peak_rss_mb'])}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline de los scrapers por sitio")
+    parser.add_argument('--query', default=DEFAULT_QUERY)
+    parser.add_argument('--limit', type=int, default=5, help="Resultados por sitio")
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--sites', nargs='*', help="Solo estos sitios/fuentes (p. ej. Amazon Resale:GoogleShopping)")
+    parser.add_argument('--skip-resale', action='store_true', help="No medir las fuentes de reventa")
+    parser.add_argument('--skip-waits', action='store_true', help="Ignorar las pausas fijas wait_for_timeout")
+    parser.add_argument('--record', action='store_true', help="Usar la red real y regrabar los fixtures")
+    parser.add_argument('--no-block', action='store_true',
+                        help="Desactivar el bloqueo de imágenes/fuentes/CSS/trackers (para comparar)")
+    parser.add_argument('--output', help="Guardar el reporte JSON en este archivo")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Comparar dos reportes y salir")
+    parser.add_argument('--allow-errors', action='store_true',
+                        help="No salir con código 1 si alguna búsqueda falla (p. ej. al regrabar con la red real)")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    report = asyncio.run(run_benchmark(args))
+    print(f"🧠 Peak RSS: {report['peak_rss_mb']} MB  ⏱️ Total: {report['wall_time_s']} s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Reporte guardado en {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    # Un sitio sin resultados por excepciones (p. ej. Chromium no instalado) no es una medición válida
+    failed = {name: stats['errors'] for name, stats in report['sites'].items() if stats['errors']}
+    if failed and not args.allow_errors:
+        print(f"❌ Búsquedas con error: {', '.join(f'{name} ({count}/{args.iterations})' for name, count in failed.items())}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
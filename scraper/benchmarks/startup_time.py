@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tiempo de arranque del scraper medido con `python -X importtime`.
+
+Importa el módulo en un proceso nuevo varias veces y reporta la mediana del
+tiempo de importación acumulado y los imports directos más pesados. También
+verifica que los módulos pesados (Playwright, OpenAI, SQLAlchemy, aiohttp,
+requests) no se importen al arrancar: se cargan en su primer uso.
+
+Uso (desde scraper/):
+    python -m benchmarks.startup_time
+    python -m benchmarks.startup_time --runs 10 --max-ms 300 --output startup.json
+    python -m benchmarks.startup_time --module api_clients.free_apis --allow-heavy
+
+Sale con código 1 si la mediana pasa de --max-ms o si se importa algún módulo
+pesado, así que sirve como chequeo en CI.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULE = "multithreaded_ai_scraper"
+HEAVY_MODULES = ("playwright", "openai", "sqlalchemy", "aiohttp", "requests")
+
+# "import time:       428 |      27428 |   certifi"
+LINE_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def measure_once(module: str) -> List[Dict[str, Any]]:
+    """Una importación en un proceso nuevo: [{name, self_us, cumulative_us, depth}]"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRAPER_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} falló:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                "name": name,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": len(indent) // 2,
+            })
+    return entries
+
+def direct_imports(entries: List[Dict[str, Any]], module: str) -> List[Dict[str, Any]]:
+    """Imports hechos directamente por el módulo (un nivel por debajo en el árbol de importtime)"""
+    target = next((e for e in entries if e["name"] == module), None)
+    if target is None:
+        return []
+    index = entries.index(target)
+    children = []
+    # importtime imprime cada módulo después de sus hijos
+    for entry in reversed(entries[:index]):
+        if entry["depth"] <= target["depth"]:
+            break
+        if entry["depth"] == target["depth"] + 1:
+            children.append(entry)
+    return children
+
+def run(module: str, runs: int, top: int) -> Dict[str, Any]:
+    totals = []
+    children: Dict[str, List[int]] = {}
+    imported = set()
+    for _ in range(runs):
+        entries = measure_once(module)
+        total = next((e["cumulative_us"] for e in entries if e["name"] == module), 0)
+        totals.append(total)
+        imported.update(e["name"] for e in entries)
+        for child in direct_imports(entries, module):
+            children.setdefault(child["name"], []).append(child["cumulative_us"])
+
+    heaviest = sorted(((statistics.median(values), name) for name, values in children.items()), reverse=True)[:top]
+    return {
+        "module": module,
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "median_ms": round(statistics.median(totals) / 1000, 1),
+        "min_ms": round(min(totals) / 1000, 1),
+        "heaviest_imports": [{"name": name, "median_ms": round(us / 1000, 1)} for us, name in heaviest],
+        "heavy_modules_loaded": sorted(
+            heavy for heavy in HEAVY_MODULES if any(name == heavy or name.startswith(heavy + ".") for name in imported)
+        ),
+    }
+
+def print_report(report: Dict[str, Any]):
+    print(f"⏱️ import {report['module']}: mediana {report['median_ms']} ms, "
+          f"mínimo {report['min_ms']} ms ({report['runs']} corridas, Python {report['python']})")
+    for entry in report["heaviest_imports"]:
+        print(f"   {entry['median_ms']:>8.1f} ms  {entry['name']}")
+    if report["heavy_modules_loaded"]:
+        print(f"⚠️ Módulos pesados importados al arrancar: {', '.join(report['heavy_modules_loaded'])}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de arranque del scraper (python -X importtime)")
+    parser.add_argument('--module', default=DEFAULT_MODULE)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="Imports directos más pesados a mostrar")
+    parser.add_argument('--max-ms', type=float, help="Fallar si la mediana pasa de este tiempo")
+    parser.add_argument('--allow-heavy', action='store_true', help="No fallar si se importan módulos pesados")
+    parser.add_argument('--output', help="Guardar el reporte JSON en este archivo")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run(args.module, args.runs, args.top)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failed = False
+    if args.max_ms is not None and report["median_ms"] > args.max_ms:
+        print(f"❌ El arranque ({report['median_ms']} ms) supera el límite de {args.max_ms} ms")
+        failed = True
+    if report["heavy_modules_loaded"] and not args.allow_heavy:
+        print("❌ Los módulos pesados deben importarse en su primer uso, no al arrancar")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,30 +3,55 @@
 Sistema de scraping multihilo con 20 productos IA y múltiples chats
 """
 
+import argparse
 import asyncio
 import json
 import os
+import signal
+import socket
 import sys
 import random
 import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from playwright.async_api import async_playwright
-import openai
-from price_research.improved_price_checker import ImprovedPriceChecker
-import requests
-import concurrent.futures
-from threading import Thread
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 import queue
 
-# Import free API clients
-from api_clients.free_apis import search_products_free
+# Playwright, OpenAI, requests, SQLAlchemy y los clientes de sitios se importan
+# en el primer uso: un arranque corto (--help, un worker de cola, un smoke run)
+# no paga sus ~1.3 s de importación (python -m benchmarks.startup_time)
+from api_clients.site_adapters import configured_adapters
+
+if TYPE_CHECKING:
+    from api_clients.free_apis import UnifiedFreeAPIClient
+    from app.concurrency import AdaptiveLimiter
 
 # Agregar path para imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Importar generador de productos
-from scraper.ai.product_generator import ProductGenerator
+# Tiempos por etapa (SCRAPER_TRACE_FILE=traza.json guarda una traza de Chrome)
+from app.profiler import profiler, TRACE_FILE_ENV
+
+# Métricas Prometheus (SCRAPER_METRICS_PORT o PROMETHEUS_PUSHGATEWAY_URL)
+from app import metrics
+from app.concurrency import CONCURRENCY, get_limiter
+from app.resource_governor import get_governor
+from app.fingerprints import FingerprintStore, UNCHANGED
+from notifier.dedup_ledger import NotificationLedger
+from app.checkpoint import RunCheckpoint
+from app.run_recording import RECORD_RUN, ReplaySiteClient, RunRecording
+# Captura/reproducción de todo el tráfico de red (SCRAPER_NETWORK_ARCHIVE + SCRAPER_NETWORK_MODE)
+from app import network_archive
+from app.work_queue import IDLE_SECONDS, LEASE_SECONDS, WORK_QUEUE, Lease, new_run_id, open_queue
+from app.sharding import PROCESSES, multiprocess_metrics_dir, remove_metrics_dir, run_shards, split_round_robin
+from app.scheduler import (
+    IntervalScheduler, PairStatsStore, PriorityScheduler, RUN_BUDGET_SEARCHES, RUN_BUDGET_SECONDS
+)
+
+# Modo daemon: cada cuánto se regeneran los productos y se imprime/guarda el estado
+DAEMON_PRODUCT_REFRESH_SECONDS = float(os.getenv("SCRAPER_PRODUCT_REFRESH_HOURS", "6")) * 3600
+DAEMON_REPORT_SECONDS = float(os.getenv("SCRAPER_DAEMON_REPORT_MINUTES", "60")) * 60
+DAEMON_SHUTDOWN_TIMEOUT = float(os.getenv("SCRAPER_DAEMON_SHUTDOWN_SECONDS", "120"))
 
 # Configuración - Usar variables de entorno
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -34,12 +59,13 @@ TELEGRAM_CHAT_ID_HIGH = os.getenv("TELEGRAM_CHAT_ID_HIGH", "-1003150179214")  #
 TELEGRAM_CHAT_ID_MEDIUM = os.getenv("TELEGRAM_CHAT_ID_MEDIUM", "-4871231611")  # Chat para descuentos 20-50%
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Verificar configuración de Telegram
-if not TELEGRAM_BOT_TOKEN:
-    print("⚠️ ADVERTENCIA: TELEGRAM_BOT_TOKEN no está configurado. Las notificaciones no funcionarán.")
-    print("   Configura la variable de entorno TELEGRAM_BOT_TOKEN con tu token de bot de Telegram.")
-else:
-    print(f"✅ Telegram Bot Token configurado: {TELEGRAM_BOT_TOKEN[:10]}...")
+def print_config_status():
+    """Verificar configuración de Telegram"""
+    if not TELEGRAM_BOT_TOKEN:
+        print("⚠️ ADVERTENCIA: TELEGRAM_BOT_TOKEN no está configurado. Las notificaciones no funcionarán.")
+        print("   Configura la variable de entorno TELEGRAM_BOT_TOKEN con tu token de bot de Telegram.")
+    else:
+        print(f"✅ Telegram Bot Token configurado: {TELEGRAM_BOT_TOKEN[:10]}...")
 
 class MultithreadedAIScraper:
     """Scraper multihilo con 20 productos IA y múltiples chats"""
@@ -67,20 +93,52 @@ class MultithreadedAIScraper:
         self.execution_time = datetime.now()
         self.ai_products = []
         
-        # Configurar OpenAI
-        if OPENAI_API_KEY and OPENAI_API_KEY != "your_openai_api_key_here":
-            self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        else:
-            print("⚠️ ADVERTENCIA: OPENAI_API_KEY no configurado. Usando productos de fallback.")
-            self.openai_client = None
+        # OpenAI, el verificador de precios y la BD se crean en su primer uso (ver las propiedades abajo)
         
-        # Configurar verificador de precios reales mejorado
-        self.price_checker = ImprovedPriceChecker()
-        print(f"✅ Verificador de precios reales mejorado configurado")
+        # Huellas de listados de corridas anteriores (los que no cambiaron no se reprocesan)
+        self.fingerprints = FingerprintStore()
+        # Ofertas ya notificadas por chat (evita reenviar la misma cada hora)
+        self.notification_ledger = NotificationLedger()
+        # Resultados históricos por (producto, sitio) para priorizar búsquedas
+        self.pair_stats = PairStatsStore()
+        
+        # Checkpoint de la corrida en curso (solo el coordinador; ver app/checkpoint.py)
+        self.checkpoint: Optional[RunCheckpoint] = None
+        # Grabación de búsquedas y reventa (--record) o grabación que se reproduce (replay)
+        self.recording: Optional[RunRecording] = None
+        self.replay: Optional[RunRecording] = None
+        self.notifications_enabled = True
         
         # Queue para resultados
         self.results_queue = queue.Queue()
-        self.max_workers = 3  # Reduced to prevent EPIPE errors
+        self.max_workers = CONCURRENCY.workers
+        # Cliente de sitios con sesiones calientes, compartido por los workers durante la corrida
+        self.site_client: Optional["UnifiedFreeAPIClient"] = None
+        # Cola de trabajo mientras se procesan sus unidades: de ahí salen las huellas y notificaciones de los demás nodos
+        self.shared_state = None
+    
+    @cached_property
+    def openai_client(self):
+        """Configurar OpenAI"""
+        if OPENAI_API_KEY and OPENAI_API_KEY != "your_openai_api_key_here":
+            import openai
+            return openai.OpenAI(api_key=OPENAI_API_KEY, http_client=network_archive.openai_http_client())
+        print("⚠️ ADVERTENCIA: OPENAI_API_KEY no configurado. Usando productos de fallback.")
+        return None
+    
+    @cached_property
+    def price_checker(self):
+        """Configurar verificador de precios reales mejorado"""
+        from price_research.improved_price_checker import ImprovedPriceChecker
+        price_checker = ImprovedPriceChecker()
+        print(f"✅ Verificador de precios reales mejorado configurado")
+        return price_checker
+    
+    @cached_property
+    def deal_store(self):
+        """Persistencia de listados/ofertas (no-op si no hay BD configurada)"""
+        from scraper.storage.deal_store import DealStore
+        return DealStore()
     
     async def generate_ai_products(self) -> List[Dict[str, Any]]:
         """Generate 20 products with AI"""
@@ -88,6 +146,7 @@ class MultithreadedAIScraper:
             if self.openai_client:
                 print("🤖 Generando 20 productos con IA OpenAI...")
                 
+                from scraper.ai.product_generator import ProductGenerator
                 generator = ProductGenerator()
                 products = await generator.generate_resellable_products(20)
                 
@@ -434,20 +493,33 @@ class MultithreadedAIScraper:
             print(f"❌ Error on MercadoLibre: {e}")
             return []
     
-    async def analyze_deal_with_ai(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analizar oferta con IA usando precios reales de reventa"""
+    async def analyze_deal_with_ai(self, product_data: Dict[str, Any],
+                                   resale_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analizar oferta con IA usando precios reales de reventa (los del worker si ya los buscó)"""
         try:
-            # Obtener precios reales de reventa
-            print(f"🔍 Obteniendo precios reales de reventa para: {product_data['name']}")
-            resale_data = await self.price_checker.get_resale_prices(product_data['name'])
-            
-            # Guardar datos de reventa para usar en notificaciones
-            self._last_resale_data = resale_data
+            if resale_data is None:
+                # Obtener precios reales de reventa
+                print(f"🔍 Obteniendo precios reales de reventa para: {product_data['name']}")
+                resale_data = await self._resale_prices(product_data['name'])
             
             # Analizar oportunidad de reventa
             current_price = float(str(product_data['current_price']).replace('$', '').replace(',', ''))
             price_analysis = self.price_checker.analyze_price_opportunity(current_price, resale_data)
             
+            # IA desactivada (replay sin --with-ai o sin OPENAI_API_KEY): análisis neutral, no es un error
+            if self.openai_client is None:
+                return {
+                    'confidence_score': 0.5,
+                    'reasoning': f"Análisis IA desactivado. {price_analysis.get('reasoning', '')}".strip(),
+                    'market_opinion': 'Sin opinión',
+                    'recommendation': 'Sin recomendación',
+                    'resell_potential': 5,
+                    'is_correct_product': True,
+                    'real_discount': True,
+                    'market_price_range': resale_data.get('price_range') or 'No disponible',
+                    'resell_price_estimate': 'No disponible'
+                }
+            
             # Obtener precio estimado del producto original
             original_product = None
             for product in self.ai_products:
@@ -496,15 +568,17 @@ class MultithreadedAIScraper:
             Responde SOLO en formato JSON válido.
             """
             
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Eres un experto en análisis de ofertas. Responde SOLO en JSON válido."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=300
-            )
+            with profiler.span('ai_call', 'deal_analysis', site=product_data['site']) as span:
+                response = self.openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": "Eres un experto en análisis de ofertas. Responde SOLO en JSON válido."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=300
+                )
+            metrics.record_openai('deal_analysis', span.duration, response.usage)
             
             ai_response = response.choices[0].message.content.strip()
             
@@ -599,13 +673,41 @@ class MultithreadedAIScraper:
                 'resell_potential': 5
             }
     
-    async def send_telegram_notification(self, deal_data: Dict[str, Any], ai_analysis: Dict[str, Any], chat_id: str, discount_type: str):
-        """Enviar notificación a Telegram con análisis IA"""
+    def _post_telegram(self, url: str, data: Dict[str, Any], kind: str):
+        """sendMessage con span de tiempo y métricas de latencia/estado"""
+        status_code = None
+        with profiler.span('telegram_send', kind) as span:
+            try:
+                import requests
+                response = requests.post(url, data=data, timeout=10)
+                status_code = response.status_code
+                return response
+            finally:
+                metrics.record_telegram(kind, time.perf_counter() - span.start, status_code)
+    
+    async def send_telegram_notification(self, deal_data: Dict[str, Any], ai_analysis: Dict[str, Any], chat_id: str, discount_type: str) -> Optional[bool]:
+        """Enviar notificación a Telegram con análisis IA.
+
+        Devuelve True si se envió, False si el envío falló y None si no había que enviar
+        (notificaciones desactivadas, sin token o ya notificada).
+        """
         try:
+            if not self.notifications_enabled:
+                print(f"🔇 Notificación {discount_type} desactivada: {deal_data['name'][:30]}...")
+                return None
+            
             # Verificar si el bot token está configurado
             if not TELEGRAM_BOT_TOKEN:
                 print(f"⚠️ No se puede enviar notificación {discount_type}: TELEGRAM_BOT_TOKEN no configurado")
-                return
+                return None
+            
+            # Misma oferta ya enviada a este chat (dentro del enfriamiento y sin bajar de precio),
+            # también por otro nodo de la cola que procesó la misma unidad
+            if self.shared_state:
+                await self._pull_notification(deal_data, chat_id)
+            if not self.notification_ledger.should_send(deal_data, chat_id):
+                print(f"🔕 Oferta ya notificada a chat {chat_id}, se omite: {deal_data['name'][:30]}...")
+                return None
             
             confidence = ai_analysis['confidence_score']
             reasoning = ai_analysis['reasoning']
@@ -688,17 +790,23 @@ class MultithreadedAIScraper:
                 print(f"⚠️ No hay botones para agregar")
             
             print(f"📤 Enviando notificación {discount_type} a chat {chat_id}...")
-            response = requests.post(url, data=data, timeout=10)
+            response = self._post_telegram(url, data, discount_type)
             
             if response.status_code == 200:
                 print(f"✅ Notificación {discount_type} enviada exitosamente")
                 self.notifications_sent += 1
+                self.notification_ledger.record(deal_data, chat_id)
+                if self.shared_state:
+                    await self._push_notification(deal_data, chat_id)
+                return True
             else:
                 print(f"❌ Error enviando notificación {discount_type}: {response.status_code}")
                 print(f"   Respuesta: {response.text}")
+                return False
                 
         except Exception as e:
             print(f"❌ Error en notificación {discount_type}: {e}")
+            return False
     
     async def send_summary_with_ai(self):
         """Enviar resumen con análisis IA"""
@@ -725,15 +833,17 @@ class MultithreadedAIScraper:
             Responde SOLO en formato JSON válido.
             """
             
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Eres un experto en análisis de mercado. Responde SOLO en JSON válido."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=300
-            )
+            with profiler.span('ai_call', 'summary') as span:
+                response = self.openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": "Eres un experto en análisis de mercado. Responde SOLO en JSON válido."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=300
+                )
+            metrics.record_openai('summary', span.duration, response.usage)
             
             ai_response = response.choices[0].message.content.strip()
             
@@ -799,7 +909,7 @@ class MultithreadedAIScraper:
                     'parse_mode': 'HTML'
                 }
                 
-                response = requests.post(url, data=data, timeout=10)
+                response = self._post_telegram(url, data, 'summary')
                 
                 if response.status_code == 200:
                     print(f"✅ Summary sent to {chat_name}")
@@ -838,7 +948,7 @@ class MultithreadedAIScraper:
                     'parse_mode': 'HTML'
                 }
                 
-                response = requests.post(url, data=data, timeout=10)
+                response = self._post_telegram(url, data, 'no_deals')
                 
                 if response.status_code == 200:
                     print(f"✅ No deals notification sent to {chat_name}")
@@ -848,18 +958,109 @@ class MultithreadedAIScraper:
         except Exception as e:
             print(f"❌ Error sending no deals notification: {e}")
     
-    async def scrape_product_worker_with_semaphore(self, product: Dict[str, Any], worker_id: int, semaphore: asyncio.Semaphore):
+    async def scrape_product_worker_with_semaphore(self, product: Dict[str, Any], worker_id: int, semaphore: "AdaptiveLimiter",
+                                                   sites: Optional[List[str]] = None, deadline: Optional[float] = None):
         """Worker with semaphore to limit concurrent execution"""
         async with semaphore:
-            await self.scrape_product_worker(product, worker_id)
+            # Presupuesto de tiempo agotado: lo que queda es lo de menor prioridad
+            if deadline is not None and time.monotonic() >= deadline:
+                print(f"⏳ Worker {worker_id}: presupuesto de tiempo agotado, se omite {product['nombre_exacto']}")
+                return
+            profiler.set_track(f"worker-{worker_id}")
+            with profiler.span('worker', product['nombre_exacto']):
+                site_stats = await self.scrape_product_worker(product, worker_id, sites=sites)
+            for site in sites or site_stats:
+                self.pair_stats.record(product['nombre_exacto'], site, **site_stats.get(site, {}))
+            if self.checkpoint:
+                # Solo los sitios que llegaron a buscarse; el resto se reintenta al reanudar
+                self.checkpoint.mark_done(product['nombre_exacto'], [site for site in sites or site_stats if site in site_stats])
+                self._save_checkpoint(force=True)
+    
+    def _save_checkpoint(self, force: bool = False):
+        """Guardar huellas, registro de notificaciones y estadísticas, y luego el checkpoint que depende de ellos"""
+        if not self.checkpoint or not (force or self.checkpoint.due()):
+            return
+        self.fingerprints.save()
+        self.notification_ledger.save()
+        self.pair_stats.save()
+        self.checkpoint.save(self.high_discount_deals, self.medium_discount_deals, self.notifications_sent)
+    
+    @staticmethod
+    def _parse_price(price: str) -> float:
+        price_text = price.replace('$', '').replace(',', '').replace('MXN', '').strip()
+        return float(price_text.split()[0])
+    
+    async def _resale_prices(self, name: str) -> Dict[str, Any]:
+        """Precios de reventa del verificador, o de la grabación al reproducir una corrida"""
+        if self.replay:
+            return self.replay.resale_prices(name)
+        resale_data = await self.price_checker.get_resale_prices(name)
+        if self.recording:
+            self.recording.record_resale(name, resale_data)
+        return resale_data
+    
+    async def _score_listing(self, result: Dict[str, Any], price_value: float, product: Optional[Dict[str, Any]],
+                             worker_id: int) -> Tuple[float, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Descuento contra el precio de reventa (o el estimado) y, si es oferta (>=20%), su análisis IA.
+
+        Devuelve (descuento, deal_data, ai_analysis); deal_data y ai_analysis son None si no es oferta.
+        No guarda en BD ni notifica.
+        """
+        # Obtener precios de reventa reales para calcular descuento real
+        print(f"🔍 Worker {worker_id}: Obteniendo precios de reventa para {result['name'][:30]}...")
+        resale_data = await self._resale_prices(result['name'])
+        
+        # Calcular descuento basado en precio de reventa real
+        avg_resale_price = resale_data.get('average_resale_price', 0)
+        if avg_resale_price > 0:
+            # Usar precio de reventa como referencia
+            estimated_price = avg_resale_price  # Usar precio de reventa como referencia
+            discount = ((avg_resale_price - price_value) / avg_resale_price) * 100
+            print(f"💰 Worker {worker_id}: Precio reventa: ${avg_resale_price:,.0f} - Descuento real: {discount:.1f}%")
+        else:
+            # Fallback al precio estimado si no hay datos de reventa
+            estimated_price = (product or {}).get('precio_estimado', 10000)
+            discount = ((estimated_price - price_value) / estimated_price) * 100
+            print(f"💰 Worker {worker_id}: Sin datos reventa - Usando precio estimado: ${estimated_price:,.0f} - Descuento: {discount:.1f}%")
+        
+        print(f"💰 Worker {worker_id}: Found {result['name'][:30]}... - Price: {result['price']} - Discount: {discount:.1f}%")
+        
+        if discount < 20:
+            return discount, None, None
+        
+        deal_data = {
+            'name': result['name'],
+            'current_price': result['price'],
+            'price_value': price_value,
+            'estimated_price': estimated_price,
+            'discount_percentage': discount,
+            'site': result['site'],
+            'url': result.get('url', '')
+        }
+        
+        # Análisis con IA (con los mismos datos de reventa, sin volver a buscarlos)
+        ai_analysis = await self.analyze_deal_with_ai(deal_data, resale_data)
+        
+        # Agregar datos de reventa reales al deal_data
+        deal_data['resale_data'] = resale_data
+        print(f"💰 Worker {worker_id}: Datos de reventa agregados - Precio promedio: ${resale_data.get('average_resale_price', 0):,.0f}")
+        return discount, deal_data, ai_analysis
     
-    async def scrape_product_worker(self, product: Dict[str, Any], worker_id: int):
-        """Worker for scraping a product using APIs (multithreaded)"""
+    async def scrape_product_worker(self, product: Dict[str, Any], worker_id: int,
+                                    sites: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """Worker for scraping a product using APIs (multithreaded)
+
+        Returns per-site counts of listings, new/changed listings and deals,
+        which the daemon scheduler uses to tune each (product, site) interval.
+        """
+        site_stats: Dict[str, Dict[str, int]] = {}
         try:
             print(f"🔄 Worker {worker_id}: Processing {product['nombre_exacto']}")
             
-            # Add small delay to reduce system load
-            await asyncio.sleep(worker_id * 0.5)  # Stagger requests
+            # Add small delay to reduce system load (no hace falta al reproducir una grabación)
+            if not self.replay:
+                with profiler.span('stagger_sleep'):
+                    await asyncio.sleep(worker_id * 0.5)  # Stagger requests
             
             # Use unified API client instead of scraping
             search_query = product['keywords_busqueda']
@@ -870,12 +1071,20 @@ class MultithreadedAIScraper:
             
             print(f"🔍 Worker {worker_id}: Searching '{search_query}' via APIs...")
             
-            # Search all sites using free APIs
-            api_results = await search_products_free(search_query, limit_per_site=3)
+            # Search all sites using free APIs (cada sitio registra su propio span)
+            with profiler.span('search_all_sites', search_query):
+                if self.site_client:
+                    api_results = await self.site_client.search_all_sites_free(search_query, limit_per_site=3, sites=sites)
+                else:
+                    from api_clients.free_apis import search_products_free
+                    api_results = await search_products_free(search_query, limit_per_site=3)
+            if self.recording:
+                self.recording.record_search(search_query, api_results)
             
             # Flatten results from all sites
             all_results = []
             for site, products in api_results.items():
+                site_stats[site] = {'results': len(products), 'changed': 0, 'deals': 0}
                 for product_data in products:
                     product_data['site'] = site
                     all_results.append(product_data)
@@ -885,55 +1094,32 @@ class MultithreadedAIScraper:
             for result in all_results:
                 try:
                     # Extraer precio numérico
-                    price_text = result['price'].replace('$', '').replace(',', '').replace('MXN', '').strip()
-                    price_value = float(price_text.split()[0])
+                    price_value = self._parse_price(result['price'])
                     
-                    # Obtener precios de reventa reales para calcular descuento real
-                    print(f"🔍 Worker {worker_id}: Obteniendo precios de reventa para {result['name'][:30]}...")
-                    resale_data = await self.price_checker.get_resale_prices(result['name'])
-                    self._last_resale_data = resale_data
+                    # Guardar listado y precio (actualiza también los contadores de /api/stats)
+                    with profiler.span('db_write', 'listing'):
+                        product_id = await asyncio.to_thread(
+                            self.deal_store.record_listing, result, price_value, product.get('categoria')
+                        )
                     
-                    # Calcular descuento basado en precio de reventa real
-                    avg_resale_price = resale_data.get('average_resale_price', 0)
-                    if avg_resale_price > 0:
-                        # Usar precio de reventa como referencia
-                        estimated_price = avg_resale_price  # Usar precio de reventa como referencia
-                        discount = ((avg_resale_price - price_value) / avg_resale_price) * 100
-                        print(f"💰 Worker {worker_id}: Precio reventa: ${avg_resale_price:,.0f} - Descuento real: {discount:.1f}%")
-                    else:
-                        # Fallback al precio estimado si no hay datos de reventa
-                        estimated_price = product.get('precio_estimado', 10000)
-                        discount = ((estimated_price - price_value) / estimated_price) * 100
-                        print(f"💰 Worker {worker_id}: Sin datos reventa - Usando precio estimado: ${estimated_price:,.0f} - Descuento: {discount:.1f}%")
+                    # Mismo URL, título y precio que en la corrida anterior: ya se analizó y notificó
+                    if self.fingerprints.check(result, price_value) == UNCHANGED:
+                        print(f"⏭️ Worker {worker_id}: Sin cambios desde la última corrida - {result['name'][:30]}...")
+                        continue
+                    site_stats[result['site']]['changed'] += 1
                     
-                    print(f"💰 Worker {worker_id}: Found {result['name'][:30]}... - Price: {result['price']} - Discount: {discount:.1f}%")
+                    discount, deal_data, ai_analysis = await self._score_listing(result, price_value, product, worker_id)
                     
-                    if discount >= 20:  # Solo ofertas >=20% descuento
-                        deal_data = {
-                            'name': result['name'],
-                            'current_price': result['price'],
-                            'estimated_price': estimated_price,
-                            'discount_percentage': discount,
-                            'site': result['site'],
-                            'url': result['url']
-                        }
-                        
-                        # Análisis con IA (incluye datos de reventa reales)
-                        ai_analysis = await self.analyze_deal_with_ai(deal_data)
-                        
-                        # Agregar datos de reventa reales al deal_data
-                        if hasattr(self, '_last_resale_data'):
-                            deal_data['resale_data'] = self._last_resale_data
-                            print(f"💰 Worker {worker_id}: Datos de reventa agregados - Precio promedio: ${self._last_resale_data.get('average_resale_price', 0):,.0f}")
-                        else:
-                            print(f"⚠️ Worker {worker_id}: No hay datos de reventa disponibles")
+                    if deal_data:  # Solo ofertas >=20% descuento
+                        site_stats[result['site']]['deals'] += 1
                         
                         # Clasificar por tipo de descuento
+                        telegram_sent = None
                         if discount > 50:
                             print(f"🔥 Worker {worker_id}: EXCELLENT DEAL >50% - {result['name'][:30]}... - {discount:.1f}% off")
                             self.high_discount_deals.append(deal_data)
                             if ai_analysis['confidence_score'] >= 0.65:
-                                await self.send_telegram_notification(
+                                telegram_sent = await self.send_telegram_notification(
                                     deal_data, ai_analysis, 
                                     TELEGRAM_CHAT_ID_HIGH, "high"
                                 )
@@ -941,41 +1127,375 @@ class MultithreadedAIScraper:
                             print(f"💰 Worker {worker_id}: GOOD DEAL 20-50% - {result['name'][:30]}... - {discount:.1f}% off")
                             self.medium_discount_deals.append(deal_data)
                             if ai_analysis['confidence_score'] >= 0.6:
-                                await self.send_telegram_notification(
+                                telegram_sent = await self.send_telegram_notification(
                                     deal_data, ai_analysis, 
                                     TELEGRAM_CHAT_ID_MEDIUM, "medium"
                                 )
+                        
+                        with profiler.span('db_write', 'deal'):
+                            await asyncio.to_thread(
+                                self.deal_store.record_deal, product_id, deal_data, ai_analysis, bool(telegram_sent)
+                            )
+                        
+                        # Envío fallido: sin huella, la próxima corrida lo vuelve a analizar y notificar
+                        if telegram_sent is False:
+                            self._save_checkpoint()
+                            continue
+                    
+                    self.fingerprints.commit(result, price_value)
+                    self._save_checkpoint()
                                 
                 except Exception as e:
                     continue
                     
         except Exception as e:
             print(f"❌ Error in worker {worker_id}: {e}")
+        
+        return site_stats
+    
+    async def _run_plan(self, plan: List[Tuple[str, List[str]]], products_by_name: Dict[str, Dict[str, Any]],
+                        deadline: Optional[float]):
+        """Procesar los pares (producto, sitios) del plan con los workers de este proceso"""
+        # Workers at once, from the concurrency config
+        semaphore = get_limiter().workers
+        
+        # One browser and one warm context per site serve every product,
+        # instead of a new browser per (product, site)
+        if self.replay:
+            site_client_session = ReplaySiteClient(self.replay)
+        else:
+            from api_clients.free_apis import UnifiedFreeAPIClient
+            site_client_session = UnifiedFreeAPIClient(warm_sessions=True)
+        async with site_client_session as site_client:
+            self.site_client = site_client
+            try:
+                # Create async tasks for multithreading with semaphore
+                tasks = []
+                for i, (name, sites) in enumerate(plan):
+                    task = asyncio.create_task(
+                        self.scrape_product_worker_with_semaphore(products_by_name[name], i + 1, semaphore, sites, deadline)
+                    )
+                    tasks.append(task)
+                
+                # Execute all tasks in parallel
+                print(f"🚀 Starting {len(tasks)} workers with max {self.max_workers} concurrent...")
+                await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                self.site_client = None
+    
+    async def run_shard(self, shard_index: int, units: List[Tuple[Dict[str, Any], List[str]]],
+                        budget_seconds: Optional[float]) -> Dict[str, Any]:
+        """Proceso de un shard: procesa sus unidades y devuelve lo que el coordinador debe combinar"""
+        print(f"🧩 Shard {shard_index}: {len(units)} productos")
+        profiler.reset()
+        get_limiter().reset()
+        governor = get_governor()
+        governor.start_watchdog()
+        products_by_name = {product['nombre_exacto']: product for product, _ in units}
+        plan = [(product['nombre_exacto'], sites) for product, sites in units]
+        deadline = time.monotonic() + budget_seconds if budget_seconds else None
+        try:
+            await self._run_plan(plan, products_by_name, deadline)
+        finally:
+            await governor.stop_watchdog()
+        return {
+            'shard': shard_index,
+            **self._drain_results(),
+            'profile': profiler.export(),
+            'resources': governor.summary(),
+            'concurrency': get_limiter().summary(),
+        }
+    
+    def _drain_results(self) -> Dict[str, Any]:
+        """Ofertas, huellas, notificaciones y resultados por par acumulados desde el último drenado"""
+        drained = {
+            'high_discount_deals': self.high_discount_deals,
+            'medium_discount_deals': self.medium_discount_deals,
+            'notifications_sent': self.notifications_sent,
+            'fingerprints': self.fingerprints.export(reset=True),
+            'notification_ledger': self.notification_ledger.export(reset=True),
+            'pair_outcomes': self.pair_stats.export(reset=True),
+        }
+        self.high_discount_deals = []
+        self.medium_discount_deals = []
+        self.notifications_sent = 0
+        return drained
+    
+    def _merge_results(self, results: List[Dict[str, Any]]):
+        """Combinar los resultados de shards o nodos en los acumuladores y estados de esta corrida"""
+        for result in results:
+            if 'error' in result:
+                continue
+            self.high_discount_deals.extend(result['high_discount_deals'])
+            self.medium_discount_deals.extend(result['medium_discount_deals'])
+            self.notifications_sent += result['notifications_sent']
+            self.fingerprints.merge(result['fingerprints'])
+            self.notification_ledger.merge(result['notification_ledger'])
+            self.pair_stats.merge(result['pair_outcomes'])
+            if 'profile' in result:
+                profiler.merge(result['profile'], track_prefix=f"shard-{result['shard']}/")
+            if 'concurrency' in result:
+                get_limiter().merge(result['concurrency'])
+            if 'resources' in result:
+                resources = result['resources']
+                print(f"🧩 Shard {result['shard']}: pico RSS {resources['peak_rss_mb']} MB, "
+                      f"{resources['browser_recycles']} navegadores reciclados")
+    
+    async def _run_sharded(self, plan: List[Tuple[str, List[str]]], products_by_name: Dict[str, Dict[str, Any]],
+                           deadline: Optional[float], processes: int) -> str:
+        """Repartir el plan entre procesos y combinar sus resultados; devuelve el directorio de métricas de los shards"""
+        units = [(products_by_name[name], sites) for name, sites in plan]
+        shards = split_round_robin(units, processes)
+        budget_seconds = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+        print(f"🧩 Repartiendo {len(units)} productos en {len(shards)} procesos...")
+        
+        with multiprocess_metrics_dir() as metrics_dir, profiler.span('shards'):
+            results = await run_shards(_run_shard, shards, budget_seconds)
+        
+        self._merge_results(results)
+        return metrics_dir
+    
+    async def _pull_notification(self, deal_data: Dict[str, Any], chat_id: str):
+        """Traer de la cola el último envío de esta oferta a este chat (de cualquier nodo)"""
+        ledger = self.notification_ledger
+        key = ledger.key(deal_data, chat_id)
+        entry = await self.shared_state.get_state(ledger.shared_name, key)
+        if entry:
+            ledger.refresh({key: entry})
+    
+    async def _push_notification(self, deal_data: Dict[str, Any], chat_id: str):
+        """Publicar en la cola un envío en cuanto se hizo, para que otro nodo no lo repita"""
+        ledger = self.notification_ledger
+        key = ledger.key(deal_data, chat_id)
+        await self.shared_state.put_state(ledger.shared_name, {key: ledger.entries[key]})
+    
+    async def _pull_shared_state(self):
+        """Huellas y notificaciones que confirmaron los demás nodos desde la última unidad"""
+        for store in (self.fingerprints, self.notification_ledger):
+            store.refresh(await self.shared_state.load_state(store.shared_name))
+    
+    async def _push_shared_state(self, drained: Dict[str, Any]):
+        """Publicar lo que confirmó una unidad (aunque falle o su concesión ya sea de otro nodo: ya pasó)"""
+        await self.shared_state.put_state(self.fingerprints.shared_name, drained['fingerprints']['entries'])
+        await self.shared_state.put_state(self.notification_ledger.shared_name, drained['notification_ledger']['entries'])
     
-    async def run_multithreaded_scraping(self):
+    async def _seed_shared_state(self, work_queue):
+        """Poner en la cola las huellas y notificaciones del coordinador, y traer las más nuevas de otras corridas"""
+        for store in (self.fingerprints, self.notification_ledger):
+            shared = await work_queue.load_state(store.shared_name)
+            store.refresh(shared)
+            expired = set(store.expired(store.entries))
+            await work_queue.delete_state(store.shared_name, [key for key in shared if key in expired])
+            await work_queue.put_state(store.shared_name, {
+                key: entry for key, entry in store.entries.items() if key not in expired and shared.get(key) != entry
+            })
+    
+    async def _keep_lease(self, work_queue, lease: Lease):
+        """Extender la concesión de la unidad mientras se procesa"""
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            if not await work_queue.extend(lease):
+                print(f"⚠️ Unidad {lease.unit_id}: la concesión expiró y pasó a otro nodo")
+                return
+    
+    async def _process_lease(self, work_queue, lease: Lease, worker_id: int):
+        """Procesar una unidad reclamada de la cola y confirmar su resultado"""
+        product, sites = lease.payload['product'], lease.payload['sites']
+        deadline = None
+        if lease.payload.get('deadline') is not None:
+            deadline = time.monotonic() + lease.payload['deadline'] - time.time()
+        await self._pull_shared_state()
+        heartbeat = asyncio.create_task(self._keep_lease(work_queue, lease))
+        try:
+            await self.scrape_product_worker_with_semaphore(product, worker_id, asyncio.Semaphore(1), sites, deadline)
+        except Exception:
+            # Sin confirmar: la unidad vuelve a la cola cuando expire la concesión
+            await self._push_shared_state(self._drain_results())
+            raise
+        finally:
+            heartbeat.cancel()
+        drained = self._drain_results()
+        await self._push_shared_state(drained)
+        if not await work_queue.complete(lease, {'unit_id': lease.unit_id, **drained}):
+            print(f"♻️ Unidad {lease.unit_id}: ya tenía resultado, la concesión pasó a otro nodo o la corrida terminó; se descarta")
+    
+    async def serve_queue(self, work_queue, stop: asyncio.Event, worker_id: int = 1,
+                          site_client: Optional["UnifiedFreeAPIClient"] = None):
+        """Reclamar y procesar unidades de la cola, una a la vez, hasta que se active stop"""
+        if site_client is None:
+            from api_clients.free_apis import UnifiedFreeAPIClient
+            async with UnifiedFreeAPIClient(warm_sessions=True) as site_client:
+                await self.serve_queue(work_queue, stop, worker_id, site_client)
+            return
+        consumer = f"{socket.gethostname()}-{os.getpid()}-{worker_id}"
+        self.site_client = site_client
+        self.shared_state = work_queue
+        try:
+            while not stop.is_set():
+                lease = await work_queue.claim(consumer)
+                if lease is None:
+                    try:
+                        await asyncio.wait_for(stop.wait(), timeout=IDLE_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                print(f"📥 Nodo {consumer}: unidad {lease.unit_id} (intento {lease.attempts})")
+                try:
+                    await self._process_lease(work_queue, lease, worker_id)
+                except Exception as e:
+                    print(f"❌ Unidad {lease.unit_id}: {e}")
+        finally:
+            self.site_client = None
+            self.shared_state = None
+    
+    async def _serve_queue_workers(self, work_queue, stop: asyncio.Event):
+        """max_workers consumidores de la cola; cada uno con su instancia, así cada resultado es solo de su unidad.
+        
+        Comparten un solo cliente de sitios (un navegador caliente), como los workers de una corrida normal,
+        y las huellas y notificaciones a través de la cola (ver _pull_shared_state).
+        """
+        from api_clients.free_apis import UnifiedFreeAPIClient
+        async with UnifiedFreeAPIClient(warm_sessions=True) as site_client:
+            workers = [MultithreadedAIScraper().serve_queue(work_queue, stop, worker_id, site_client)
+                       for worker_id in range(1, self.max_workers + 1)]
+            await asyncio.gather(*workers)
+    
+    async def _run_queued(self, plan: List[Tuple[str, List[str]]], products_by_name: Dict[str, Dict[str, Any]],
+                          deadline: Optional[float], queue_kind: str):
+        """Publicar el plan en la cola de trabajo, procesar como un nodo más y combinar los resultados"""
+        work_queue = open_queue(queue_kind)
+        deadline_wall = time.time() + deadline - time.monotonic() if deadline is not None else None
+        units = [{'product': products_by_name[name], 'sites': sites, 'deadline': deadline_wall} for name, sites in plan]
+        await self._seed_shared_state(work_queue)
+        queue_run = self.checkpoint.queue_run if self.checkpoint else None
+        run_id = None
+        if queue_run and queue_run[0] == queue_kind:
+            # Reanudación: las unidades y los resultados ya confirmados siguen en la cola
+            run_id = queue_run[1]
+            if await work_queue.outstanding(run_id) or await work_queue.results(run_id):
+                print(f"♻️ Corrida {run_id}: esperando sus {len(units)} unidades en la cola ({queue_kind})")
+            else:
+                print(f"⚠️ Corrida {run_id}: la cola ya no la tiene, se publica de nuevo")
+                run_id = None
+        if run_id is None:
+            run_id = new_run_id()
+            await work_queue.publish(run_id, units)
+            if self.checkpoint:
+                self.checkpoint.set_queue_run(queue_kind, run_id)
+            print(f"📤 Corrida {run_id}: {len(units)} unidades publicadas en la cola ({queue_kind})")
+        
+        # El coordinador también procesa unidades (con otras instancias: lo suyo vuelve por la cola, sin contarse dos veces)
+        stop = asyncio.Event()
+        local_node = asyncio.create_task(self._serve_queue_workers(work_queue, stop))
+        results: Dict[str, Dict[str, Any]] = {}
+        finished = False
+        try:
+            with profiler.span('work_queue', run_id):
+                while len(results) < len(units):
+                    if local_node.done():
+                        local_node.result()
+                    if deadline_wall is not None and time.time() > deadline_wall + LEASE_SECONDS:
+                        print(f"⏳ Corrida {run_id}: {len(units) - len(results)} unidades sin resultado al vencer el presupuesto")
+                        break
+                    await asyncio.sleep(IDLE_SECONDS)
+                    # Pendientes antes que resultados: una unidad que termina entre las dos lecturas cuenta dos veces, no cero
+                    outstanding = await work_queue.outstanding(run_id)
+                    results = await work_queue.results(run_id)
+                    if len(results) + outstanding < len(units):
+                        print(f"❌ Corrida {run_id}: la cola perdió unidades ({len(results)} con resultado y "
+                              f"{outstanding} pendientes de {len(units)}), no se espera más")
+                        break
+            finished = True
+        finally:
+            stop.set()
+            await asyncio.gather(local_node, return_exceptions=True)
+            # Interrumpida: la corrida queda en la cola para reanudarla
+            if finished:
+                await work_queue.cancel(run_id)
+            await work_queue.close()
+        
+        ordered = [results[unit_id] for unit_id in sorted(results, key=lambda unit_id: int(unit_id.rsplit(':', 1)[1]))]
+        failed = [result for result in ordered if 'error' in result]
+        if failed:
+            print(f"❌ {len(failed)} unidades fallidas: " + "; ".join(f"{r['unit_id']}: {r['error']}" for r in failed[:5]))
+        self._merge_results(ordered)
+    
+    async def run_worker(self, queue_kind: str):
+        """Nodo de larga duración: procesa unidades de cualquier corrida publicada en la cola (SIGTERM para salir)"""
+        print(f"🚀 === WORKER NODE ({queue_kind}) ===")
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass  # Windows: solo Ctrl+C vía KeyboardInterrupt
+        
+        metrics.start_metrics_server()
+        governor = get_governor()
+        governor.start_watchdog()
+        work_queue = open_queue(queue_kind)
+        try:
+            await self._serve_queue_workers(work_queue, stop)
+        finally:
+            await work_queue.close()
+            await governor.stop_watchdog()
+        print("👋 Nodo detenido")
+    
+    async def run_multithreaded_scraping(self, processes: int = PROCESSES, work_queue: str = WORK_QUEUE,
+                                         record: Optional[str] = RECORD_RUN or None):
         """Execute multithreaded scraping with 20 AI products"""
         print("🚀 === MULTITHREADED SYSTEM WITH 20 AI PRODUCTS ===")
         print(f"⏰ Executed: {self.execution_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"🧵 Parallel workers: {self.max_workers}")
-        
-        # Generate products with AI
-        self.ai_products = await self.generate_ai_products()
-        print(f"🎯 Target products: {len(self.ai_products)}")
+        print(f"🧵 Parallel workers: {self.max_workers}" + (f" x {processes} procesos" if processes > 1 else ""))
         
-        # Create semaphore to limit concurrent workers
-        semaphore = asyncio.Semaphore(self.max_workers)
+        profiler.reset()
+        get_limiter().reset()
+        run_started = time.perf_counter()
+        metrics.start_metrics_server()
+        governor = get_governor()
+        governor.start_watchdog()
         
-        # Create async tasks for multithreading with semaphore
-        tasks = []
-        for i, product in enumerate(self.ai_products):
-            task = asyncio.create_task(
-                self.scrape_product_worker_with_semaphore(product, i + 1, semaphore)
-            )
-            tasks.append(task)
+        # Corrida interrumpida: mismos productos y plan, sin las unidades ya terminadas
+        checkpoint = RunCheckpoint.resume()
+        if checkpoint:
+            self.ai_products = checkpoint.products
+            products_by_name = {product['nombre_exacto']: product for product in self.ai_products}
+            plan = checkpoint.pending_plan()
+            high_deals, medium_deals, notifications_sent = checkpoint.restore_results()
+            self.high_discount_deals.extend(high_deals)
+            self.medium_discount_deals.extend(medium_deals)
+            self.notifications_sent += notifications_sent
+            print(f"♻️ Reanudando corrida interrumpida: {len(checkpoint.done)} búsquedas ya terminadas, "
+                  f"{sum(len(sites) for _, sites in plan)} pendientes")
+        else:
+            # Generate products with AI
+            with profiler.span('product_generation'):
+                self.ai_products = await self.generate_ai_products()
+            
+            # Pares (producto, sitio) por valor esperado; con presupuesto solo se buscan los mejores
+            products_by_name = {product['nombre_exacto']: product for product in self.ai_products}
+            site_weights = {adapter.name: adapter.weight for adapter in configured_adapters()}
+            plan = PriorityScheduler(self.pair_stats).plan(list(products_by_name), site_weights, RUN_BUDGET_SEARCHES)
+            if RUN_BUDGET_SEARCHES > 0:
+                print(f"🎯 Presupuesto: {RUN_BUDGET_SEARCHES} de {len(products_by_name) * len(site_weights)} búsquedas, "
+                      f"{len(plan)} productos")
+            checkpoint = RunCheckpoint.start(self.ai_products, plan)
+        self.checkpoint = checkpoint
+        print(f"🎯 Target products: {len(self.ai_products)}")
+        if record:
+            # Solo graba lo que busca este proceso (no los shards ni los nodos de la cola)
+            self.recording = RunRecording()
+            self.recording.products = self.ai_products
+        deadline = time.monotonic() + RUN_BUDGET_SECONDS if RUN_BUDGET_SECONDS > 0 else None
         
-        # Execute all tasks in parallel
-        print(f"🚀 Starting {len(tasks)} workers with max {self.max_workers} concurrent...")
-        await asyncio.gather(*tasks, return_exceptions=True)
+        shard_metrics_dir = None
+        if work_queue:
+            await self._run_queued(plan, products_by_name, deadline, work_queue)
+        elif processes > 1 and len(plan) > 1:
+            shard_metrics_dir = await self._run_sharded(plan, products_by_name, deadline, processes)
+        else:
+            await self._run_plan(plan, products_by_name, deadline)
         
         # Enviar resumen con IA
         await self.send_summary_with_ai()
@@ -991,11 +1511,321 @@ class MultithreadedAIScraper:
         print(f"🧠 AI Analysis: {len(self.high_discount_deals) + len(self.medium_discount_deals)}")
         print(f"📱 Notifications sent: {self.notifications_sent}")
         print(f"🎉 Multithreaded system with 20 AI products executed successfully!")
+        
+        # Tabla de tiempos por etapa (y traza de Chrome si se pidió)
+        self.fingerprints.save()
+        self.fingerprints.print_report()
+        self.notification_ledger.save()
+        self.pair_stats.save()
+        self.checkpoint.clear()
+        self.checkpoint = None
+        if self.recording:
+            self.recording.save(record)
+            print(f"💾 Corrida grabada en {record} (python multithreaded_ai_scraper.py replay {record})")
+        if self.notification_ledger.suppressed:
+            print(f"🔕 Notificaciones omitidas por duplicadas: {self.notification_ledger.suppressed}")
+        profiler.print_report(time.perf_counter() - run_started)
+        await governor.stop_watchdog()
+        governor.print_report()
+        get_limiter().print_report()
+        trace_file = os.getenv(TRACE_FILE_ENV)
+        if trace_file:
+            profiler.write_chrome_trace(trace_file)
+        metrics.push_metrics()
+        if shard_metrics_dir:
+            metrics.push_metrics(metrics.shard_registry(shard_metrics_dir), grouping_key={'process': 'shards'})
+            remove_metrics_dir(shard_metrics_dir)
+
+    async def _daemon_check(self, product: Dict[str, Any], sites: List[str], scheduler: IntervalScheduler,
+                            semaphore: "AdaptiveLimiter", worker_id: int):
+        """Revisar los sitios vencidos de un producto y reprogramar cada par"""
+        site_stats = {}
+        try:
+            async with semaphore:
+                profiler.set_track(f"worker-{worker_id}")
+                with profiler.span('worker', product['nombre_exacto']):
+                    site_stats = await self.scrape_product_worker(product, worker_id, sites=sites)
+        finally:
+            for site in sites:
+                scheduler.report(product['nombre_exacto'], site, **site_stats.get(site, {}))
+                self.pair_stats.record(product['nombre_exacto'], site, **site_stats.get(site, {}))
+            self._daemon_wake.set()
+    
+    def _daemon_checkpoint(self, scheduler: IntervalScheduler):
+        """Guardar estado, imprimir tiempos del periodo y empezar uno nuevo"""
+        scheduler.save()
+        self.pair_stats.save()
+        self.fingerprints.save()
+        self.fingerprints.print_report()
+        self.notification_ledger.save()
+        hot = ', '.join(f"{pair.product[:20]}@{pair.site} {pair.interval / 60:.0f}m" for pair in scheduler.hot_pairs())
+        if hot:
+            print(f"🔥 Pares más frecuentes: {hot}")
+        profiler.print_report(time.perf_counter() - self._period_started)
+        get_governor().print_report()
+        get_limiter().print_report()
+        metrics.push_metrics()
+        # El daemon no debe acumular spans ni ofertas indefinidamente
+        profiler.reset()
+        get_limiter().reset()
+        self._period_started = time.perf_counter()
+        self.high_discount_deals.clear()
+        self.medium_discount_deals.clear()
+    
+    async def run_daemon(self):
+        """Proceso de larga duración: navegadores, sesiones y cachés calientes, cada (producto, sitio) con su intervalo"""
+        print("🚀 === DAEMON MODE ===")
+        stop = asyncio.Event()
+        # Se activa al terminar cada revisión (hay un nuevo vencimiento) o al recibir la señal
+        self._daemon_wake = asyncio.Event()
+        
+        def request_stop():
+            stop.set()
+            self._daemon_wake.set()
+        
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, request_stop)
+            except NotImplementedError:
+                pass  # Windows: solo Ctrl+C vía KeyboardInterrupt
+        
+        profiler.reset()
+        self._period_started = time.perf_counter()
+        metrics.start_metrics_server()
+        governor = get_governor()
+        governor.start_watchdog()
+        
+        scheduler = IntervalScheduler()
+        semaphore = get_limiter().workers
+        in_flight = set()
+        products_by_name: Dict[str, Dict[str, Any]] = {}
+        products_refreshed_at = 0.0
+        last_checkpoint = time.monotonic()
+        checks_started = 0
+        
+        from api_clients.free_apis import UnifiedFreeAPIClient
+        async with UnifiedFreeAPIClient(warm_sessions=True) as site_client:
+            self.site_client = site_client
+            try:
+                while not stop.is_set():
+                    if time.time() - products_refreshed_at >= DAEMON_PRODUCT_REFRESH_SECONDS:
+                        with profiler.span('product_generation'):
+                            self.ai_products = await self.generate_ai_products()
+                        products_by_name = {product['nombre_exacto']: product for product in self.ai_products}
+                        sites = [adapter.name for adapter in configured_adapters()]
+                        scheduler.sync(products_by_name, sites)
+                        products_refreshed_at = time.time()
+                        print(f"🎯 Daemon: {len(products_by_name)} productos x {len(sites)} sitios")
+                    
+                    for name, sites in scheduler.pop_due().items():
+                        if name not in products_by_name:
+                            continue
+                        # Ids de worker acotados: el escalonamiento inicial depende de él
+                        worker_id = checks_started % self.max_workers + 1
+                        checks_started += 1
+                        task = asyncio.create_task(
+                            self._daemon_check(products_by_name[name], sites, scheduler, semaphore, worker_id)
+                        )
+                        in_flight.add(task)
+                        task.add_done_callback(in_flight.discard)
+                    
+                    if time.monotonic() - last_checkpoint >= DAEMON_REPORT_SECONDS:
+                        self._daemon_checkpoint(scheduler)
+                        last_checkpoint = time.monotonic()
+                    
+                    next_due = scheduler.next_due()
+                    wait = 60.0 if next_due is None else min(max(next_due - time.time(), 1.0), 60.0)
+                    try:
+                        await asyncio.wait_for(self._daemon_wake.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._daemon_wake.clear()
+                
+                print(f"🛑 Daemon: señal de salida, esperando {len(in_flight)} revisiones en curso...")
+                if in_flight:
+                    done, pending = await asyncio.wait(set(in_flight), timeout=DAEMON_SHUTDOWN_TIMEOUT)
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+            finally:
+                self.site_client = None
+        
+        self._daemon_checkpoint(scheduler)
+        await governor.stop_watchdog()
+        print("👋 Daemon detenido")
+    
+    # --- Subcomandos de la CLI: una sola parte del pipeline, con su propio resumen de tiempos ---
+    
+    async def run_search(self, query: str, sites: Optional[List[str]] = None, limit: int = 3,
+                         output: Optional[str] = None):
+        """Buscar una consulta en los sitios indicados (todos por defecto) y, opcionalmente, guardar los candidatos"""
+        from api_clients.free_apis import UnifiedFreeAPIClient
+        profiler.reset()
+        started = time.perf_counter()
+        async with UnifiedFreeAPIClient(warm_sessions=True) as site_client:
+            with profiler.span('search_all_sites', query):
+                results = await site_client.search_all_sites_free(query, limit_per_site=limit, sites=sites)
+        
+        candidates = []
+        for site, listings in results.items():
+            print(f"🛒 {site}: {len(listings)} resultados")
+            for listing in listings:
+                listing['site'] = site
+                candidates.append(listing)
+                print(f"   {listing.get('price', ''):>14}  {listing.get('name', '')[:70]}")
+        if output:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump(candidates, f, ensure_ascii=False, indent=2)
+            print(f"💾 {len(candidates)} candidatos guardados en {output} (python multithreaded_ai_scraper.py score {output})")
+        profiler.print_report(time.perf_counter() - started)
+    
+    async def run_price_check(self, name: str, price: Optional[float] = None):
+        """Precios de reventa de un producto y, con --price, si ese precio es buena oportunidad"""
+        profiler.reset()
+        started = time.perf_counter()
+        with profiler.span('resale_lookup', name):
+            resale_data = await self.price_checker.get_resale_prices(name)
+        
+        print(f"💰 Precio promedio de reventa: ${resale_data.get('average_resale_price', 0):,.0f}")
+        print(f"📊 Rango: {resale_data.get('price_range') or 'No disponible'} - Confianza: {resale_data.get('confidence', 'low')}")
+        for source, prices in resale_data.items():
+            if isinstance(prices, list):
+                print(f"   {source}: {len(prices)} precios")
+        if price is not None:
+            analysis = self.price_checker.analyze_price_opportunity(price, resale_data)
+            verdict = "✅ Buena oportunidad" if analysis.get('is_good_deal') else "❌ No es oportunidad"
+            print(f"{verdict} a ${price:,.0f}: {analysis.get('reasoning', '')}")
+        profiler.print_report(time.perf_counter() - started)
+    
+    async def run_score(self, path: str, estimated_price: Optional[float] = None):
+        """Calcular descuento y análisis IA de candidatos guardados (p. ej. por `search --output`), sin BD ni notificaciones"""
+        with open(path, encoding='utf-8') as f:
+            candidates = json.load(f)
+        # También acepta {sitio: [listados]}, la forma de search_all_sites_free
+        if isinstance(candidates, dict):
+            candidates = [dict(listing, site=site) for site, listings in candidates.items() for listing in listings]
+        product = {'precio_estimado': estimated_price} if estimated_price else None
+        
+        profiler.reset()
+        started = time.perf_counter()
+        scored = []
+        for index, candidate in enumerate(candidates, 1):
+            try:
+                price_value = self._parse_price(candidate['price'])
+            except (KeyError, ValueError, IndexError):
+                print(f"⚠️ Candidato sin precio válido, se omite: {candidate.get('name', '')[:50]}")
+                continue
+            candidate.setdefault('site', 'Desconocido')
+            with profiler.span('score', candidate['site']):
+                discount, deal_data, ai_analysis = await self._score_listing(candidate, price_value, product, index)
+            scored.append((discount, ai_analysis['confidence_score'] if ai_analysis else None, candidate))
+        
+        print(f"\n📋 {len(scored)} candidatos puntuados:")
+        for discount, confidence, candidate in sorted(scored, key=lambda item: item[0], reverse=True):
+            label = "🔥" if discount > 50 else "💰" if discount >= 20 else "  "
+            confidence_text = f"{confidence:.2f}" if confidence is not None else "   -"
+            print(f"{label} {discount:6.1f}%  conf {confidence_text}  {candidate['site']:<12} {candidate['name'][:60]}")
+        profiler.print_report(time.perf_counter() - started)
+    
+    async def run_replay(self, path: str, with_ai: bool = False):
+        """Reproducir una corrida grabada con --record: mismo pipeline, sin red, BD, notificaciones ni estado"""
+        self.replay = RunRecording.load(path)
+        self.notifications_enabled = False
+        self.deal_store.enabled = False
+        # Todo listado cuenta como nuevo y las huellas no se guardan
+        self.fingerprints = FingerprintStore(full_run=True)
+        if not with_ai:
+            self.openai_client = None
+        self.ai_products = self.replay.products
+        products_by_name = {product['nombre_exacto']: product for product in self.ai_products}
+        print(f"▶️ Replay de {path}: {len(products_by_name)} productos, {len(self.replay.searches)} búsquedas grabadas")
+        
+        profiler.reset()
+        started = time.perf_counter()
+        await self._run_plan([(name, None) for name in products_by_name], products_by_name, None)
+        print(f"🔥 Excellent deals >50%: {len(self.high_discount_deals)}")
+        print(f"💰 Good deals 20-50%: {len(self.medium_discount_deals)}")
+        profiler.print_report(time.perf_counter() - started)
+
+def _run_shard(shard_index: int, units: List[Tuple[Dict[str, Any], List[str]]],
+               budget_seconds: Optional[float]) -> Dict[str, Any]:
+    """Punto de entrada de cada proceso shard (debe ser importable para el método spawn)"""
+    network_archive.configure()
+    return asyncio.run(MultithreadedAIScraper().run_shard(shard_index, units, budget_seconds))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scraper multihilo de ofertas con IA (sin subcomando: corrida completa)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Proceso de larga duración con intervalos por producto/sitio (SIGTERM para salir)")
+    parser.add_argument('--processes', type=int, default=PROCESSES,
+                        help="Repartir la corrida entre N procesos (SCRAPER_PROCESSES)")
+    parser.add_argument('--queue', choices=['redis', 'sqlite', 'memory'], default=WORK_QUEUE or None,
+                        help="Publicar la corrida en una cola de trabajo compartida por varios nodos (SCRAPER_WORK_QUEUE)")
+    parser.add_argument('--worker', action='store_true',
+                        help="Nodo que procesa unidades de la cola indicada con --queue (SIGTERM para salir)")
+    parser.add_argument('--record', default=RECORD_RUN or None, metavar='ARCHIVO',
+                        help="Grabar productos, búsquedas y reventa de la corrida para `replay` (SCRAPER_RECORD_RUN)")
+    network = parser.add_mutually_exclusive_group()
+    network.add_argument('--capture', metavar='DIR',
+                         help="Guardar todas las respuestas de red (páginas, APIs, OpenAI, Telegram) en este archivo de red")
+    network.add_argument('--replay-network', metavar='DIR',
+                         help="Responder todas las peticiones desde un archivo de red grabado con --capture, sin red")
+    
+    commands = parser.add_subparsers(dest='command', metavar='SUBCOMANDO')
+    search = commands.add_parser('search', help="Buscar una consulta en algunos sitios")
+    search.add_argument('query')
+    search.add_argument('--sites', nargs='*', help="Solo estos sitios (p. ej. Amazon Walmart)")
+    search.add_argument('--limit', type=int, default=3, help="Resultados por sitio")
+    search.add_argument('--output', help="Guardar los candidatos en JSON (entrada de `score`)")
+    
+    price_check = commands.add_parser('price-check', help="Precios de reventa de un producto")
+    price_check.add_argument('product')
+    price_check.add_argument('--price', type=float, help="Evaluar si este precio es buena oportunidad")
+    
+    score = commands.add_parser('score', help="Puntuar candidatos guardados (descuento y análisis IA)")
+    score.add_argument('file')
+    score.add_argument('--estimated-price', type=float, help="Precio de referencia si no hay datos de reventa")
+    
+    replay = commands.add_parser('replay', help="Reproducir una corrida grabada con --record, sin red ni notificaciones")
+    replay.add_argument('file')
+    replay.add_argument('--with-ai', action='store_true', help="Llamar a OpenAI para el análisis (por defecto no)")
+    return parser.parse_args(argv)
 
-async def main():
+async def main(argv=None):
     """Función principal"""
+    args = parse_args(argv)
+    print_config_status()
+    if args.capture:
+        network_archive.configure(args.capture, network_archive.RECORD)
+    elif args.replay_network:
+        network_archive.configure(args.replay_network, network_archive.REPLAY)
+    else:
+        network_archive.configure()
+    if args.worker and not args.queue:
+        sys.exit("--worker requiere --queue o SCRAPER_WORK_QUEUE")
+    try:
+        await run_command(args)
+    finally:
+        network_archive.close()
+
+async def run_command(args):
     scraper = MultithreadedAIScraper()
-    await scraper.run_multithreaded_scraping()
+    if args.command == 'search':
+        await scraper.run_search(args.query, args.sites, args.limit, args.output)
+    elif args.command == 'price-check':
+        await scraper.run_price_check(args.product, args.price)
+    elif args.command == 'score':
+        await scraper.run_score(args.file, args.estimated_price)
+    elif args.command == 'replay':
+        await scraper.run_replay(args.file, args.with_ai)
+    elif args.daemon:
+        await scraper.run_daemon()
+    elif args.worker:
+        await scraper.run_worker(args.queue)
+    else:
+        await scraper.run_multithreaded_scraping(processes=args.processes, work_queue=args.queue or '',
+                                                 record=args.record)
 
 if __name__ == "__main__":
     asyncio.run(main())
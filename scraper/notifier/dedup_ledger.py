@@ -0,0 +1,97 @@
+"""
+Ledger of deal notifications already sent, so an ongoing discount isn't
+pushed to the same chat on every hourly run.
+
+Entries are keyed by (listing, chat), where the listing key is the same
+canonical-URL identity used by the fingerprint store (app/fingerprints.py),
+and hold the time and price of the last alert. A deal is sent again only
+after NOTIFY_COOLDOWN_HOURS, or sooner if its price dropped by at least
+NOTIFY_REALERT_DROP_PCT since that alert. The ledger is a dict persisted in
+the scraper state dir, so the membership check is a single lookup; entries
+older than NOTIFY_LEDGER_RETENTION_DAYS are dropped on save. Nodes of a work
+queue share it through the queue backend, and re-read a deal's entry right
+before sending it, so two nodes running the same unit don't both alert.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from app.fingerprints import listing_key
+from app.state import read_json, write_json
+
+STATE_FILE = "notification_ledger.json"
+NOTIFY_COOLDOWN_HOURS = float(os.getenv("NOTIFY_COOLDOWN_HOURS", "24"))
+NOTIFY_REALERT_DROP_PCT = float(os.getenv("NOTIFY_REALERT_DROP_PCT", "5"))
+NOTIFY_LEDGER_RETENTION_DAYS = float(os.getenv("NOTIFY_LEDGER_RETENTION_DAYS", "30"))
+
+class NotificationLedger:
+    """"listing key|chat" -> [sent_at, price]"""
+
+    # Name of the ledger's copy in the work queue backend
+    shared_name = "notification_ledger"
+
+    def __init__(self, state_file: str = STATE_FILE):
+        self.state_file = state_file
+        self.entries: Dict[str, List[float]] = read_json(state_file, {}) or {}
+        self.suppressed = 0
+        # Sends recorded by this process, for merging shard results
+        self.recorded: Dict[str, List[float]] = {}
+
+    @staticmethod
+    def key(deal_data: Dict[str, Any], chat_id: str) -> str:
+        return f"{listing_key(deal_data)}|{chat_id}"
+
+    def should_send(self, deal_data: Dict[str, Any], chat_id: str) -> bool:
+        """Whether this deal is new to the chat, past its cooldown, or cheaper enough to re-alert"""
+        entry = self.entries.get(self.key(deal_data, chat_id))
+        if entry is None:
+            return True
+        sent_at, sent_price = entry
+        if time.time() - sent_at >= NOTIFY_COOLDOWN_HOURS * 3600:
+            return True
+        price = float(deal_data.get('price_value') or 0)
+        if sent_price and price and (sent_price - price) / sent_price * 100 >= NOTIFY_REALERT_DROP_PCT:
+            return True
+        self.suppressed += 1
+        return False
+
+    def last_sent(self, deal_data: Dict[str, Any], chat_id: str) -> Optional[List[float]]:
+        return self.entries.get(self.key(deal_data, chat_id))
+
+    def record(self, deal_data: Dict[str, Any], chat_id: str):
+        key = self.key(deal_data, chat_id)
+        self.entries[key] = self.recorded[key] = [time.time(), float(deal_data.get('price_value') or 0)]
+
+    def export(self, reset: bool = False) -> Dict[str, Any]:
+        exported = {"entries": dict(self.recorded), "suppressed": self.suppressed}
+        if reset:
+            self.recorded = {}
+            self.suppressed = 0
+        return exported
+
+    def merge(self, exported: Dict[str, Any]):
+        self.entries.update(exported["entries"])
+        self.recorded.update(exported["entries"])
+        self.suppressed += exported["suppressed"]
+
+    def refresh(self, entries: Dict[str, List[float]]):
+        """Adopt sends recorded elsewhere (other queue nodes) that are newer than ours"""
+        for key, entry in entries.items():
+            current = self.entries.get(key)
+            if current is None or entry[0] > current[0]:
+                self.entries[key] = entry
+
+    @staticmethod
+    def expired(entries: Dict[str, List[float]]) -> List[str]:
+        """Keys older than NOTIFY_LEDGER_RETENTION_DAYS"""
+        cutoff = time.time() - NOTIFY_LEDGER_RETENTION_DAYS * 86400
+        return [key for key, entry in entries.items() if entry[0] < cutoff]
+
+    def save(self):
+        expired = set(self.expired(self.entries))
+        self.entries = {key: entry for key, entry in self.entries.items() if key not in expired}
+        try:
+            write_json(self.state_file, self.entries)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el registro de notificaciones: {e}")
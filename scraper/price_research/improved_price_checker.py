@@ -1,4 +1,3 @@
-import asyncio
 import re
 import json
 import requests
@@ -7,15 +6,29 @@ from playwright.async_api import async_playwright
 from urllib.parse import quote_plus
 import time
 
+from app.browser_hooks import prepare_context
+from app.profiler import profiler
+from app import metrics
+from app.concurrency import get_limiter
+from app.resource_governor import get_governor
+from api_clients import interception  # noqa: F401 - registers the request blocking hook
+from api_clients import session_state
+
 class ImprovedPriceChecker:
     """Verificador de precios mejorado con múltiples estrategias"""
     
     def __init__(self):
-        self.browser_semaphore = asyncio.Semaphore(2)
+        self.resale_browsers = get_limiter().stage('resale')
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
+        # Fallos que cada fuente atrapa y convierte en "sin precios" (el benchmark los lee)
+        self.errors = 0
+    
+    def _record_error(self, source: str):
+        self.errors += 1
+        metrics.RESALE_ERRORS.labels(source).inc()
     
     async def get_resale_prices(self, product_name: str) -> Dict[str, Any]:
         """Obtiene precios de reventa usando múltiples estrategias"""
@@ -33,14 +46,16 @@ class ImprovedPriceChecker:
         
         # Estrategia 1: APIs directas
         try:
-            api_prices = await self._search_with_apis(product_name)
+            with profiler.span('resale.apis', product_name):
+                api_prices = await self._search_with_apis(product_name)
             prices.update(api_prices)
         except Exception as e:
             print(f"⚠️ Error en APIs: {e}")
         
         # Estrategia 2: Scraping mejorado
         try:
-            scraped_prices = await self._search_with_improved_scraping(product_name)
+            with profiler.span('resale.scraping', product_name):
+                scraped_prices = await self._search_with_improved_scraping(product_name)
             for source, source_prices in scraped_prices.items():
                 if source in prices:
                     prices[source].extend(source_prices)
@@ -49,7 +64,8 @@ class ImprovedPriceChecker:
         
         # Estrategia 3: Google Shopping
         try:
-            google_prices = await self._search_google_shopping(product_name)
+            with profiler.span('resale.google_shopping', product_name):
+                google_prices = await self._search_google_shopping(product_name)
             prices['google_shopping'] = google_prices
         except Exception as e:
             print(f"⚠️ Error en Google Shopping: {e}")
@@ -96,6 +112,7 @@ class ImprovedPriceChecker:
                 print(f"📊 MercadoLibre API: {len(results['mercadolibre_usado'])} precios")
         except Exception as e:
             print(f"❌ Error MercadoLibre API: {e}")
+            self._record_error('mercadolibre_api')
         
         return results
     
@@ -109,13 +126,15 @@ class ImprovedPriceChecker:
             'mercadolibre_usado': []
         }
         
-        async with self.browser_semaphore:
+        async with self.resale_browsers:
             try:
-                async with async_playwright() as p:
+                async with get_governor().browser(), async_playwright() as p:
                     browser = await p.chromium.launch(headless=True)
-                    context = await browser.new_context(
-                        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                    )
+                    context = await browser.new_context(**session_state.context_options('Resale', {
+                        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+                    }))
+                    await prepare_context(context, 'Resale')
+                    challenged = False
                     
                     # MercadoLibre mejorado
                     try:
@@ -126,6 +145,10 @@ class ImprovedPriceChecker:
                         
                         print(f"🌐 MercadoLibre: {url}")
                         await page.goto(url, wait_until='domcontentloaded', timeout=15000)
+                        if await session_state.is_challenge(page):
+                            session_state.invalidate('Resale')
+                            challenged = True
+                            raise session_state.ChallengePageError("MercadoLibre: página de verificación anti-bot")
                         await page.wait_for_timeout(3000)
                         
                         # Múltiples selectores para precios
@@ -156,6 +179,7 @@ class ImprovedPriceChecker:
                         
                     except Exception as e:
                         print(f"❌ Error MercadoLibre scraping: {e}")
+                        self._record_error('mercadolibre_scraping')
                     
                     # eBay mejorado
                     try:
@@ -166,6 +190,10 @@ class ImprovedPriceChecker:
                         
                         print(f"🌐 eBay: {url}")
                         await page.goto(url, wait_until='domcontentloaded', timeout=15000)
+                        if await session_state.is_challenge(page):
+                            session_state.invalidate('Resale')
+                            challenged = True
+                            raise session_state.ChallengePageError("eBay: página de verificación anti-bot")
                         await page.wait_for_timeout(3000)
                         
                         # Múltiples selectores para eBay
@@ -195,11 +223,15 @@ class ImprovedPriceChecker:
                         
                     except Exception as e:
                         print(f"❌ Error eBay scraping: {e}")
+                        self._record_error('ebay_scraping')
                     
+                    if (results['mercadolibre_usado'] or results['ebay']) and not challenged:
+                        await session_state.remember('Resale', context)
                     await browser.close()
                     
             except Exception as e:
                 print(f"❌ Error general en scraping: {e}")
+                self._record_error('scraping')
         
         return results
     
@@ -208,9 +240,11 @@ class ImprovedPriceChecker:
         print("🌐 Buscando en Google Shopping...")
         
         try:
-            async with async_playwright() as p:
+            async with self.resale_browsers, get_governor().browser(), async_playwright() as p:
                 browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
+                context = await browser.new_context(**session_state.context_options('GoogleShopping'))
+                await prepare_context(context, 'GoogleShopping')
+                page = await context.new_page()
                 
                 search_query = f"{product_name} usado precio"
                 encoded_query = quote_plus(search_query)
@@ -218,6 +252,11 @@ class ImprovedPriceChecker:
                 
                 print(f"🌐 Google Shopping: {url}")
                 await page.goto(url, wait_until='domcontentloaded', timeout=15000)
+                if await session_state.is_challenge(page):
+                    session_state.invalidate('GoogleShopping')
+                    await browser.close()
+                    print("🚫 Google Shopping: página de verificación anti-bot")
+                    return []
                 await page.wait_for_timeout(3000)
                 
                 prices = []
@@ -243,11 +282,14 @@ class ImprovedPriceChecker:
                         continue
                 
                 print(f"📊 Google Shopping: {len(prices)} precios")
+                if prices:
+                    await session_state.remember('GoogleShopping', context)
                 await browser.close()
                 return prices
                 
         except Exception as e:
             print(f"❌ Error Google Shopping: {e}")
+            self._record_error('google_shopping')
             return []
     
     def analyze_price_opportunity(self, current_price: float, resale_data: Dict[str, Any]) -> Dict[str, Any]:
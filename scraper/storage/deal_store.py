@@ -0,0 +1,156 @@
+"""
+Persistencia de listados, precios y ofertas en la base de datos de la API.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.models import Product, Price, Deal
+
+# Canal de Redis que escucha /api/deals/stream (ver api/deal_events.py)
+DEAL_EVENTS_CHANNEL = os.getenv("DEAL_EVENTS_CHANNEL", "pricewatch:deals:new")
+
+class DealStore:
+    """Guarda en la base de datos lo que encuentra el scraper.
+
+    Los contadores de /api/stats se actualizan en el mismo flush que inserta
+    las filas (ver update_stat_counters en api/models.py); aquí solo se insertan.
+    Si no hay base de datos configurada, todas las operaciones son no-op.
+    """
+
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url or self._database_url_from_env()
+        self.enabled = bool(self.database_url)
+        self._session_factory = None
+        self._product_ids: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+
+    @staticmethod
+    def _database_url_from_env() -> Optional[str]:
+        if not os.getenv('POSTGRES_HOST'):
+            return None
+        return f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT', 5432)}/{os.getenv('POSTGRES_DB')}"
+
+    def _session(self):
+        if self._session_factory is None:
+            engine = create_engine(self.database_url, pool_pre_ping=True)
+            self._session_factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+        return self._session_factory()
+
+    def _get_or_create_product(self, db, listing: Dict[str, Any], category: Optional[str]) -> int:
+        key = (listing['site'], listing['url'])
+        product_id = self._product_ids.get(key)
+        if product_id:
+            return product_id
+
+        product = db.query(Product).filter(
+            Product.site == listing['site'],
+            Product.url == listing['url']
+        ).first()
+        if not product:
+            product = Product(
+                name=listing['name'][:255],
+                url=listing['url'],
+                site=listing['site'][:50],
+                category=category
+            )
+            db.add(product)
+            db.flush()
+
+        self._product_ids[key] = product.id
+        return product.id
+
+    def record_listing(self, listing: Dict[str, Any], price_value: float, category: Optional[str] = None) -> Optional[int]:
+        """Registrar un listado y su precio actual. Devuelve el id del producto."""
+        if not self.enabled or not listing.get('url'):
+            return None
+
+        with self._lock:
+            db = None
+            try:
+                db = self._session()
+                product_id = self._get_or_create_product(db, listing, category)
+                db.add(Price(
+                    product_id=product_id,
+                    price=price_value,
+                    scraped_at=datetime.utcnow()
+                ))
+                db.commit()
+                return product_id
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                print(f"⚠️ Error guardando listado en BD: {e}")
+                return None
+            finally:
+                if db is not None:
+                    db.close()
+
+    def record_deal(self, product_id: Optional[int], deal_data: Dict[str, Any], ai_analysis: Dict[str, Any],
+                    telegram_sent: bool = False) -> Optional[int]:
+        """Registrar una oferta analizada. Devuelve el id de la oferta."""
+        if not self.enabled or not product_id:
+            return None
+
+        db = None
+        try:
+            db = self._session()
+            deal = Deal(
+                product_id=product_id,
+                original_price=float(deal_data['estimated_price']),
+                current_price=float(deal_data['price_value']),
+                discount_percentage=float(deal_data['discount_percentage']),
+                confidence_score=float(ai_analysis.get('confidence_score', 0)),
+                ai_reasoning=ai_analysis.get('reasoning'),
+                telegram_sent=telegram_sent
+            )
+            db.add(deal)
+            db.commit()
+            self._publish_deal(deal, deal_data)
+            return deal.id
+        except Exception as e:
+            if db is not None:
+                db.rollback()
+            print(f"⚠️ Error guardando oferta en BD: {e}")
+            return None
+        finally:
+            if db is not None:
+                db.close()
+
+    def _publish_deal(self, deal: Deal, deal_data: Dict[str, Any]):
+        """Avisar a los workers de la API por Redis pub/sub (solo si REDIS_HOST está configurado)"""
+        if not os.getenv('REDIS_HOST'):
+            return
+
+        try:
+            if self._redis is None:
+                import redis
+                self._redis = redis.Redis(
+                    host=os.getenv('REDIS_HOST'),
+                    port=int(os.getenv('REDIS_PORT', 6379)),
+                    password=os.getenv('REDIS_PASSWORD') or None,
+                    db=int(os.getenv('REDIS_DB', 0))
+                )
+
+            event = {
+                'id': deal.id,
+                'product_name': deal_data['name'],
+                'product_url': deal_data['url'],
+                'site': deal_data['site'],
+                'original_price': deal.original_price,
+                'current_price': deal.current_price,
+                'discount_percentage': deal.discount_percentage,
+                'confidence_score': deal.confidence_score,
+                'ai_reasoning': deal.ai_reasoning,
+                'created_at': deal.created_at.isoformat() if deal.created_at else None
+            }
+            self._redis.publish(DEAL_EVENTS_CHANNEL, json.dumps(event, ensure_ascii=False))
+        except Exception as e:
+            print(f"⚠️ Error publicando oferta en Redis: {e}")
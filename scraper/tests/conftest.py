@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# The scraper imports its packages from the scraper dir (python multithreaded_ai_scraper.py)
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRAPER_DIR not in sys.path:
+    sys.path.insert(0, SCRAPER_DIR)
+
+from app import state
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """Point the scraper state dir (app/state.py) at a fresh temporary directory"""
+    monkeypatch.setattr(state, "STATE_DIR", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+import multithreaded_ai_scraper
+from app import checkpoint as checkpoint_module
+from app.checkpoint import STATE_FILE, RunCheckpoint
+
+PRODUCTS = [{"nombre_exacto": f"p{index}", "keywords_busqueda": f"q{index}"} for index in range(3)]
+PLAN = [("p0", ["Amazon", "Walmart"]), ("p1", ["Amazon"]), ("p2", ["Amazon", "Coppel"])]
+
+
+def test_resume_returns_the_pending_units(state_dir):
+    checkpoint = RunCheckpoint.start(PRODUCTS, PLAN)
+    checkpoint.mark_done("p0", ["Amazon", "Walmart"])
+    checkpoint.mark_done("p2", ["Coppel"])
+    checkpoint.save([{"name": "deal"}], [], notifications_sent=2)
+
+    resumed = RunCheckpoint.resume()
+    assert resumed.products == PRODUCTS
+    assert resumed.pending_plan() == [("p1", ["Amazon"]), ("p2", ["Amazon"])]
+    high, medium, sent = resumed.restore_results()
+    assert [deal["name"] for deal in high] == ["deal"] and medium == [] and sent == 2
+
+
+def test_nothing_to_resume(state_dir, monkeypatch):
+    assert RunCheckpoint.resume() is None
+
+    checkpoint = RunCheckpoint.start(PRODUCTS, PLAN)
+    monkeypatch.setattr(checkpoint_module, "RESUME", False)
+    assert RunCheckpoint.resume() is None
+    monkeypatch.setattr(checkpoint_module, "RESUME", True)
+
+    checkpoint.clear()
+    assert not (state_dir / STATE_FILE).exists()
+    assert RunCheckpoint.resume() is None
+
+
+def test_stale_or_foreign_checkpoint_is_ignored(state_dir):
+    checkpoint = RunCheckpoint.start(PRODUCTS, PLAN)
+    checkpoint.data["started"] -= checkpoint_module.CHECKPOINT_MAX_AGE_MINUTES * 60 + 1
+    checkpoint.save()
+    assert RunCheckpoint.resume() is None
+
+    (state_dir / STATE_FILE).write_text(json.dumps({"version": checkpoint_module.VERSION + 1, "started": time.time()}))
+    assert RunCheckpoint.resume() is None
+
+
+def test_due_after_the_interval(state_dir, monkeypatch):
+    monkeypatch.setattr(checkpoint_module, "CHECKPOINT_INTERVAL_SECONDS", 3600)
+    checkpoint = RunCheckpoint.start(PRODUCTS, PLAN)
+    assert not checkpoint.due()
+    monkeypatch.setattr(checkpoint_module, "CHECKPOINT_INTERVAL_SECONDS", 0)
+    assert checkpoint.due()
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def scraper(state_dir, monkeypatch):
+    """Runs the scraper with fake product generation and searches; `run.searched` lists what each run searched"""
+    searched = []
+    failing = set()
+
+    async def generate_ai_products(self):
+        return [dict(product) for product in PRODUCTS]
+
+    async def scrape_product_worker(self, product, worker_id, sites=None):
+        name = product["nombre_exacto"]
+        if name in failing:
+            raise RuntimeError("search failed")
+        searched.append(name)
+        self.high_discount_deals.append({"name": name})
+        return {site: {"results": 1, "changed": 1, "deals": 1} for site in sites}
+
+    async def nothing(self):
+        pass
+
+    cls = multithreaded_ai_scraper.MultithreadedAIScraper
+    monkeypatch.setattr(cls, "generate_ai_products", generate_ai_products)
+    monkeypatch.setattr(cls, "scrape_product_worker", scrape_product_worker)
+    monkeypatch.setattr(cls, "send_no_deals_notification", nothing)
+
+    def run(fail=(), killed=False):
+        async def send_summary_with_ai(self):
+            if killed:
+                raise Interrupted()
+
+        monkeypatch.setattr(cls, "send_summary_with_ai", send_summary_with_ai)
+        failing.clear()
+        failing.update(fail)
+        searched.clear()
+        instance = cls()
+        try:
+            asyncio.run(asyncio.wait_for(instance.run_multithreaded_scraping(processes=1, work_queue="", record=None), 10))
+        except Interrupted:
+            pass
+        return instance
+
+    run.searched = searched
+    return run
+
+
+def test_interrupted_run_resumes_where_it_stopped(scraper, state_dir):
+    # p1 fails and the process dies before finishing: the checkpoint keeps p0 and p2
+    scraper(fail={"p1"}, killed=True)
+    assert sorted(scraper.searched) == ["p0", "p2"]
+    assert (state_dir / STATE_FILE).exists()
+
+    resumed = scraper()
+    assert scraper.searched == ["p1"]
+    assert sorted(deal["name"] for deal in resumed.high_discount_deals) == ["p0", "p1", "p2"]
+    assert not (state_dir / STATE_FILE).exists()
@@ -0,0 +1,83 @@
+from api_clients import circuit_breaker
+from api_clients.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakerBoard
+
+
+def trip(board, site="Amazon"):
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+        board.record_failure(site, "sin productos")
+
+
+def expire_cooldown(board, site="Amazon"):
+    breaker = board.breakers[site]
+    breaker.opened_at -= breaker.cooldown + 1
+
+
+def test_opens_after_threshold_consecutive_failures(state_dir):
+    board = CircuitBreakerBoard()
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD - 1):
+        board.record_failure("Amazon", "error")
+    assert board.state("Amazon") == CLOSED
+    assert board.allow("Amazon")
+
+    board.record_failure("Amazon", "error")
+    assert board.state("Amazon") == OPEN
+    assert not board.allow("Amazon")
+
+
+def test_success_resets_the_failure_streak(state_dir):
+    board = CircuitBreakerBoard()
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD - 1):
+        board.record_failure("Amazon", "error")
+    board.record_success("Amazon")
+    board.record_failure("Amazon", "error")
+    assert board.state("Amazon") == CLOSED
+
+
+def test_half_open_allows_a_single_probe(state_dir):
+    board = CircuitBreakerBoard()
+    trip(board)
+    expire_cooldown(board)
+
+    assert board.allow("Amazon")
+    assert board.state("Amazon") == HALF_OPEN
+    assert not board.allow("Amazon")
+
+    board.release("Amazon")
+    assert board.allow("Amazon")
+
+
+def test_successful_probe_closes(state_dir):
+    board = CircuitBreakerBoard()
+    trip(board)
+    expire_cooldown(board)
+    assert board.allow("Amazon")
+
+    board.record_success("Amazon")
+    assert board.state("Amazon") == CLOSED
+    assert board.breakers["Amazon"].trips == 0
+    assert board.allow("Amazon")
+
+
+def test_failed_probe_reopens_with_doubled_cooldown(state_dir):
+    board = CircuitBreakerBoard()
+    trip(board)
+    first_cooldown = board.breakers["Amazon"].cooldown
+    expire_cooldown(board)
+    assert board.allow("Amazon")
+
+    board.record_failure("Amazon", "timeout")
+    breaker = board.breakers["Amazon"]
+    assert breaker.state == OPEN
+    assert breaker.trips == 2
+    assert breaker.cooldown == min(first_cooldown * 2, circuit_breaker.MAX_COOLDOWN_SECONDS)
+    assert not board.allow("Amazon")
+
+
+def test_state_survives_a_new_run(state_dir):
+    trip(CircuitBreakerBoard())
+
+    board = CircuitBreakerBoard()
+    assert board.state("Amazon") == OPEN
+    assert board.breakers["Amazon"].last_reason == "sin productos"
+    assert not board.allow("Amazon")
+    assert board.state("Walmart") == CLOSED
@@ -0,0 +1,86 @@
+import time
+
+from notifier import dedup_ledger
+from notifier.dedup_ledger import NotificationLedger
+
+DEAL = {"site": "Amazon", "name": "PlayStation 5 Slim", "url": "https://www.amazon.com.mx/dp/B0CL5KNB9M", "price_value": 8000}
+HIGH_CHAT = "-100high"
+MEDIUM_CHAT = "-100medium"
+
+
+def age(ledger, deal, chat_id, seconds):
+    ledger.entries[ledger.key(deal, chat_id)][0] -= seconds
+
+
+def test_new_deal_is_sent_once(state_dir):
+    ledger = NotificationLedger()
+    assert ledger.should_send(DEAL, HIGH_CHAT)
+    ledger.record(DEAL, HIGH_CHAT)
+
+    assert not ledger.should_send(DEAL, HIGH_CHAT)
+    assert ledger.suppressed == 1
+
+
+def test_same_listing_with_tracking_params_is_a_duplicate(state_dir):
+    ledger = NotificationLedger()
+    ledger.record(DEAL, HIGH_CHAT)
+    assert not ledger.should_send(dict(DEAL, url=DEAL["url"] + "?tag=abc&ref=x"), HIGH_CHAT)
+
+
+def test_chats_are_tracked_separately(state_dir):
+    ledger = NotificationLedger()
+    ledger.record(DEAL, HIGH_CHAT)
+    assert ledger.should_send(DEAL, MEDIUM_CHAT)
+
+
+def test_realert_after_cooldown(state_dir):
+    ledger = NotificationLedger()
+    ledger.record(DEAL, HIGH_CHAT)
+    age(ledger, DEAL, HIGH_CHAT, dedup_ledger.NOTIFY_COOLDOWN_HOURS * 3600 + 1)
+    assert ledger.should_send(DEAL, HIGH_CHAT)
+
+
+def test_realert_on_a_big_enough_price_drop(state_dir):
+    ledger = NotificationLedger()
+    ledger.record(DEAL, HIGH_CHAT)
+    small_drop = DEAL["price_value"] * (1 - (dedup_ledger.NOTIFY_REALERT_DROP_PCT / 2) / 100)
+    big_drop = DEAL["price_value"] * (1 - dedup_ledger.NOTIFY_REALERT_DROP_PCT / 100)
+
+    assert not ledger.should_send(dict(DEAL, price_value=small_drop), HIGH_CHAT)
+    assert ledger.should_send(dict(DEAL, price_value=big_drop), HIGH_CHAT)
+
+
+def test_persisted_between_runs_and_pruned_after_retention(state_dir):
+    ledger = NotificationLedger()
+    ledger.record(DEAL, HIGH_CHAT)
+    other = dict(DEAL, url="https://www.walmart.com.mx/ip/123")
+    ledger.record(other, HIGH_CHAT)
+    age(ledger, other, HIGH_CHAT, dedup_ledger.NOTIFY_LEDGER_RETENTION_DAYS * 86400 + 1)
+    ledger.save()
+
+    reloaded = NotificationLedger()
+    assert not reloaded.should_send(DEAL, HIGH_CHAT)
+    assert reloaded.last_sent(other, HIGH_CHAT) is None
+
+
+def test_export_and_merge_carry_sends_between_processes(state_dir):
+    shard = NotificationLedger()
+    shard.record(DEAL, HIGH_CHAT)
+    shard.should_send(DEAL, HIGH_CHAT)
+    exported = shard.export(reset=True)
+    assert shard.export() == {"entries": {}, "suppressed": 0}
+
+    coordinator = NotificationLedger()
+    coordinator.merge(exported)
+    assert coordinator.suppressed == 1
+    assert not coordinator.should_send(DEAL, HIGH_CHAT)
+
+
+def test_refresh_keeps_the_latest_send(state_dir):
+    ledger = NotificationLedger()
+    key = ledger.key(DEAL, HIGH_CHAT)
+    now = time.time()
+    ledger.refresh({key: [now - 10, 9000.0]})
+    ledger.refresh({key: [now - 100, 9500.0]})
+    assert ledger.last_sent(DEAL, HIGH_CHAT) == [now - 10, 9000.0]
+    assert NotificationLedger.expired({key: [now - dedup_ledger.NOTIFY_LEDGER_RETENTION_DAYS * 86400 - 1, 1.0]}) == [key]
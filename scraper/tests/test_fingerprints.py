@@ -0,0 +1,88 @@
+import time
+
+from app import fingerprints
+from app.fingerprints import CHANGED, NEW, UNCHANGED, FingerprintStore, canonical_url, listing_key
+
+LISTING = {"site": "Amazon", "name": "PlayStation 5 Slim", "url": "https://www.amazon.com.mx/dp/B0CL5KNB9M/ref=sr_1_1?k=ps5"}
+
+
+def test_canonical_url_drops_query_fragment_and_ref_segment():
+    assert canonical_url(LISTING["url"]) == "www.amazon.com.mx/dp/B0CL5KNB9M"
+    assert canonical_url("https://WWW.Walmart.com.mx/ip/123/#reviews") == "www.walmart.com.mx/ip/123"
+    assert canonical_url("") == ""
+
+
+def test_listing_key_falls_back_to_site_and_title():
+    same_listing = dict(LISTING, url="https://www.amazon.com.mx/dp/B0CL5KNB9M?tag=x")
+    assert listing_key(same_listing) == listing_key(LISTING)
+
+    no_url = {"site": "Walmart", "name": "PlayStation  5 slim"}
+    assert listing_key(no_url) == listing_key({"site": "Walmart", "name": "playstation 5 SLIM"})
+    assert listing_key(no_url) != listing_key(dict(no_url, site="Coppel"))
+
+
+def test_new_changed_and_unchanged(state_dir):
+    store = FingerprintStore(full_run=False)
+    assert store.check(LISTING, 8999.0) == NEW
+    store.commit(LISTING, 8999.0)
+
+    assert store.check(LISTING, 8999.0) == UNCHANGED
+    assert store.check(LISTING, 7999.0) == CHANGED
+    assert store.check(dict(LISTING, name="PlayStation 5 Slim Digital"), 8999.0) == CHANGED
+    assert store.previous_price(LISTING) == 8999.0
+    assert store.counts == {NEW: 1, CHANGED: 2, UNCHANGED: 1}
+
+
+def test_uncommitted_listing_is_retried(state_dir):
+    store = FingerprintStore(full_run=False)
+    assert store.check(LISTING, 8999.0) == NEW
+    store.save()
+    assert FingerprintStore(full_run=False).check(LISTING, 8999.0) == NEW
+
+
+def test_committed_listing_is_unchanged_in_the_next_run(state_dir):
+    store = FingerprintStore(full_run=False)
+    store.commit(LISTING, 8999.0)
+    store.save()
+
+    assert FingerprintStore(full_run=False).check(LISTING, 8999.0) == UNCHANGED
+    assert FingerprintStore(full_run=True).check(LISTING, 8999.0) == CHANGED
+
+
+def test_save_drops_entries_past_the_ttl(state_dir):
+    store = FingerprintStore(full_run=False)
+    store.commit(LISTING, 8999.0)
+    store.entries[listing_key(LISTING)][2] = time.time() - fingerprints.FINGERPRINT_TTL_DAYS * 86400 - 1
+    store.save()
+
+    assert FingerprintStore(full_run=False).check(LISTING, 8999.0) == NEW
+
+
+def test_export_and_merge_carry_commits_between_processes(state_dir):
+    shard = FingerprintStore(full_run=False)
+    shard.check(LISTING, 8999.0)
+    shard.commit(LISTING, 8999.0)
+    exported = shard.export(reset=True)
+    assert shard.export()["entries"] == {}
+
+    coordinator = FingerprintStore(full_run=False)
+    coordinator.merge(exported)
+    assert coordinator.counts[NEW] == 1
+    assert coordinator.check(LISTING, 8999.0) == UNCHANGED
+
+
+def test_refresh_keeps_the_newest_entry(state_dir):
+    store = FingerprintStore(full_run=False)
+    store.commit(LISTING, 8999.0)
+    key = listing_key(LISTING)
+    newer = FingerprintStore(full_run=False)
+    newer.commit(LISTING, 7999.0)
+    newer.entries[key][2] = store.entries[key][2] + 10
+
+    store.refresh({key: newer.entries[key]})
+    assert store.previous_price(LISTING) == 7999.0
+
+    older = list(newer.entries[key])
+    older[1], older[2] = 9999.0, older[2] - 100
+    store.refresh({key: older})
+    assert store.previous_price(LISTING) == 7999.0
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app import network_archive
+from app.network_archive import RECORD, REPLAY, SUMMARY_FILE, NetworkArchive
+
+
+def test_record_then_replay(tmp_path):
+    archive = NetworkArchive(str(tmp_path), RECORD)
+    archive.record("requests", "get", "https://x/a", None, 200, "text/html; charset=latin-1", "más".encode("latin-1"))
+    archive.record("requests", "GET", "https://x/a", None, 500, "text/plain", b"second")
+    archive.record("requests", "POST", "https://x/search", b'{"q": 1}', 200, "application/json", b"one")
+    archive.record("requests", "POST", "https://x/search", b'{"q": 2}', 200, "application/json", b"two")
+    archive.record("requests", "POST", "https://api.telegram.org/bot123:secret/sendMessage", b"hi", 200, "", b"ok")
+    archive.record("aiohttp", "GET", "https://x/again", None, 200, "text/plain", b"second")
+    assert archive.counts == {"requests": {"recorded": 5}, "aiohttp": {"recorded": 1}}
+    # Same body, one blob
+    assert sum(len(files) for _, _, files in os.walk(tmp_path / "blobs")) == 5
+    assert b"secret" not in (tmp_path / NetworkArchive.INDEX).read_bytes()
+
+    replay = NetworkArchive(str(tmp_path), REPLAY)
+    first = replay.lookup("requests", "GET", "https://x/a", None)
+    assert (first.status, first.text()) == (200, "más")
+    # Repeated requests get the recorded responses in order, then the last one again
+    assert replay.lookup("requests", "GET", "https://x/a", None).status == 500
+    assert replay.lookup("requests", "GET", "https://x/a", None).status == 500
+    # Exact body match first, then method + URL
+    assert replay.lookup("requests", "POST", "https://x/search", b'{"q": 2}').body == b"two"
+    assert replay.lookup("requests", "POST", "https://x/search", b'{"q": 3}').body == b"one"
+    assert replay.lookup("requests", "POST", "https://api.telegram.org/bot999:other/sendMessage", b"hi").body == b"ok"
+    assert replay.lookup("requests", "GET", "https://x/missing", None) is None
+    assert replay.counts == {"requests": {"served": 6, "missed": 1}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def configure(state_dir, monkeypatch):
+    """network_archive.configure() with the exported environment and the hooks undone afterwards"""
+    monkeypatch.delenv(network_archive.ARCHIVE_ENV, raising=False)
+    monkeypatch.delenv(network_archive.MODE_ENV, raising=False)
+    yield network_archive.configure
+    network_archive.close()
+
+
+async def fetch(url):
+    session = network_archive.client_session()
+    try:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.json()
+    finally:
+        await session.close()
+
+
+def test_transports_replay_without_the_network(server, configure, state_dir, tmp_path):
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    archive_dir = str(tmp_path / "archive")
+
+    configure(archive_dir, RECORD)
+    assert requests.get(f"{base}/requests").json() == {"path": "/requests"}
+    assert asyncio.run(asyncio.wait_for(fetch(f"{base}/aiohttp"), 10)) == {"path": "/aiohttp"}
+    network_archive.close()
+    server.shutdown()
+    server.server_close()
+
+    configure(archive_dir, REPLAY)
+    assert requests.get(f"{base}/requests").json() == {"path": "/requests"}
+    assert asyncio.run(asyncio.wait_for(fetch(f"{base}/aiohttp"), 10)) == {"path": "/aiohttp"}
+    with pytest.raises(requests.ConnectionError):
+        requests.get(f"{base}/never-recorded")
+    network_archive.close()
+    summary = json.loads((state_dir / SUMMARY_FILE).read_text())
+    assert summary["counts"] == {"requests": {"served": 1, "missed": 1}, "aiohttp": {"served": 1}}
@@ -0,0 +1,12 @@
+from benchmarks import startup_time
+
+
+def test_entry_point_loads_no_heavy_modules():
+    report = startup_time.run(startup_time.DEFAULT_MODULE, runs=1, top=0)
+    assert report["heavy_modules_loaded"] == []
+
+
+def test_main_fails_when_a_heavy_module_is_imported(capsys):
+    # api_clients.free_apis needs aiohttp at import time
+    assert startup_time.main(["--module", "api_clients.free_apis", "--runs", "1"]) == 1
+    assert "aiohttp" in capsys.readouterr().out
@@ -0,0 +1,214 @@
+import asyncio
+
+import pytest
+
+import multithreaded_ai_scraper
+from api_clients import free_apis
+from app import work_queue
+from app.checkpoint import RunCheckpoint
+from app.fingerprints import UNCHANGED
+from app.work_queue import SQLiteWorkQueue
+
+UNITS = [{"product": {"nombre_exacto": f"p{index}"}, "sites": ["Amazon"]} for index in range(3)]
+
+
+def run(coro, timeout=10):
+    """Run a coroutine, failing instead of hanging if it never finishes"""
+    return asyncio.run(asyncio.wait_for(coro, timeout))
+
+
+def test_claimed_unit_is_invisible_until_its_lease_expires():
+    async def scenario():
+        queue = SQLiteWorkQueue()
+        await queue.publish("run", UNITS[:1])
+        first = await queue.claim("node-a", lease_seconds=0.05)
+        assert first.unit_id == "run:0" and first.attempts == 1
+        assert await queue.claim("node-b", lease_seconds=0.05) is None
+
+        await asyncio.sleep(0.1)
+        second = await queue.claim("node-b", lease_seconds=60)
+        assert second.unit_id == "run:0" and second.attempts == 2
+        assert not await queue.extend(first)
+        assert await queue.extend(second)
+    run(scenario())
+
+
+@pytest.mark.parametrize("stale_first", [True, False])
+def test_only_the_current_lease_holder_commits(stale_first):
+    async def scenario():
+        queue = SQLiteWorkQueue()
+        await queue.publish("run", UNITS[:1])
+        stale = await queue.claim("node-a", lease_seconds=0.05)
+        await asyncio.sleep(0.1)
+        current = await queue.claim("node-b", lease_seconds=60)
+
+        if stale_first:
+            assert not await queue.complete(stale, {"by": "a"})
+            assert await queue.complete(current, {"by": "b"})
+        else:
+            assert await queue.complete(current, {"by": "b"})
+            assert not await queue.complete(stale, {"by": "a"})
+        assert await queue.results("run") == {"run:0": {"by": "b"}}
+        assert await queue.outstanding("run") == 0
+    run(scenario())
+
+
+def test_first_commit_wins():
+    async def scenario():
+        queue = SQLiteWorkQueue()
+        await queue.publish("run", UNITS[:1])
+        lease = await queue.claim("node-a", lease_seconds=60)
+        assert await queue.complete(lease, {"n": 1})
+        assert not await queue.complete(lease, {"n": 2})
+        assert await queue.results("run") == {"run:0": {"n": 1}}
+    run(scenario())
+
+
+def test_poison_unit_is_failed_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(work_queue, "MAX_ATTEMPTS", 2)
+
+    async def scenario():
+        queue = SQLiteWorkQueue()
+        await queue.publish("run", UNITS[:1])
+        for _ in range(2):
+            assert await queue.claim("node", lease_seconds=0.01) is not None
+            await asyncio.sleep(0.02)
+        assert await queue.claim("node", lease_seconds=0.01) is None
+        assert await queue.results("run") == {"run:0": {"unit_id": "run:0", "error": "sin resultado tras 2 intentos"}}
+        assert await queue.outstanding("run") == 0
+    run(scenario())
+
+
+def test_cancelled_run_ignores_late_commits():
+    async def scenario():
+        queue = SQLiteWorkQueue()
+        await queue.publish("run", UNITS)
+        lease = await queue.claim("node", lease_seconds=60)
+        await queue.cancel("run")
+        assert not await queue.complete(lease, {"late": True})
+        assert await queue.results("run") == {}
+        assert await queue.outstanding("run") == 0
+        assert await queue.claim("node") is None
+    run(scenario())
+
+
+def test_file_queue_is_shared_between_processes(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "queue.sqlite3")
+        coordinator, node = SQLiteWorkQueue(path), SQLiteWorkQueue(path)
+        await coordinator.publish("run", UNITS)
+        assert await coordinator.outstanding("run") == 3
+        lease = await node.claim("node", lease_seconds=60)
+        assert await node.complete(lease, {"ok": True})
+        assert await coordinator.results("run") == {"run:0": {"ok": True}}
+        assert await coordinator.outstanding("run") == 2
+    run(scenario())
+
+
+def test_shared_state():
+    async def scenario():
+        queue = SQLiteWorkQueue()
+        await queue.put_state("fingerprints", {"a": [1, 2.0, 3.0], "b": [4, 5.0, 6.0]})
+        await queue.put_state("fingerprints", {"a": [7, 8.0, 9.0]})
+        assert await queue.get_state("fingerprints", "a") == [7, 8.0, 9.0]
+        assert await queue.get_state("notification_ledger", "a") is None
+        await queue.delete_state("fingerprints", ["b"])
+        assert await queue.load_state("fingerprints") == {"a": [7, 8.0, 9.0]}
+    run(scenario())
+
+
+class FakeSiteClient:
+    def __init__(self, **kwargs):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def queued_scraper(state_dir, monkeypatch):
+    """Scraper whose workers record a deal per product instead of searching"""
+    monkeypatch.setattr(multithreaded_ai_scraper, "IDLE_SECONDS", 0.01)
+    monkeypatch.setattr(free_apis, "UnifiedFreeAPIClient", FakeSiteClient)
+
+    async def scrape_product_worker(self, product, worker_id, sites=None):
+        self.high_discount_deals.append({"name": product["nombre_exacto"]})
+        return {site: {"results": 1, "changed": 1, "deals": 1} for site in sites}
+
+    monkeypatch.setattr(multithreaded_ai_scraper.MultithreadedAIScraper, "scrape_product_worker", scrape_product_worker)
+    return multithreaded_ai_scraper.MultithreadedAIScraper()
+
+
+def plan_for(count):
+    products = {f"p{index}": {"nombre_exacto": f"p{index}"} for index in range(count)}
+    return [(name, ["Amazon"]) for name in products], products
+
+
+def test_queued_run_merges_every_unit(queued_scraper):
+    plan, products = plan_for(4)
+    run(queued_scraper._run_queued(plan, products, None, "memory"))
+    assert sorted(deal["name"] for deal in queued_scraper.high_discount_deals) == sorted(products)
+
+
+def test_resumed_memory_run_is_published_again(queued_scraper):
+    plan, products = plan_for(3)
+    checkpoint = RunCheckpoint.start(list(products.values()), plan)
+    # A checkpoint written before the memory backend was excluded
+    checkpoint.data["queue_run"] = ["memory", "run-of-a-dead-process"]
+    queued_scraper.checkpoint = checkpoint
+
+    run(queued_scraper._run_queued(plan, products, None, "memory"))
+    assert len(queued_scraper.high_discount_deals) == 3
+
+
+def test_memory_run_is_not_kept_for_resume(state_dir):
+    checkpoint = RunCheckpoint.start([], [])
+    checkpoint.set_queue_run("memory", "run")
+    assert RunCheckpoint.resume().queue_run is None
+    checkpoint.set_queue_run("sqlite", "run")
+    assert RunCheckpoint.resume().queue_run == ("sqlite", "run")
+
+
+def test_coordinator_stops_waiting_on_units_the_queue_lost(queued_scraper, state_dir, monkeypatch):
+    monkeypatch.setattr(work_queue, "STATE_DIR", str(state_dir))
+    plan, products = plan_for(3)
+
+    async def scenario():
+        queue = work_queue.open_queue("sqlite")
+        # The queue kept only the first unit of the interrupted run
+        await queue.publish("interrupted", [{"product": products["p0"], "sites": ["Amazon"], "deadline": None}])
+        await queue.close()
+        queued_scraper.checkpoint = RunCheckpoint.start(list(products.values()), plan)
+        queued_scraper.checkpoint.set_queue_run("sqlite", "interrupted")
+        await queued_scraper._run_queued(plan, products, None, "sqlite")
+    # Stops waiting instead of hanging; p0 may or may not have finished by then
+    run(scenario())
+    assert {deal["name"] for deal in queued_scraper.high_discount_deals} <= {"p0"}
+
+
+def test_nodes_share_fingerprints(state_dir, monkeypatch):
+    listing = {"site": "Amazon", "name": "PlayStation 5", "url": "https://www.amazon.com.mx/dp/B0CL5KNB9M"}
+
+    async def scrape_product_worker(self, product, worker_id, sites=None):
+        if self.fingerprints.check(listing, 8999.0) != UNCHANGED:
+            self.high_discount_deals.append(listing)
+            self.fingerprints.commit(listing, 8999.0)
+        return {}
+
+    monkeypatch.setattr(multithreaded_ai_scraper.MultithreadedAIScraper, "scrape_product_worker", scrape_product_worker)
+
+    async def scenario():
+        queue = work_queue.open_queue("memory")
+        # The same unit run twice (its lease expired on the first node, or the unit was re-published)
+        await queue.publish("run", UNITS[:1] * 2)
+        for node in ("node-a", "node-b"):
+            scraper = multithreaded_ai_scraper.MultithreadedAIScraper()
+            scraper.shared_state = queue
+            await scraper._process_lease(queue, await queue.claim(node, lease_seconds=60), 1)
+        return await queue.results("run")
+    results = run(scenario())
+    assert [len(result["high_discount_deals"]) for result in results.values()] == [1, 0]
+    assert [result["fingerprints"]["counts"][UNCHANGED] for result in results.values()] == [0, 1]
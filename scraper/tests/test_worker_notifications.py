@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import multithreaded_ai_scraper
+from app.fingerprints import UNCHANGED
+
+PRODUCT = {'nombre_exacto': 'PlayStation 5', 'keywords_busqueda': 'ps5', 'precio_estimado': 10000}
+LISTING = {'name': 'PlayStation 5 Slim', 'price': '$4,000', 'url': 'https://www.amazon.com.mx/dp/B0CL5KNB9M'}
+# The listing as the worker sees it, tagged with its site
+SEEN = dict(LISTING, site='Amazon')
+
+
+class FakeSiteClient:
+    async def search_all_sites_free(self, query, limit_per_site=3, sites=None):
+        return {'Amazon': [dict(LISTING)]}
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ''
+
+
+@pytest.fixture
+def scraper(state_dir, monkeypatch):
+    monkeypatch.delenv('POSTGRES_HOST', raising=False)
+    monkeypatch.setattr(multithreaded_ai_scraper, 'TELEGRAM_BOT_TOKEN', 'token')
+
+    async def resale_prices(self, name):
+        return {'average_resale_price': 10000, 'price_range': '$9,000 - $11,000', 'confidence': 'high'}
+
+    async def analyze_deal_with_ai(self, deal_data, resale_data=None):
+        return {'confidence_score': 0.9, 'reasoning': 'ok', 'market_opinion': '', 'recommendation': '',
+                'resell_potential': 8}
+
+    monkeypatch.setattr(multithreaded_ai_scraper.MultithreadedAIScraper, '_resale_prices', resale_prices)
+    monkeypatch.setattr(multithreaded_ai_scraper.MultithreadedAIScraper, 'analyze_deal_with_ai', analyze_deal_with_ai)
+    instance = multithreaded_ai_scraper.MultithreadedAIScraper()
+    instance.site_client = FakeSiteClient()
+    return instance
+
+
+def run_worker(scraper, status_code):
+    sends = []
+
+    def post_telegram(url, data, kind):
+        sends.append(data['chat_id'])
+        return FakeResponse(status_code)
+
+    scraper._post_telegram = post_telegram
+    asyncio.run(scraper.scrape_product_worker(PRODUCT, 0, ['Amazon']))
+    return sends
+
+
+def test_sent_alert_commits_the_fingerprint(scraper):
+    assert run_worker(scraper, 200) == [multithreaded_ai_scraper.TELEGRAM_CHAT_ID_HIGH]
+    assert scraper.fingerprints.check(SEEN, 4000.0) == UNCHANGED
+
+
+def test_failed_alert_leaves_the_listing_to_retry(scraper):
+    assert len(run_worker(scraper, 500)) == 1
+    assert scraper.fingerprints.check(SEEN, 4000.0) != UNCHANGED
+
+    # The next run scores it again and retries the alert
+    assert len(run_worker(scraper, 200)) == 1
+    assert scraper.fingerprints.check(SEEN, 4000.0) == UNCHANGED
+
+
+def test_alert_already_in_the_ledger_still_commits(scraper):
+    deal = dict(SEEN, price_value=4000.0)
+    scraper.notification_ledger.record(deal, multithreaded_ai_scraper.TELEGRAM_CHAT_ID_HIGH)
+
+    assert run_worker(scraper, 200) == []
+    assert scraper.fingerprints.check(SEEN, 4000.0) == UNCHANGED